@@ -1,7 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from backend.models import Claim, FraudAnalysis, User
+from sqlalchemy import func, insert, update, delete, select, bindparam, case, or_, and_
+from backend.models import (
+    Claim, FraudAnalysis, User, ProcedureAmountStats, PackageRateCount, HospitalProcedureDaily,
+    IdempotencyKey, ClaimFeature, AnalysisRollup, HospitalLossDaily,
+)
+from backend.ml.feature_engineering import FEATURE_VERSION
+from backend.ml.feature_state import FeatureStateStore, to_date
+from backend.ml.risk_engine import MODEL_FEATURES
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
 from typing import Optional
+import numpy as np
 import pandas as pd
 
 
@@ -9,6 +18,47 @@ def get_claim_by_id(db: Session, claim_id: str) -> Optional[Claim]:
     return db.query(Claim).filter(Claim.claim_id == claim_id).first()
 
 
+def get_existing_claim_ids(db: Session, claim_ids: list, chunk_size: int = 500) -> set:
+    """Return the subset of claim_ids already present in the claims table."""
+    found = set()
+    for chunk in _chunks(list(set(claim_ids)), chunk_size):
+        found.update(r[0] for r in db.query(Claim.claim_id).filter(Claim.claim_id.in_(chunk)))
+    return found
+
+
+def iter_claim_ids(db: Session, batch_size: int = 10000):
+    """Stream every claim_id (used to warm the in-memory claim index)."""
+    for row in db.query(Claim.claim_id).yield_per(batch_size):
+        yield row[0]
+
+
+# ── Idempotency Keys ─────────────────────────────────────────────────────────
+def get_idempotency_key(db: Session, key: str) -> Optional[IdempotencyKey]:
+    return db.get(IdempotencyKey, key)
+
+
+def insert_idempotency_key(db: Session, key: str, claim_id: str, request_hash: str) -> IdempotencyKey:
+    record = IdempotencyKey(idempotency_key=key, claim_id=claim_id, request_hash=request_hash)
+    db.add(record)
+    db.flush()
+    return record
+
+
+def delete_idempotency_key(db: Session, key: str):
+    db.query(IdempotencyKey).filter(IdempotencyKey.idempotency_key == key).delete(synchronize_session=False)
+
+
+def purge_idempotency_keys(db: Session, older_than) -> int:
+    """Delete keys created before `older_than`; returns the number removed."""
+    removed = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.created_at < older_than)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return removed
+
+
 # ── User CRUD ────────────────────────────────────────────────────────────────
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email.lower().strip()).first()
@@ -37,16 +87,531 @@ def insert_claim(db: Session, claim_data: dict) -> Claim:
     claim = Claim(**claim_data)
     db.add(claim)
     db.flush()
+    _fold_feature_aggregates(db, [claim_data])
     return claim
 
 
 def insert_fraud_analysis(db: Session, analysis_data: dict) -> FraudAnalysis:
+    _fold_analysis_rollup(db, [analysis_data])
+    _fold_hospital_loss(db, _with_loss_claim_columns(db, [analysis_data]))
     record = FraudAnalysis(**analysis_data)
     db.add(record)
     db.flush()
     return record
 
 
+# ── Bulk Persistence ─────────────────────────────────────────────────────────
+INSERTED = "INSERTED"
+DUPLICATE = "DUPLICATE"
+DUPLICATE_IN_BATCH = "DUPLICATE_IN_BATCH"
+
+
+def _chunks(rows: list, size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _upsert_insert(dialect: str):
+    """Dialect insert construct supporting ON CONFLICT, or None if unavailable."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert
+    return None
+
+
+def bulk_insert_claims(db: Session, claim_rows: list, chunk_size: int = 1000) -> list:
+    """
+    Insert many claims with executemany-style core inserts (no ORM objects).
+    Duplicates are resolved set-wise: repeats within claim_rows are reported
+    as DUPLICATE_IN_BATCH, rows whose claim_id already exists as DUPLICATE
+    (via ON CONFLICT DO NOTHING ... RETURNING on PostgreSQL/SQLite, or one
+    IN (...) lookup per chunk elsewhere). Returns one outcome per input row.
+    Does not commit.
+    """
+    outcomes = [None] * len(claim_rows)
+    first_index = {}
+    for i, row in enumerate(claim_rows):
+        if row["claim_id"] in first_index:
+            outcomes[i] = DUPLICATE_IN_BATCH
+        else:
+            first_index[row["claim_id"]] = i
+    unique_rows = [claim_rows[i] for i in first_index.values()]
+
+    inserted = set()
+    upsert = _upsert_insert(db.get_bind().dialect.name)
+    for chunk in _chunks(unique_rows, chunk_size):
+        if upsert is not None:
+            stmt = (
+                upsert(Claim)
+                .on_conflict_do_nothing(index_elements=[Claim.claim_id])
+                .returning(Claim.claim_id)
+            )
+            inserted.update(db.scalars(stmt, chunk))
+        else:
+            existing = get_existing_claim_ids(db, [r["claim_id"] for r in chunk])
+            new_rows = [r for r in chunk if r["claim_id"] not in existing]
+            if new_rows:
+                db.execute(insert(Claim), new_rows)
+            inserted.update(r["claim_id"] for r in new_rows)
+
+    for claim_id, i in first_index.items():
+        outcomes[i] = INSERTED if claim_id in inserted else DUPLICATE
+    _fold_feature_aggregates(db, [r for r in unique_rows if r["claim_id"] in inserted])
+    return outcomes
+
+
+def bulk_insert_fraud_analyses(db: Session, analysis_rows: list, chunk_size: int = 1000):
+    """Insert many FraudAnalysis rows with executemany core inserts. Does not commit."""
+    for chunk in _chunks(analysis_rows, chunk_size):
+        db.execute(insert(FraudAnalysis), chunk)
+    _fold_analysis_rollup(db, analysis_rows)
+    _fold_hospital_loss(db, _with_loss_claim_columns(db, analysis_rows))
+
+
+_ANALYSIS_RESCORE_COLUMNS = (
+    "anomaly_score_norm", "rule_score_norm", "final_risk_score", "risk_level",
+    "fraud_pattern_detected", "investigation_priority", "rule_triggers", "risk_breakdown",
+    "explanation", "composite_index", "threat_level", "confidence_score",
+    "enforcement_state", "signal_vector", "knowledge_signals", "hard_stop",
+)
+
+
+def bulk_update_fraud_analyses(db: Session, analysis_rows: list, chunk_size: int = 1000):
+    """Rewrite the scoring columns of existing FraudAnalysis rows, matched on claim_id."""
+    if not analysis_rows:
+        return
+    table = FraudAnalysis.__table__
+    stmt = (
+        update(table)
+        .where(table.c.claim_id == bindparam("b_claim_id"))
+        .values({col: bindparam(f"b_{col}") for col in _ANALYSIS_RESCORE_COLUMNS})
+    )
+    for chunk in _chunks(analysis_rows, chunk_size):
+        # Swap each rewritten row's old contribution to analysis_rollup and
+        # hospital_loss_daily for its new one. FOR UPDATE holds the rows until
+        # the caller commits, so a concurrent rescore (in any process) waits and
+        # then reads the values this one wrote instead of subtracting the same
+        # old contribution twice; claim_id order keeps overlapping rescores
+        # from deadlocking. SQLite has no FOR UPDATE but serializes writers.
+        previous = db.execute(
+            select(*_ROLLUP_INPUT_COLUMNS, *_LOSS_CLAIM_COLUMNS[1:])
+            .join(Claim, Claim.claim_id == FraudAnalysis.claim_id)
+            .where(FraudAnalysis.claim_id.in_([row["claim_id"] for row in chunk]))
+            .order_by(FraudAnalysis.claim_id)
+            .with_for_update(of=FraudAnalysis)
+        ).mappings().all()
+        found = {row["claim_id"]: row for row in previous}
+        rewritten = [row for row in chunk if row["claim_id"] in found]
+        _fold_analysis_rollup(db, previous, sign=-1)
+        _fold_analysis_rollup(db, rewritten)
+        # Hospital and day never change, so the loss cells take one net delta each
+        loss_cells = {}
+        _add_loss_cells(loss_cells, previous, sign=-1)
+        _add_loss_cells(loss_cells, [{**found[row["claim_id"]], **row} for row in rewritten])
+        _write_loss_cells(db, loss_cells)
+        db.execute(stmt, [
+            {"b_claim_id": row["claim_id"], **{f"b_{col}": row[col] for col in _ANALYSIS_RESCORE_COLUMNS}}
+            for row in chunk
+        ])
+
+
+def get_analysis_scores(db: Session, claim_ids: Optional[list] = None, chunk_size: int = 500):
+    """Yield (claim_id, composite_index, anomaly_score_norm) for the given claims, or all."""
+    query = db.query(FraudAnalysis.claim_id, FraudAnalysis.composite_index, FraudAnalysis.anomaly_score_norm)
+    if claim_ids is None:
+        yield from query.yield_per(10000)
+        return
+    for chunk in _chunks(claim_ids, chunk_size):
+        yield from query.filter(FraudAnalysis.claim_id.in_(chunk))
+
+
+def count_claims(db: Session) -> int:
+    return db.query(func.count(Claim.claim_id)).scalar() or 0
+
+
+def get_claims_page_by_submission(db: Session, after: Optional[tuple], limit: int) -> list:
+    """
+    Next `limit` claims in submission order (created_at, claim_id), strictly
+    after the `after` key; feature-input dicts plus created_at.
+    """
+    query = db.query(
+        Claim.claim_id, Claim.hospital_id, Claim.patient_id, Claim.procedure_code,
+        Claim.package_rate, Claim.claim_amount, Claim.admission_date,
+        Claim.discharge_date, Claim.is_inpatient, Claim.created_at,
+    )
+    if after is not None:
+        created_at, claim_id = after
+        # The leading >= keeps this a range scan on ix_claims_created_claim
+        query = query.filter(
+            Claim.created_at >= created_at,
+            or_(Claim.created_at > created_at, Claim.claim_id > claim_id),
+        )
+    rows = query.order_by(Claim.created_at, Claim.claim_id).limit(limit).all()
+    return [row._asdict() for row in rows]
+
+
+# ── Claim Features ───────────────────────────────────────────────────────────
+# Stored feature columns: the model's matrix columns, then is_inpatient
+CLAIM_FEATURE_COLUMNS = MODEL_FEATURES + ["is_inpatient"]
+
+
+def upsert_claim_features(db: Session, feature_rows: list, chunk_size: int = 1000):
+    """
+    Write claim_features rows (claim_id, feature_version and every
+    CLAIM_FEATURE_COLUMNS value), replacing any stored row for the same
+    claim. Does not commit.
+    """
+    if not feature_rows:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [{**row, "computed_at": now} for row in feature_rows]
+    upsert = _upsert_insert(db.get_bind().dialect.name)
+    for chunk in _chunks(rows, chunk_size):
+        if upsert is not None:
+            stmt = upsert(ClaimFeature)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ClaimFeature.claim_id],
+                set_={col: stmt.excluded[col] for col in ("feature_version", "computed_at", *CLAIM_FEATURE_COLUMNS)},
+            )
+            db.execute(stmt, chunk)
+        else:
+            db.execute(delete(ClaimFeature).where(ClaimFeature.claim_id.in_([r["claim_id"] for r in chunk])))
+            db.execute(insert(ClaimFeature), chunk)
+
+
+def get_feature_matrix(
+    db: Session,
+    claim_ids: Optional[list] = None,
+    columns: Optional[list] = None,
+    feature_version: str = FEATURE_VERSION,
+    chunk_size: int = 500,
+) -> tuple:
+    """
+    Stored features as a float64 matrix, one row per claim and one column per
+    name in `columns` (default CLAIM_FEATURE_COLUMNS, so X[:, :12] feeds
+    FraudEngine.score_batch directly). Only rows at `feature_version` count.
+    Returns (claim_ids, X): for given claim_ids, those that have a row, in the
+    order asked for; otherwise every row, ordered by claim_id.
+    """
+    columns = list(columns or CLAIM_FEATURE_COLUMNS)
+    unknown = set(columns) - set(CLAIM_FEATURE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown feature columns: {sorted(unknown)}")
+    table = ClaimFeature.__table__
+    stmt = (
+        select(table.c.claim_id, *(table.c[col] for col in columns))
+        .where(table.c.feature_version == feature_version)
+    )
+    if claim_ids is None:
+        rows = db.execute(stmt.order_by(table.c.claim_id)).all()
+    else:
+        found = {}
+        for chunk in _chunks(list(claim_ids), chunk_size):
+            for row in db.execute(stmt.where(table.c.claim_id.in_(chunk))):
+                found[row[0]] = row
+        rows = [found[claim_id] for claim_id in claim_ids if claim_id in found]
+    ids = [row[0] for row in rows]
+    X = np.array([tuple(row[1:]) for row in rows], dtype=np.float64).reshape(len(rows), len(columns))
+    return ids, X
+
+
+def get_claim_feature_coverage(db: Session) -> dict:
+    """Claim count and stored feature rows per feature_version."""
+    by_version = (
+        db.query(ClaimFeature.feature_version, func.count(ClaimFeature.claim_id))
+        .group_by(ClaimFeature.feature_version)
+        .all()
+    )
+    return {"claims": count_claims(db), "by_version": dict(by_version)}
+
+
+# ── Feature Aggregates ───────────────────────────────────────────────────────
+def _accumulate(db: Session, model, key_columns: list, rows: list, merge):
+    """
+    Insert rows, or merge each into the existing row with the same key.
+    merge(incoming) returns {column: expression} where `incoming` exposes the
+    new row's values as attributes (ON CONFLICT's EXCLUDED where supported).
+
+    Each merged row stays locked until the caller commits, and the hot rows
+    (a procedure's stats, today's hospital cells) are shared by most batches.
+    Rows are written in key order, so concurrent transactions queue on the
+    first key they share instead of deadlocking. The contention itself
+    remains: batches touching the same keys commit one after another.
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: tuple(row[k] for k in key_columns))
+    upsert = _upsert_insert(db.get_bind().dialect.name)
+    if upsert is not None:
+        stmt = upsert(model)
+        stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_=merge(stmt.excluded))
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        stmt = (
+            update(model)
+            .where(*[getattr(model, k) == row[k] for k in key_columns])
+            .values(merge(SimpleNamespace(**row)))
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(stmt).rowcount == 0:
+            db.execute(insert(model), [row])
+
+
+def _fold_feature_aggregates(db: Session, claim_rows: list):
+    """Fold newly inserted claims into the feature aggregate tables (same transaction)."""
+    if not claim_rows:
+        return
+    amounts_by_proc = {}
+    rate_counts = {}
+    cells = {}
+    for r in claim_rows:
+        amount = float(r["claim_amount"])
+        amounts_by_proc.setdefault(r["procedure_code"], []).append(amount)
+        rate = float(r["package_rate"])
+        rate_counts[rate] = rate_counts.get(rate, 0) + 1
+        key = (r["hospital_id"], str(r["admission_date"])[:10], r["procedure_code"])
+        cell = cells.setdefault(key, [0, 0.0])
+        cell[0] += 1
+        cell[1] += amount
+
+    proc_rows = []
+    for code, amounts in amounts_by_proc.items():
+        mean = sum(amounts) / len(amounts)
+        proc_rows.append({
+            "procedure_code": code,
+            "claim_count": len(amounts),
+            "amount_mean": mean,
+            "amount_m2": sum((x - mean) ** 2 for x in amounts),
+        })
+
+    # Chan et al. parallel merge of (n, mean, M2); the float term comes first so
+    # SQLite never falls back to integer division.
+    P = ProcedureAmountStats
+    _accumulate(db, P, ["procedure_code"], proc_rows, lambda new: {
+        "claim_count": P.claim_count + new.claim_count,
+        "amount_mean": P.amount_mean
+        + (new.amount_mean - P.amount_mean) * new.claim_count / (P.claim_count + new.claim_count),
+        "amount_m2": P.amount_m2 + new.amount_m2
+        + (new.amount_mean - P.amount_mean) * (new.amount_mean - P.amount_mean)
+        * P.claim_count * new.claim_count / (P.claim_count + new.claim_count),
+    })
+    _accumulate(
+        db, PackageRateCount, ["package_rate"],
+        [{"package_rate": rate, "claim_count": n} for rate, n in rate_counts.items()],
+        lambda new: {"claim_count": PackageRateCount.claim_count + new.claim_count},
+    )
+    H = HospitalProcedureDaily
+    _accumulate(
+        db, H, ["hospital_id", "admission_date", "procedure_code"],
+        [
+            {"hospital_id": h, "admission_date": d, "procedure_code": p, "claim_count": n, "amount_sum": total}
+            for (h, d, p), (n, total) in cells.items()
+        ],
+        lambda new: {
+            "claim_count": H.claim_count + new.claim_count,
+            "amount_sum": H.amount_sum + new.amount_sum,
+        },
+    )
+
+
+def feature_aggregates_in_sync(db: Session) -> bool:
+    counted = db.query(func.sum(PackageRateCount.claim_count)).scalar() or 0
+    return counted == (db.query(func.count(Claim.claim_id)).scalar() or 0)
+
+
+def rebuild_feature_aggregates(db: Session):
+    """Recompute the feature aggregate tables from the claims table and commit."""
+    for model in (ProcedureAmountStats, PackageRateCount, HospitalProcedureDaily):
+        db.execute(delete(model))
+
+    means = (
+        select(
+            Claim.procedure_code.label("procedure_code"),
+            func.count().label("n"),
+            func.avg(Claim.claim_amount).label("mean"),
+        )
+        .group_by(Claim.procedure_code)
+        .subquery()
+    )
+    deviation = Claim.claim_amount - means.c.mean
+    db.execute(insert(ProcedureAmountStats).from_select(
+        ["procedure_code", "claim_count", "amount_mean", "amount_m2"],
+        select(means.c.procedure_code, means.c.n, means.c.mean, func.sum(deviation * deviation))
+        .join(Claim, Claim.procedure_code == means.c.procedure_code)
+        .group_by(means.c.procedure_code, means.c.n, means.c.mean),
+    ))
+    db.execute(insert(PackageRateCount).from_select(
+        ["package_rate", "claim_count"],
+        select(Claim.package_rate, func.count()).group_by(Claim.package_rate),
+    ))
+    db.execute(insert(HospitalProcedureDaily).from_select(
+        ["hospital_id", "admission_date", "procedure_code", "claim_count", "amount_sum"],
+        select(
+            Claim.hospital_id, Claim.admission_date, Claim.procedure_code,
+            func.count(), func.sum(Claim.claim_amount),
+        ).group_by(Claim.hospital_id, Claim.admission_date, Claim.procedure_code),
+    ))
+    db.commit()
+
+
+# ── Analysis Rollup ──────────────────────────────────────────────────────────
+_DEFAULT_BAND = "Mild Deviation"
+# Stored rows as _fold_analysis_rollup input; the band is extracted in SQL
+# rather than decoding every signal_vector
+_ROLLUP_INPUT_COLUMNS = (
+    FraudAnalysis.claim_id, FraudAnalysis.threat_level, FraudAnalysis.risk_level,
+    FraudAnalysis.signal_vector["anomaly_intensity_band"].as_string().label("anomaly_band"),
+    FraudAnalysis.hard_stop, FraudAnalysis.composite_index, FraudAnalysis.final_risk_score,
+)
+
+
+def _rollup_key(row: dict) -> tuple:
+    if "anomaly_band" in row:
+        band = row["anomaly_band"]
+    else:
+        band = (row["signal_vector"] or {}).get("anomaly_intensity_band")
+    return (row["threat_level"] or "LOW", row["risk_level"], band or _DEFAULT_BAND, bool(row["hard_stop"]))
+
+
+def _fold_analysis_rollup(db: Session, analysis_rows: list, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) FraudAnalysis rows from analysis_rollup (same transaction)."""
+    if not analysis_rows:
+        return
+    cells = {}
+    for r in analysis_rows:
+        cell = cells.setdefault(_rollup_key(r), [0, 0.0, 0.0])
+        cell[0] += sign
+        cell[1] += sign * float(r["composite_index"] or 0)
+        cell[2] += sign * float(r["final_risk_score"])
+    A = AnalysisRollup
+    _accumulate(
+        db, A, ["threat_level", "risk_level", "anomaly_band", "hard_stop"],
+        [
+            {
+                "threat_level": tl, "risk_level": rl, "anomaly_band": band, "hard_stop": stop,
+                "claim_count": n, "composite_sum": ci_sum, "final_risk_sum": final_sum,
+            }
+            for (tl, rl, band, stop), (n, ci_sum, final_sum) in cells.items()
+        ],
+        lambda new: {
+            "claim_count": A.claim_count + new.claim_count,
+            "composite_sum": A.composite_sum + new.composite_sum,
+            "final_risk_sum": A.final_risk_sum + new.final_risk_sum,
+        },
+    )
+
+
+def analysis_rollup_in_sync(db: Session) -> bool:
+    counted = db.query(func.sum(AnalysisRollup.claim_count)).scalar() or 0
+    return counted == (db.query(func.count(FraudAnalysis.id)).scalar() or 0)
+
+
+def rebuild_analysis_rollup(db: Session):
+    """Recompute analysis_rollup from the fraud_analysis table and commit."""
+    db.execute(delete(AnalysisRollup))
+    threat_level = func.coalesce(FraudAnalysis.threat_level, "LOW")
+    band = func.coalesce(FraudAnalysis.signal_vector["anomaly_intensity_band"].as_string(), _DEFAULT_BAND)
+    hard_stop = func.coalesce(FraudAnalysis.hard_stop, False)
+    db.execute(insert(AnalysisRollup).from_select(
+        ["threat_level", "risk_level", "anomaly_band", "hard_stop", "claim_count", "composite_sum", "final_risk_sum"],
+        select(
+            threat_level, FraudAnalysis.risk_level, band, hard_stop, func.count(),
+            func.sum(func.coalesce(FraudAnalysis.composite_index, 0)), func.sum(FraudAnalysis.final_risk_score),
+        ).group_by(threat_level, FraudAnalysis.risk_level, band, hard_stop),
+    ))
+    db.commit()
+
+
+# ── Hospital Loss Rollup ─────────────────────────────────────────────────────
+# A scored claim is high risk from this composite index up
+HIGH_RISK_COMPOSITE_MIN = 70
+_LOSS_CLAIM_COLUMNS = (Claim.claim_id, Claim.hospital_id, Claim.created_at, Claim.claim_amount)
+
+
+def _loss_day(created_at) -> date:
+    """UTC calendar day of a claim's submission (naive timestamps are UTC)."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _add_loss_cells(cells: dict, rows, sign: int = 1):
+    for r in rows:
+        cell = cells.setdefault((r["hospital_id"], _loss_day(r["created_at"])), [0, 0, 0.0, 0.0])
+        amount = float(r["claim_amount"])
+        cell[0] += sign
+        cell[1] += sign * ((r["composite_index"] or 0) >= HIGH_RISK_COMPOSITE_MIN)
+        cell[2] += sign * amount
+        cell[3] += sign * amount * float(r["final_risk_score"])
+
+
+def _loss_rows(cells: dict) -> list:
+    return [
+        {
+            "hospital_id": hospital_id, "day": day, "claim_count": n, "high_risk_count": high,
+            "claim_amount_sum": amount, "risk_weighted_loss": loss,
+        }
+        for (hospital_id, day), (n, high, amount, loss) in cells.items()
+    ]
+
+
+def _write_loss_cells(db: Session, cells: dict):
+    if not cells:
+        return
+    H = HospitalLossDaily
+    _accumulate(db, H, ["hospital_id", "day"], _loss_rows(cells), lambda new: {
+        "claim_count": H.claim_count + new.claim_count,
+        "high_risk_count": H.high_risk_count + new.high_risk_count,
+        "claim_amount_sum": H.claim_amount_sum + new.claim_amount_sum,
+        "risk_weighted_loss": H.risk_weighted_loss + new.risk_weighted_loss,
+    })
+
+
+def _fold_hospital_loss(db: Session, rows: list, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) scored claims from hospital_loss_daily
+    (same transaction). Each row carries the claim's hospital_id, created_at
+    and claim_amount and its analysis' final_risk_score and composite_index.
+    """
+    cells = {}
+    _add_loss_cells(cells, rows, sign)
+    _write_loss_cells(db, cells)
+
+
+def _with_loss_claim_columns(db: Session, analysis_rows: list, chunk_size: int = 500) -> list:
+    """analysis_rows merged with their (already inserted) claim's _LOSS_CLAIM_COLUMNS."""
+    claims = {}
+    for chunk in _chunks(analysis_rows, chunk_size):
+        stmt = select(*_LOSS_CLAIM_COLUMNS).where(Claim.claim_id.in_([r["claim_id"] for r in chunk]))
+        claims.update((row["claim_id"], row) for row in db.execute(stmt).mappings())
+    return [{**claims[r["claim_id"]], **r} for r in analysis_rows if r["claim_id"] in claims]
+
+
+def hospital_loss_in_sync(db: Session) -> bool:
+    counted = db.query(func.sum(HospitalLossDaily.claim_count)).scalar() or 0
+    return counted == (db.query(func.count(FraudAnalysis.id)).scalar() or 0)
+
+
+def rebuild_hospital_loss(db: Session, batch_size: int = 10000):
+    """Recompute hospital_loss_daily from claims joined with fraud_analysis and commit."""
+    db.execute(delete(HospitalLossDaily))
+    stmt = (
+        select(*_LOSS_CLAIM_COLUMNS, FraudAnalysis.final_risk_score, FraudAnalysis.composite_index)
+        .join(FraudAnalysis, FraudAnalysis.claim_id == Claim.claim_id)
+    )
+    cells = {}
+    result = db.execute(stmt, execution_options={"yield_per": batch_size}).mappings()
+    for partition in result.partitions():
+        _add_loss_cells(cells, partition)
+    for chunk in _chunks(_loss_rows(cells), 1000):
+        db.execute(insert(HospitalLossDaily), chunk)
+    db.commit()
+
+
 def get_all_claims_as_df(db: Session) -> pd.DataFrame:
     rows = db.query(Claim).all()
     if not rows:
@@ -69,43 +634,221 @@ def get_all_claims_as_df(db: Session) -> pd.DataFrame:
     } for r in rows])
 
 
+def iter_claims_for_features(db: Session, batch_size: int = 5000):
+    """
+    Stream the columns the feature state store needs, in submission order
+    (created_at, claim_id): the order every history loader replays, so
+    same-day ties resolve alike from the store, the aggregate tables and
+    across restarts.
+    """
+    query = (
+        db.query(
+            Claim.claim_id, Claim.hospital_id, Claim.patient_id, Claim.procedure_code,
+            Claim.package_rate, Claim.claim_amount, Claim.admission_date,
+            Claim.discharge_date, Claim.is_inpatient,
+        )
+        .order_by(Claim.created_at, Claim.claim_id)
+        .yield_per(batch_size)
+    )
+    for row in query:
+        yield row._asdict()
+
+
+def get_recent_claims(db: Session, limit: int) -> list:
+    """The `limit` most recently inserted claims, as feature-input dicts."""
+    rows = (
+        db.query(
+            Claim.claim_id, Claim.hospital_id, Claim.patient_id, Claim.procedure_code,
+            Claim.package_rate, Claim.claim_amount, Claim.admission_date,
+            Claim.discharge_date, Claim.is_inpatient,
+        )
+        .order_by(Claim.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [row._asdict() for row in rows]
+
+
+def _procedure_amount_stats(db: Session) -> dict:
+    return {
+        code: (n, mean, m2)
+        for code, n, mean, m2 in db.query(
+            ProcedureAmountStats.procedure_code, ProcedureAmountStats.claim_count,
+            ProcedureAmountStats.amount_mean, ProcedureAmountStats.amount_m2,
+        )
+    }
+
+
+def _package_rate_counts(db: Session) -> dict:
+    return dict(db.query(PackageRateCount.package_rate, PackageRateCount.claim_count).all())
+
+
+def get_feature_history(db: Session, claim: dict) -> dict:
+    """
+    Load the history slice features_from_history() needs for one claim without
+    reading the claims table wholesale: procedure and package-rate aggregates
+    come from their maintained tables, hospital volume and cost sums from the
+    hospital's per-day aggregate rows, and the patient window from an indexed
+    range scan. Cost is bounded by the hospital's active days and the patient's
+    claims, not by the table size. Admission dates are ISO strings, so date
+    ranges compare lexicographically.
+    """
+    adm = to_date(claim["admission_date"])
+    day = adm.isoformat()
+    lo30 = (adm - timedelta(days=30)).isoformat()
+    pat, hosp, proc = claim["patient_id"], claim["hospital_id"], claim["procedure_code"]
+
+    proc_stats = _procedure_amount_stats(db)
+    rate_counts = _package_rate_counts(db)
+
+    patient_window = [
+        (to_date(d).toordinal(), h)
+        for d, h in db.query(Claim.admission_date, Claim.hospital_id)
+        .filter(Claim.patient_id == pat, Claim.admission_date >= lo30, Claim.admission_date <= day)
+        .order_by(Claim.admission_date)
+    ]
+    last_day = (
+        db.query(func.max(Claim.admission_date))
+        .filter(Claim.patient_id == pat, Claim.admission_date <= day)
+        .scalar()
+    )
+
+    H = HospitalProcedureDaily
+    per_day = (
+        db.query(H.admission_date.label("day"), func.sum(H.claim_count).label("cnt"))
+        .filter(H.hospital_id == hosp)
+        .group_by(H.admission_date)
+        .subquery()
+    )
+    n_days, total, sumsq = db.query(
+        func.count(), func.sum(per_day.c.cnt), func.sum(per_day.c.cnt * per_day.c.cnt)
+    ).one()
+    day_count = (
+        db.query(func.sum(H.claim_count))
+        .filter(H.hospital_id == hosp, H.admission_date == day)
+        .scalar()
+    )
+    hospital_cost = {
+        code: (n, float(amount_sum))
+        for code, n, amount_sum in db.query(H.procedure_code, func.sum(H.claim_count), func.sum(H.amount_sum))
+        .filter(H.hospital_id == hosp, H.admission_date <= day)
+        .group_by(H.procedure_code)
+    }
+
+    last_amount = (
+        db.query(Claim.claim_amount)
+        .filter(Claim.patient_id == pat, Claim.procedure_code == proc, Claim.admission_date <= day)
+        .order_by(Claim.admission_date.desc(), Claim.created_at.desc(), Claim.claim_id.desc())
+        .limit(1)
+        .scalar()
+    )
+    recent = (
+        db.query(Claim.claim_id)
+        .filter(
+            Claim.patient_id == pat, Claim.procedure_code == proc,
+            Claim.admission_date >= lo30, Claim.admission_date < day,
+        )
+        .limit(1)
+        .first()
+    )
+
+    return {
+        "proc_stats": proc_stats,
+        "package_rates": (sorted(rate_counts), rate_counts, sum(rate_counts.values())),
+        "patient_window": patient_window,
+        "patient_last_day": to_date(last_day).toordinal() if last_day else None,
+        "hospital_volume": (n_days or 0, total or 0, sumsq or 0),
+        "hospital_day_count": day_count or 0,
+        "hospital_cost": hospital_cost,
+        "patient_proc_last_amount": last_amount,
+        "patient_proc_recent": recent is not None,
+    }
+
+
+def get_feature_state(db: Session, claims: list, chunk_size: int = 500) -> FeatureStateStore:
+    """
+    A FeatureStateStore holding the state the given claims' features read,
+    loaded like get_feature_history but once for a whole batch: procedure and
+    package-rate aggregates, every per-day aggregate row of the claims'
+    hospitals, and all claims of their patients (in submission order). Cost
+    is bounded by those hospitals' active days and patients' claims, not by
+    the table size.
+    """
+    H = HospitalProcedureDaily
+    hospitals = sorted({c["hospital_id"] for c in claims})
+    patients = sorted({c["patient_id"] for c in claims})
+
+    cells = []
+    for chunk in _chunks(hospitals, chunk_size):
+        cells.extend(
+            db.query(H.hospital_id, H.admission_date, H.procedure_code, H.claim_count, H.amount_sum)
+            .filter(H.hospital_id.in_(chunk))
+            .order_by(H.admission_date)
+        )
+    patient_claims = []
+    for chunk in _chunks(patients, chunk_size):
+        patient_claims.extend(
+            row._asdict() for row in db.query(
+                Claim.patient_id, Claim.procedure_code, Claim.hospital_id,
+                Claim.admission_date, Claim.claim_amount,
+            )
+            .filter(Claim.patient_id.in_(chunk))
+            .order_by(Claim.created_at, Claim.claim_id)
+        )
+    return FeatureStateStore.from_aggregates(
+        _procedure_amount_stats(db), _package_rate_counts(db), cells, patient_claims,
+    )
+
+
 def get_dataset_summary(db: Session) -> dict:
-    total = db.query(func.count(FraudAnalysis.id)).scalar() or 0
-    avg_score = db.query(func.avg(FraudAnalysis.final_risk_score)).scalar() or 0.0
-    high = db.query(func.count(FraudAnalysis.id)).filter(FraudAnalysis.risk_level == "HIGH").scalar() or 0
-    medium = db.query(func.count(FraudAnalysis.id)).filter(FraudAnalysis.risk_level == "MEDIUM").scalar() or 0
-    low = db.query(func.count(FraudAnalysis.id)).filter(FraudAnalysis.risk_level == "LOW").scalar() or 0
+    A = AnalysisRollup
+    levels = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+    total = 0
+    score_sum = 0.0
+    for level, count, final_sum in (
+        db.query(A.risk_level, func.sum(A.claim_count), func.sum(A.final_risk_sum)).group_by(A.risk_level)
+    ):
+        total += count or 0
+        score_sum += final_sum or 0.0
+        if level in levels:
+            levels[level] += count or 0
+    avg_score = score_sum / total if total > 0 else 0.0
     return {
         "total_claims": total,
-        "risk_distribution": {"HIGH": high, "MEDIUM": medium, "LOW": low},
+        "risk_distribution": {"HIGH": levels["HIGH"], "MEDIUM": levels["MEDIUM"], "LOW": levels["LOW"]},
         "avg_final_risk_score": round(float(avg_score), 4),
-        "high_risk_count": high,
-        "medium_risk_count": medium,
-        "low_risk_count": low,
+        "high_risk_count": levels["HIGH"],
+        "medium_risk_count": levels["MEDIUM"],
+        "low_risk_count": levels["LOW"],
     }
 
 
 def get_intelligence_metrics(db: Session) -> dict:
-    rows = db.query(FraudAnalysis).all()
-    total = len(rows)
+    A = AnalysisRollup
+    rows = (
+        db.query(
+            A.threat_level,
+            A.anomaly_band,
+            func.sum(A.claim_count),
+            func.sum(case((A.hard_stop.is_(True), A.claim_count), else_=0)),
+            func.sum(A.composite_sum),
+        )
+        .group_by(A.threat_level, A.anomaly_band)
+        .all()
+    )
 
     threat_dist = {"LOW": 0, "MEDIUM": 0, "HIGH": 0, "CRITICAL": 0}
     band_dist = {"Mild Deviation": 0, "Elevated Anomaly": 0, "Extreme Outlier": 0}
-    hard_stops = 0
+    total = hard_stops = 0
     composite_sum = 0.0
-
-    for r in rows:
-        tl = r.threat_level or "LOW"
+    for tl, band, count, stops, ci_sum in rows:
+        total += count or 0
+        hard_stops += stops or 0
+        composite_sum += ci_sum or 0.0
         if tl in threat_dist:
-            threat_dist[tl] += 1
-        if r.hard_stop:
-            hard_stops += 1
-        ci = r.composite_index or 0
-        composite_sum += ci
-        sv = r.signal_vector or {}
-        band = sv.get("anomaly_intensity_band", "Mild Deviation")
+            threat_dist[tl] += count or 0
         if band in band_dist:
-            band_dist[band] += 1
+            band_dist[band] += count or 0
 
     avg_ci = round(composite_sum / total, 2) if total > 0 else 0.0
 
@@ -160,6 +903,7 @@ def update_rule_config(db: Session, rule_key: str, data: dict):
     for key, value in data.items():
         if hasattr(rule, key):
             setattr(rule, key, value)
+    bump_cache_version(db, CONFIG_CACHE_SCOPE)
     db.commit()
     db.refresh(rule)
     return rule
@@ -179,6 +923,7 @@ def seed_rule_configs(db: Session):
     if db.query(RuleConfig).count() == 0:
         for rule_data in _DEFAULT_RULES:
             db.add(RuleConfig(**rule_data))
+        bump_cache_version(db, CONFIG_CACHE_SCOPE)
         db.commit()
 
 
@@ -200,6 +945,7 @@ def update_system_config(db: Session, key: str, value: str):
     if not config:
         return None
     config.config_value = value
+    bump_cache_version(db, CONFIG_CACHE_SCOPE)
     db.commit()
     db.refresh(config)
     return config
@@ -217,50 +963,207 @@ def seed_system_configs(db: Session):
     if db.query(SystemConfig).count() == 0:
         for cfg in _DEFAULT_SYSTEM_CONFIGS:
             db.add(SystemConfig(**cfg))
+        bump_cache_version(db, CONFIG_CACHE_SCOPE)
         db.commit()
 
 
+# ── Cache Versions ───────────────────────────────────────────────────────────
+CONFIG_CACHE_SCOPE = "config"
+# Bumped whenever stored FraudAnalysis scores are rewritten in place (rescoring)
+ANALYSES_CACHE_SCOPE = "analyses"
+
+
+def get_cache_version(db: Session, scope: str) -> int:
+    from backend.models import CacheVersion
+    version = db.query(CacheVersion.version).filter(CacheVersion.scope == scope).scalar()
+    return version or 0
+
+
+def bump_cache_version(db: Session, scope: str):
+    """Increment a cache version counter inside the caller's transaction."""
+    from backend.models import CacheVersion
+    updated = (
+        db.query(CacheVersion)
+        .filter(CacheVersion.scope == scope)
+        .update({CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False)
+    )
+    if not updated:
+        db.add(CacheVersion(scope=scope, version=1))
+    db.flush()
+
+
+def get_data_version(db: Session) -> tuple:
+    """
+    (scored claims, analyses version, config version) in one round trip:
+    changes with every committed score (the analysis_rollup count, which
+    counts commits in any order where a max(id) would not), rescore or
+    config change. Read by the response cache on every lookup.
+    """
+    from backend.models import CacheVersion
+
+    def _version(scope):
+        return func.coalesce(select(CacheVersion.version).where(CacheVersion.scope == scope).scalar_subquery(), 0)
+
+    scored = func.coalesce(select(func.sum(AnalysisRollup.claim_count)).scalar_subquery(), 0)
+    row = db.execute(select(scored, _version(ANALYSES_CACHE_SCOPE), _version(CONFIG_CACHE_SCOPE))).one()
+    return tuple(int(value) for value in row)
+
+
 # ── Claims + Analysis Join ───────────────────────────────────────────────────
-def get_claims_with_analysis(
+CLAIM_SORT_KEYS = ("created_at", "composite_index", "claim_amount")
+
+
+def get_claims_page(
     db: Session,
     min_score: Optional[int] = None,
     max_score: Optional[int] = None,
     risk_level: Optional[str] = None,
-) -> list:
-    rows = (
-        db.query(Claim, FraudAnalysis)
-        .join(FraudAnalysis, Claim.claim_id == FraudAnalysis.claim_id, isouter=True)
-        .all()
+    hospital_id: Optional[str] = None,
+    procedure_code: Optional[str] = None,
+    admission_from=None,
+    admission_to=None,
+    enforcement_state: Optional[str] = None,
+    sort: str = "created_at",
+    descending: bool = False,
+    after: Optional[tuple] = None,
+    limit: int = 500,
+) -> tuple:
+    """
+    One page of claims joined with their analysis, filtered and ordered in SQL
+    and paged by keyset on (sort key, claim_id). risk_level filters on the
+    threat level. `after` is the key of the previous page's last row.
+    Returns (rows, key of this page's last row — None on the final page).
+    Claims without an analysis drop out of any analysis filter and out of
+    composite_index ordering.
+    """
+    if sort not in CLAIM_SORT_KEYS:
+        raise ValueError(f"sort must be one of {CLAIM_SORT_KEYS}, got '{sort}'.")
+    if sort == "composite_index":
+        sort_key, tiebreak = FraudAnalysis.composite_index, FraudAnalysis.claim_id
+    else:
+        sort_key, tiebreak = getattr(Claim, sort), Claim.claim_id
+
+    query = (
+        db.query(
+            Claim.claim_id, Claim.hospital_id, Claim.hospital_name, Claim.patient_id,
+            Claim.patient_name, Claim.procedure_code, Claim.package_rate, Claim.claim_amount,
+            Claim.admission_date, Claim.discharge_date, Claim.is_inpatient, Claim.created_at,
+            FraudAnalysis.composite_index, FraudAnalysis.threat_level, FraudAnalysis.risk_level,
+            FraudAnalysis.final_risk_score, FraudAnalysis.fraud_pattern_detected,
+            FraudAnalysis.investigation_priority, FraudAnalysis.enforcement_state,
+            sort_key.label("sort_key"),
+        )
+        .outerjoin(FraudAnalysis, Claim.claim_id == FraudAnalysis.claim_id)
     )
+    if sort == "composite_index":
+        # Unscored claims have no key to page on; this also lets the planner
+        # walk fraud_analysis in index order
+        query = query.filter(FraudAnalysis.composite_index.isnot(None))
+    if min_score is not None:
+        query = query.filter(FraudAnalysis.composite_index >= min_score)
+    if max_score is not None:
+        query = query.filter(FraudAnalysis.composite_index <= max_score)
+    if risk_level:
+        query = query.filter(FraudAnalysis.threat_level == risk_level)
+    if enforcement_state:
+        query = query.filter(FraudAnalysis.enforcement_state == enforcement_state)
+    if hospital_id:
+        query = query.filter(Claim.hospital_id == hospital_id)
+    if procedure_code:
+        query = query.filter(Claim.procedure_code == procedure_code)
+    # admission_date is stored as ISO text, so string comparison is date order
+    if admission_from is not None:
+        query = query.filter(Claim.admission_date >= str(admission_from))
+    if admission_to is not None:
+        query = query.filter(Claim.admission_date <= str(admission_to))
+
+    if after is not None:
+        value, claim_id = after
+        # Leading inclusive bound keeps the range on the sort key indexable
+        if descending:
+            query = query.filter(sort_key <= value, or_(sort_key < value, tiebreak < claim_id))
+        else:
+            query = query.filter(sort_key >= value, or_(sort_key > value, tiebreak > claim_id))
+    if descending:
+        query = query.order_by(sort_key.desc(), tiebreak.desc())
+    else:
+        query = query.order_by(sort_key, tiebreak)
+
+    rows = query.limit(limit + 1).all()
+    next_after = (rows[limit - 1].sort_key, rows[limit - 1].claim_id) if len(rows) > limit else None
     results = []
-    for claim, analysis in rows:
-        ci = analysis.composite_index if analysis else None
-        tl = analysis.threat_level if analysis else None
-        if min_score is not None and (ci is None or ci < min_score):
-            continue
-        if max_score is not None and (ci is None or ci > max_score):
-            continue
-        if risk_level and tl != risk_level:
-            continue
-        results.append({
-            "claim_id": claim.claim_id,
-            "hospital_id": claim.hospital_id,
-            "hospital_name": claim.hospital_name,
-            "patient_id": claim.patient_id,
-            "patient_name": claim.patient_name,
-            "procedure_code": claim.procedure_code,
-            "package_rate": claim.package_rate,
-            "claim_amount": claim.claim_amount,
-            "admission_date": str(claim.admission_date),
-            "discharge_date": str(claim.discharge_date),
-            "is_inpatient": claim.is_inpatient,
-            "created_at": claim.created_at.isoformat() if claim.created_at else None,
-            "composite_index": ci,
-            "threat_level": tl,
-            "risk_level": analysis.risk_level if analysis else None,
-            "final_risk_score": analysis.final_risk_score if analysis else None,
-            "fraud_pattern_detected": analysis.fraud_pattern_detected if analysis else None,
-            "investigation_priority": analysis.investigation_priority if analysis else None,
-            "enforcement_state": analysis.enforcement_state if analysis else None,
-        })
-    return results
+    for row in rows[:limit]:
+        item = row._asdict()
+        del item["sort_key"]
+        item["admission_date"] = str(row.admission_date)
+        item["discharge_date"] = str(row.discharge_date)
+        item["created_at"] = row.created_at.isoformat() if row.created_at else None
+        results.append(item)
+    return results, next_after
+
+
+# ── Dataset Export ───────────────────────────────────────────────────────────
+# (CSV header, column) in export order
+EXPORT_COLUMNS = [
+    ("Claim ID", Claim.claim_id),
+    ("Hospital", Claim.hospital_id),
+    ("Patient", Claim.patient_id),
+    ("Procedure", Claim.procedure_code),
+    ("Amount", Claim.claim_amount),
+    ("Package Rate", Claim.package_rate),
+    ("Admission Date", Claim.admission_date),
+    ("Discharge Date", Claim.discharge_date),
+    ("Composite Score", FraudAnalysis.composite_index),
+    ("Threat Level", FraudAnalysis.threat_level),
+    ("Confidence Score", FraudAnalysis.confidence_score),
+    ("Fraud Pattern", FraudAnalysis.fraud_pattern_detected),
+    ("Enforcement State", FraudAnalysis.enforcement_state),
+    ("Investigation Priority", FraudAnalysis.investigation_priority),
+]
+
+
+def iter_export_batches(
+    db: Session,
+    admission_from=None,
+    admission_to=None,
+    hospital_id: Optional[str] = None,
+    threat_level: Optional[str] = None,
+    columns: Optional[list] = None,
+    with_features: bool = False,
+    batch_size: int = 5000,
+):
+    """
+    Scored claims joined with their analysis, filtered in SQL and read with
+    yield_per (a server-side cursor on PostgreSQL), in submission order.
+    Yields lists of up to batch_size row tuples of `columns` (default: the
+    EXPORT_COLUMNS columns). with_features outer-joins claim_features rows at
+    the current FEATURE_VERSION, so ClaimFeature columns can be selected
+    (None where a claim has no current row).
+    """
+    stmt = (
+        select(*(columns or [column for _, column in EXPORT_COLUMNS]))
+        .select_from(Claim)
+        .join(FraudAnalysis, FraudAnalysis.claim_id == Claim.claim_id)
+    )
+    if with_features:
+        stmt = stmt.outerjoin(ClaimFeature, and_(
+            ClaimFeature.claim_id == Claim.claim_id, ClaimFeature.feature_version == FEATURE_VERSION,
+        ))
+    if hospital_id:
+        stmt = stmt.where(Claim.hospital_id == hospital_id)
+    if threat_level:
+        stmt = stmt.where(FraudAnalysis.threat_level == threat_level)
+    # admission_date is stored as ISO text, so string comparison is date order
+    if admission_from is not None:
+        stmt = stmt.where(Claim.admission_date >= str(admission_from))
+    if admission_to is not None:
+        stmt = stmt.where(Claim.admission_date <= str(admission_to))
+    stmt = stmt.order_by(Claim.created_at, Claim.claim_id)
+
+    result = db.execute(stmt, execution_options={"yield_per": batch_size})
+    try:
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+    finally:
+        result.close()
+
@@ -0,0 +1,173 @@
+"""
+Schema migrations — ordered, versioned schema changes applied at boot.
+
+Each entry in MIGRATIONS runs once per database, in its own transaction, and
+is recorded in the schema_migrations table (version, name, applied_at). On
+PostgreSQL a transaction-scoped advisory lock serializes workers booting
+together, so each step is applied by exactly one of them.
+
+Migration 1 (baseline) creates every table that does not exist yet, with the
+indexes its model declares — the whole current schema on an empty database.
+Later steps therefore find their objects already present there and must be
+idempotent (checkfirst=True); on databases created before that object was
+declared, they do the actual work.
+
+To change the schema: declare the change on the model, then append a step
+that applies it to existing databases. Never edit or reorder applied steps.
+
+Run standalone with:  python -m backend.migrations [--status]
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from backend import models  # noqa: F401 — registers every table on Base.metadata
+from backend.database import Base, engine as db_engine
+
+logger = logging.getLogger("migrations")
+
+# Kept off Base.metadata: it must exist before (and independently of) the baseline
+_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+_PG_LOCK_KEY = 0x504D4A4159  # arbitrary, fixed per application
+
+
+def _index(name: str):
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise KeyError(f"No index named '{name}' is declared on the models.")
+
+
+def create_indexes(conn: Connection, names: tuple):
+    for name in names:
+        _index(name).create(bind=conn, checkfirst=True)
+
+
+def drop_indexes(conn: Connection, names: tuple):
+    for name in names:
+        _index(name).drop(bind=conn, checkfirst=True)
+
+
+# ── Steps ────────────────────────────────────────────────────────────────────
+FEATURE_HISTORY_INDEXES = (
+    "ix_claims_patient_admission",
+    "ix_claims_patient_proc_admission",
+    "ix_claims_created_claim",
+)
+HOT_PATH_INDEXES = (
+    "ix_claims_hospital_created",
+    "ix_claims_user_created",
+    "ix_fraud_analysis_threat_composite",
+    "ix_fraud_analysis_risk_level",
+    "ix_investigation_reports_claim_generated",
+)
+CLAIMS_LISTING_INDEXES = (
+    "ix_claims_amount_claim",
+    "ix_fraud_analysis_composite_claim",
+)
+
+
+def _baseline(conn: Connection):
+    """Create every table (and its declared indexes) that does not exist yet."""
+    Base.metadata.create_all(bind=conn)
+
+
+def _feature_history_indexes(conn: Connection):
+    """Patient-window and submission-order indexes on claims."""
+    create_indexes(conn, FEATURE_HISTORY_INDEXES)
+
+
+def _hot_path_indexes(conn: Connection):
+    """Composite indexes for hospital/user profiles, threat filters and report lookups."""
+    create_indexes(conn, HOT_PATH_INDEXES)
+
+
+def _claims_listing_indexes(conn: Connection):
+    """Keyset orderings of GET /claims by claim amount and composite index."""
+    create_indexes(conn, CLAIMS_LISTING_INDEXES)
+
+
+def _analysis_rollup(conn: Connection):
+    """Create analysis_rollup; boot fills it (crud.rebuild_analysis_rollup) when out of sync."""
+    models.AnalysisRollup.__table__.create(bind=conn, checkfirst=True)
+
+
+def _hospital_loss_daily(conn: Connection):
+    """Create hospital_loss_daily; boot fills it (crud.rebuild_hospital_loss) when out of sync."""
+    models.HospitalLossDaily.__table__.create(bind=conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "baseline", _baseline),
+    (2, "feature_history_indexes", _feature_history_indexes),
+    (3, "hot_path_indexes", _hot_path_indexes),
+    (4, "claims_listing_indexes", _claims_listing_indexes),
+    (5, "analysis_rollup", _analysis_rollup),
+    (6, "hospital_loss_daily", _hospital_loss_daily),
+]
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+def _lock(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+
+
+def applied_versions(bind: Engine = db_engine) -> dict:
+    """{version: (name, applied_at)} for every recorded migration."""
+    _migrations.create(bind=bind, checkfirst=True)
+    with bind.connect() as conn:
+        rows = conn.execute(select(_migrations.c.version, _migrations.c.name, _migrations.c.applied_at))
+        return {version: (name, applied_at) for version, name, applied_at in rows}
+
+
+def migrate(bind: Engine = db_engine) -> list:
+    """Apply every pending migration in order; returns the names applied."""
+    _migrations.create(bind=bind, checkfirst=True)
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        with bind.begin() as conn:
+            _lock(conn)
+            done = conn.execute(
+                select(_migrations.c.version).where(_migrations.c.version == version)
+            ).first()
+            if done:
+                continue
+            apply(conn)
+            conn.execute(insert(_migrations).values(
+                version=version, name=name, applied_at=datetime.now(timezone.utc),
+            ))
+        logger.info("Applied migration %04d_%s.", version, name)
+        applied.append(name)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--status", action="store_true", help="List migrations and when each was applied.")
+    args = parser.parse_args()
+
+    if args.status:
+        recorded = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            state = recorded[version][1].isoformat() if version in recorded else "pending"
+            print(f"{version:04d}_{name:<32} {state}")
+        return
+    names = migrate()
+    print(f"Applied {len(names)} migration(s)." if names else "Schema is up to date.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -4,60 +4,41 @@ from datetime import timedelta
 
 INPATIENT_PROCEDURES = {"P3", "P4", "P5", "P6", "P7"}
 
+# Version of the feature definitions, recorded with every persisted feature row
+# (claim_features). Bump it whenever compute_features / features_from_history
+# change any feature's value, so stored rows from older code read as stale.
+FEATURE_VERSION = "1"
 
-def compute_features(df_claims: pd.DataFrame) -> pd.DataFrame:
-    df = df_claims.copy()
-    df["admission_date"] = pd.to_datetime(df["admission_date"])
-    df["discharge_date"] = pd.to_datetime(df["discharge_date"])
-    df = df.sort_values("admission_date").reset_index(drop=True)
+FEATURE_OUTPUT_COLUMNS = [
+    "claim_id", "hospital_id", "patient_id", "procedure_code",
+    "package_rate", "claim_amount", "admission_date", "discharge_date", "is_inpatient",
+    "claim_amount_zscore", "stay_duration_days", "claim_to_package_ratio",
+    "patient_claim_freq_30d", "days_since_last_claim", "hospital_claim_volume_zscore",
+    "hospital_cost_deviation_index", "repeat_claim_amount_deviation",
+    "is_zero_day_stay", "same_proc_repeat_flag", "is_high_cost_procedure",
+    "patient_multi_hospital_flag",
+]
 
-    df["stay_duration_days"] = (df["discharge_date"] - df["admission_date"]).dt.days
-    df["claim_to_package_ratio"] = df["claim_amount"] / df["package_rate"]
+_DAY_NS = 86_400 * 10**9
 
-    proc_stats = df.groupby("procedure_code")["claim_amount"].agg(["mean", "std"]).rename(
-        columns={"mean": "proc_mean", "std": "proc_std"}).fillna(0)
-    df = df.join(proc_stats, on="procedure_code")
-    df["proc_std"] = df["proc_std"].fillna(0)
-    df["claim_amount_zscore"] = (
-        (df["claim_amount"] - df["proc_mean"]) / (df["proc_std"] + 1e-6)
-    ).fillna(0)
-    df.drop(columns=["proc_mean", "proc_std"], inplace=True)
 
+def _legacy_window_features(df: pd.DataFrame):
+    """Reference per-row implementation, kept for differential checks."""
     df["days_since_last_claim"] = (
         df.groupby("patient_id")["admission_date"].transform(lambda s: s.diff().dt.days)
     ).fillna(365)
 
     freq_map = {}
     for pat, grp in df.groupby("patient_id"):
-        grp = grp.sort_values("admission_date")
+        grp = grp.sort_values("admission_date", kind="mergesort")
         for i, row in grp.iterrows():
             ws = row["admission_date"] - timedelta(days=30)
             freq_map[i] = int(((grp["admission_date"] >= ws) & (grp["admission_date"] < row["admission_date"])).sum())
     df["patient_claim_freq_30d"] = [freq_map.get(i, 0) for i in df.index]
 
-    df["claim_date"] = df["admission_date"].dt.date
-    hosp_daily = df.groupby(["hospital_id", "claim_date"]).size().reset_index(name="daily_count")
-    hosp_stats = hosp_daily.groupby("hospital_id")["daily_count"].agg(["mean", "std"]).rename(
-        columns={"mean": "hosp_mean", "std": "hosp_std"})
-    hosp_daily = hosp_daily.join(hosp_stats, on="hospital_id")
-    hosp_daily["hosp_std"] = hosp_daily["hosp_std"].fillna(0)
-    hosp_daily["hosp_vol_zscore"] = (
-        (hosp_daily["daily_count"] - hosp_daily["hosp_mean"]) / (hosp_daily["hosp_std"] + 1e-6)
-    )
-    df = df.merge(hosp_daily[["hospital_id", "claim_date", "hosp_vol_zscore"]],
-                  on=["hospital_id", "claim_date"], how="left")
-    df["hospital_claim_volume_zscore"] = df["hosp_vol_zscore"].fillna(0)
-    df.drop(columns=["hosp_vol_zscore", "claim_date"], inplace=True)
-
-    df["hospital_cost_deviation_index"] = (
-        df.groupby("hospital_id")["claim_amount_zscore"]
-        .transform(lambda s: s.expanding().mean().shift(1))
-        .fillna(0)
-    )
-
     dev_map = {}
     for pat, grp in df.groupby("patient_id"):
-        grp = grp.sort_values("admission_date")
+        grp = grp.sort_values("admission_date", kind="mergesort")
         last_amt = {}
         for i, row in grp.iterrows():
             key = row["procedure_code"]
@@ -65,13 +46,9 @@ def compute_features(df_claims: pd.DataFrame) -> pd.DataFrame:
             last_amt[key] = row["claim_amount"]
     df["repeat_claim_amount_deviation"] = [float(dev_map.get(i, 1.0)) for i in df.index]
 
-    df["is_zero_day_stay"] = (df["stay_duration_days"] == 0).astype(int)
-    q75 = df["package_rate"].quantile(0.75)
-    df["is_high_cost_procedure"] = (df["package_rate"] >= q75).astype(int)
-
     repeat_map = {}
     for pat, grp in df.groupby("patient_id"):
-        grp = grp.sort_values("admission_date")
+        grp = grp.sort_values("admission_date", kind="mergesort")
         for i, row in grp.iterrows():
             ws = row["admission_date"] - timedelta(days=30)
             prior = grp[(grp["admission_date"] >= ws) &
@@ -82,7 +59,7 @@ def compute_features(df_claims: pd.DataFrame) -> pd.DataFrame:
 
     hosp_flag_map = {}
     for pat, grp in df.groupby("patient_id"):
-        grp = grp.sort_values("admission_date")
+        grp = grp.sort_values("admission_date", kind="mergesort")
         for i, row in grp.iterrows():
             ws = row["admission_date"] - timedelta(days=15)
             prior_hosps = grp[(grp["admission_date"] >= ws) &
@@ -90,12 +67,107 @@ def compute_features(df_claims: pd.DataFrame) -> pd.DataFrame:
             hosp_flag_map[i] = 1 if len(prior_hosps) > 1 else 0
     df["patient_multi_hospital_flag"] = [hosp_flag_map.get(i, 0) for i in df.index]
 
-    return df[[
-        "claim_id", "hospital_id", "patient_id", "procedure_code",
-        "package_rate", "claim_amount", "admission_date", "discharge_date", "is_inpatient",
-        "claim_amount_zscore", "stay_duration_days", "claim_to_package_ratio",
-        "patient_claim_freq_30d", "days_since_last_claim", "hospital_claim_volume_zscore",
-        "hospital_cost_deviation_index", "repeat_claim_amount_deviation",
-        "is_zero_day_stay", "same_proc_repeat_flag", "is_high_cost_procedure",
-        "patient_multi_hospital_flag",
-    ]]
+
+def _vectorized_window_features(df: pd.DataFrame):
+    """
+    Same window features as _legacy_window_features, computed with sorted
+    composite keys + searchsorted instead of per-row group filtering.
+    Expects df stably sorted by admission_date with a positional index.
+    """
+    n = len(df)
+    df["days_since_last_claim"] = df.groupby("patient_id")["admission_date"].diff().dt.days.fillna(365)
+
+    t = df["admission_date"].to_numpy(dtype="datetime64[ns]").view("int64")
+    t30 = t - 30 * _DAY_NS
+    t15 = t - 15 * _DAY_NS
+
+    # Dense ranks over every probed instant keep (group, time) keys exact and small
+    probes = np.unique(np.concatenate([t, t30, t15]))
+    m = len(probes) + 1
+    r = np.searchsorted(probes, t)
+    r30 = np.searchsorted(probes, t30)
+    r15 = np.searchsorted(probes, t15)
+
+    # Patient-major order; the stable sort keeps admission order within a patient
+    pat = pd.factorize(df["patient_id"])[0].astype(np.int64)
+    order = np.argsort(pat, kind="stable")
+    keys = pat[order] * m + r[order]
+    hi = np.searchsorted(keys, pat * m + r, side="left")
+    lo30 = np.searchsorted(keys, pat * m + r30, side="left")
+    lo15 = np.searchsorted(keys, pat * m + r15, side="left")
+    df["patient_claim_freq_30d"] = (hi - lo30).astype(int)
+
+    # >1 distinct hospital in [lo15, hi) <=> the hospital changes before hi
+    hosp = pd.factorize(df["hospital_id"])[0][order]
+    changes = np.append(np.flatnonzero(hosp[1:] != hosp[:-1]) + 1, n)
+    next_change = changes[np.searchsorted(changes, lo15, side="right")]
+    df["patient_multi_hospital_flag"] = ((hi > lo15) & (next_change < hi)).astype(int)
+
+    pat_proc = df.groupby(["patient_id", "procedure_code"], sort=False).ngroup().to_numpy(dtype=np.int64)
+    order = np.argsort(pat_proc, kind="stable")
+    keys = pat_proc[order] * m + r[order]
+    prior_same_proc = (
+        np.searchsorted(keys, pat_proc * m + r, side="left")
+        - np.searchsorted(keys, pat_proc * m + r30, side="left")
+    )
+    df["same_proc_repeat_flag"] = (prior_same_proc > 0).astype(int)
+
+    last_amt = df.groupby(["patient_id", "procedure_code"], sort=False)["claim_amount"].shift(1)
+    amount = df["claim_amount"].astype(float)
+    df["repeat_claim_amount_deviation"] = ((amount - last_amt).abs() / last_amt).fillna(1.0).astype(float)
+
+
+def compute_features(df_claims: pd.DataFrame, legacy: bool = False) -> pd.DataFrame:
+    """
+    Build the 12 engineered features for every claim in df_claims.
+    legacy=True uses the original per-row window loops (slow; for differential checks).
+    """
+    df = df_claims.copy()
+    df["admission_date"] = pd.to_datetime(df["admission_date"])
+    df["discharge_date"] = pd.to_datetime(df["discharge_date"])
+    # Stable sort: claims sharing an admission date keep their input order, so a
+    # newly appended claim is always placed after existing same-day claims.
+    df = df.sort_values("admission_date", kind="mergesort").reset_index(drop=True)
+
+    df["stay_duration_days"] = (df["discharge_date"] - df["admission_date"]).dt.days
+    df["claim_to_package_ratio"] = df["claim_amount"] / df["package_rate"]
+
+    proc_stats = df.groupby("procedure_code")["claim_amount"].agg(["mean", "std"]).rename(
+        columns={"mean": "proc_mean", "std": "proc_std"}).fillna(0)
+    df = df.join(proc_stats, on="procedure_code")
+    df["proc_std"] = df["proc_std"].fillna(0)
+    df["claim_amount_zscore"] = (
+        (df["claim_amount"] - df["proc_mean"]) / (df["proc_std"] + 1e-6)
+    ).fillna(0)
+    df.drop(columns=["proc_mean", "proc_std"], inplace=True)
+
+    if legacy:
+        _legacy_window_features(df)
+    else:
+        _vectorized_window_features(df)
+
+    df["claim_date"] = df["admission_date"].dt.date
+    hosp_daily = df.groupby(["hospital_id", "claim_date"]).size().reset_index(name="daily_count")
+    hosp_stats = hosp_daily.groupby("hospital_id")["daily_count"].agg(["mean", "std"]).rename(
+        columns={"mean": "hosp_mean", "std": "hosp_std"})
+    hosp_daily = hosp_daily.join(hosp_stats, on="hospital_id")
+    hosp_daily["hosp_std"] = hosp_daily["hosp_std"].fillna(0)
+    hosp_daily["hosp_vol_zscore"] = (
+        (hosp_daily["daily_count"] - hosp_daily["hosp_mean"]) / (hosp_daily["hosp_std"] + 1e-6)
+    )
+    df = df.merge(hosp_daily[["hospital_id", "claim_date", "hosp_vol_zscore"]],
+                  on=["hospital_id", "claim_date"], how="left")
+    df["hospital_claim_volume_zscore"] = df["hosp_vol_zscore"].fillna(0)
+    df.drop(columns=["hosp_vol_zscore", "claim_date"], inplace=True)
+
+    df["hospital_cost_deviation_index"] = (
+        df.groupby("hospital_id")["claim_amount_zscore"]
+        .transform(lambda s: s.expanding().mean().shift(1))
+        .fillna(0)
+    )
+
+    df["is_zero_day_stay"] = (df["stay_duration_days"] == 0).astype(int)
+    q75 = df["package_rate"].quantile(0.75)
+    df["is_high_cost_procedure"] = (df["package_rate"] >= q75).astype(int)
+
+    return df[FEATURE_OUTPUT_COLUMNS]
@@ -0,0 +1,521 @@
+"""
+Feature State Store — incremental per-entity state for single-claim featurization.
+
+compute_features() derives every feature from the full claims table. This store
+keeps just enough running state per patient, hospital and procedure to compute
+the 12 engineered features of ONE new claim without re-reading the table:
+
+  * procedure    — running count / mean / M2 of claim_amount (Welford)
+  * hospital     — daily claim counts plus Σcount / Σcount² over days, and
+                   per-procedure prefix sums of claim_amount keyed by day
+  * patient      — sorted admission days (30/15-day windows, last claim)
+  * patient+proc — sorted admission days and amounts (repeat flag, last amount)
+  * package rate — value counts (75th percentile for is_high_cost_procedure)
+
+Cost per lookup: binary searches and Fenwick prefix sums, O(log n), over the
+patient's and hospital's state, plus copies of every procedure's moments and
+of the package-rate counts, taken under the store lock and then scanned
+linearly for the 75th-percentile rate: O(#procedures + #distinct rates). Both
+are bounded by the procedure catalogue, not by the number of claims. add() is
+O(log n) except for the inserts into sorted lists (a patient's admission
+days, the distinct package rates), which are linear in that list's length.
+
+features_for(claim) returns the same values compute_features(history + [claim])
+yields for that claim, where the claim sorts after existing claims sharing its
+admission date. add(claim) must be called once the claim has been committed.
+The feature math itself lives in features_from_history(), which also serves
+history slices loaded straight from the database (crud.get_feature_history).
+"""
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+_EPS = 1e-6
+_NO_PRIOR_CLAIM_DAYS = 365.0
+
+
+def to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class _DayFenwick:
+    """Fenwick tree over day ordinals. Grows (and rebuilds) to cover new days."""
+
+    __slots__ = ("_base", "_tree", "_points", "_total")
+
+    def __init__(self):
+        self._base = 0
+        self._tree = [0.0]
+        self._points: dict[int, float] = {}
+        self._total = 0.0
+
+    def _rebuild(self, lo: int, hi: int):
+        size = 64
+        while size < (hi - lo + 1) * 2:
+            size *= 2
+        self._base = lo - size // 4
+        self._tree = [0.0] * (size + 1)
+        for day, value in self._points.items():
+            self._bump(day, value)
+
+    def _bump(self, day: int, value: float):
+        i = day - self._base + 1
+        n = len(self._tree)
+        while i < n:
+            self._tree[i] += value
+            i += i & -i
+
+    def add(self, day: int, value: float):
+        self._points[day] = self._points.get(day, 0.0) + value
+        self._total += value
+        if len(self._points) == 1 and len(self._tree) == 1:
+            self._rebuild(day, day)
+        elif not (self._base <= day < self._base + len(self._tree) - 1):
+            self._rebuild(min(day, min(self._points)), max(day, max(self._points)))
+        else:
+            self._bump(day, value)
+
+    def prefix(self, day: int) -> float:
+        """Sum of values added at days <= day."""
+        if len(self._tree) == 1 or day < self._base:
+            return 0.0
+        i = day - self._base + 1
+        if i >= len(self._tree):
+            return self._total
+        acc = 0.0
+        while i > 0:
+            acc += self._tree[i]
+            i -= i & -i
+        return acc
+
+
+class _PrefixSnapshot:
+    """
+    A _DayFenwick's prefix sums frozen at the days a scratch store is asked
+    about, plus whatever the scratch store adds on top.
+    """
+
+    __slots__ = ("_prefixes", "_added")
+
+    def __init__(self, tree, days: Iterable[int]):
+        self._prefixes = {day: tree.prefix(day) for day in days}
+        self._added = _DayFenwick()
+
+    def add(self, day: int, value: float):
+        self._added.add(day, value)
+
+    def prefix(self, day: int) -> float:
+        return self._prefixes[day] + self._added.prefix(day)
+
+
+class FeatureStateStore:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._count = 0
+        # procedure_code -> [n, mean, m2]
+        self._proc: dict[str, list] = {}
+        # package_rate -> count, plus sorted distinct rates
+        self._pkg_counts: dict[float, int] = {}
+        self._pkg_sorted: list[float] = []
+        # hospital_id -> {day: count}, hospital_id -> [n_days, Σcount, Σcount²]
+        self._hosp_days: dict[str, dict[int, int]] = {}
+        self._hosp_vol: dict[str, list] = {}
+        # hospital_id -> {procedure_code: (count fenwick, amount fenwick)}
+        self._hosp_cost: dict[str, dict[str, tuple]] = {}
+        # patient_id -> ([days], [hospital_id]) ; (patient_id, procedure_code) -> ([days], [amount])
+        self._patients: dict[str, tuple] = {}
+        self._patient_procs: dict[tuple, tuple] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ── Mutation ─────────────────────────────────────────────────────────────
+    def add(self, claim: dict):
+        """Fold a committed claim into the running state."""
+        day = to_date(claim["admission_date"]).toordinal()
+        amount = float(claim["claim_amount"])
+        proc = claim["procedure_code"]
+        hosp = claim["hospital_id"]
+        pat = claim["patient_id"]
+        rate = float(claim["package_rate"])
+
+        with self._lock:
+            self._count += 1
+
+            stats = self._proc.setdefault(proc, [0, 0.0, 0.0])
+            stats[0] += 1
+            delta = amount - stats[1]
+            stats[1] += delta / stats[0]
+            stats[2] += delta * (amount - stats[1])
+
+            if rate not in self._pkg_counts:
+                insort(self._pkg_sorted, rate)
+            self._pkg_counts[rate] = self._pkg_counts.get(rate, 0) + 1
+
+            self._add_hospital_day(hosp, day, proc, 1, amount)
+            self._add_patient_claim(pat, proc, day, hosp, amount)
+
+    def _add_hospital_day(self, hosp: str, day: int, proc: str, count: int, amount: float):
+        days = self._hosp_days.setdefault(hosp, {})
+        vol = self._hosp_vol.setdefault(hosp, [0, 0, 0])
+        prev = days.get(day, 0)
+        days[day] = prev + count
+        if prev == 0:
+            vol[0] += 1
+        vol[1] += count
+        vol[2] += (prev + count) ** 2 - prev ** 2
+
+        cnt_tree, amt_tree = self._hosp_cost.setdefault(hosp, {}).setdefault(
+            proc, (_DayFenwick(), _DayFenwick())
+        )
+        cnt_tree.add(day, float(count))
+        amt_tree.add(day, amount)
+
+    def _add_patient_claim(self, pat: str, proc: str, day: int, hosp: str, amount: float):
+        p_days, p_hosps = self._patients.setdefault(pat, ([], []))
+        pos = bisect_right(p_days, day)
+        p_days.insert(pos, day)
+        p_hosps.insert(pos, hosp)
+
+        pp_days, pp_amounts = self._patient_procs.setdefault((pat, proc), ([], []))
+        pos = bisect_right(pp_days, day)
+        pp_days.insert(pos, day)
+        pp_amounts.insert(pos, amount)
+
+    def rebuild(self, claims: Iterable[dict]):
+        """Reset and replay claims in submission order (used at startup)."""
+        with self._lock:
+            self._reset()
+            for claim in claims:
+                self.add(claim)
+
+    @classmethod
+    def from_aggregates(
+        cls,
+        proc_stats: dict,
+        rate_counts: dict,
+        hospital_cells: Iterable[tuple],
+        patient_claims: Iterable[dict],
+    ) -> "FeatureStateStore":
+        """
+        A store assembled from maintained aggregates instead of replayed
+        claims: proc_stats {procedure_code: (n, mean, m2)} and rate_counts
+        {package_rate: count} over every claim, hospital_cells as
+        (hospital_id, admission_date, procedure_code, claim_count, amount_sum)
+        and patient_claims (patient_id, procedure_code, hospital_id,
+        admission_date, claim_amount) in submission order. It answers for
+        claims whose hospitals' cells and patients' claims were all given.
+        """
+        store = cls()
+        store._proc = {code: [n, float(mean), float(m2)] for code, (n, mean, m2) in proc_stats.items()}
+        store._pkg_counts = {float(rate): n for rate, n in rate_counts.items()}
+        store._pkg_sorted = sorted(store._pkg_counts)
+        store._count = sum(store._pkg_counts.values())
+        for hosp, day, proc, count, amount_sum in hospital_cells:
+            store._add_hospital_day(hosp, to_date(day).toordinal(), proc, count, float(amount_sum))
+        for claim in patient_claims:
+            store._add_patient_claim(
+                claim["patient_id"], claim["procedure_code"], to_date(claim["admission_date"]).toordinal(),
+                claim["hospital_id"], float(claim["claim_amount"]),
+            )
+        return store
+
+    def scratch(self, claims: Iterable[dict]) -> "FeatureStateStore":
+        """
+        A private store holding a snapshot of just the state these claims'
+        features read: the procedure and package-rate statistics, and the
+        state of the claims' hospitals (at their admission days), patients
+        and patient+procedure pairs. It answers for, and can fold in, those
+        claims only, so a batch is featurized without copying the whole
+        store or holding its lock meanwhile.
+        """
+        days_by_hosp: dict[str, set] = {}
+        keys = set()
+        for claim in claims:
+            days_by_hosp.setdefault(claim["hospital_id"], set()).add(to_date(claim["admission_date"]).toordinal())
+            keys.add((claim["patient_id"], claim["procedure_code"]))
+
+        scratch = FeatureStateStore()
+        with self._lock:
+            scratch._count = self._count
+            scratch._proc = {q: list(stats) for q, stats in self._proc.items()}
+            scratch._pkg_counts = dict(self._pkg_counts)
+            scratch._pkg_sorted = list(self._pkg_sorted)
+            for hosp, days in days_by_hosp.items():
+                if hosp not in self._hosp_vol:
+                    continue
+                hosp_days = self._hosp_days[hosp]
+                scratch._hosp_days[hosp] = {day: hosp_days[day] for day in days if day in hosp_days}
+                scratch._hosp_vol[hosp] = list(self._hosp_vol[hosp])
+                scratch._hosp_cost[hosp] = {
+                    q: (_PrefixSnapshot(cnt_tree, days), _PrefixSnapshot(amt_tree, days))
+                    for q, (cnt_tree, amt_tree) in self._hosp_cost[hosp].items()
+                }
+            for pat, proc in keys:
+                if pat in self._patients and pat not in scratch._patients:
+                    p_days, p_hosps = self._patients[pat]
+                    scratch._patients[pat] = (list(p_days), list(p_hosps))
+                if (pat, proc) in self._patient_procs:
+                    pp_days, pp_amounts = self._patient_procs[(pat, proc)]
+                    scratch._patient_procs[(pat, proc)] = (list(pp_days), list(pp_amounts))
+        return scratch
+
+    # ── Feature computation ─────────────────────────────────────────────────
+    def history_for(self, claim: dict) -> dict:
+        """The history slice features_from_history() needs for this claim."""
+        day = to_date(claim["admission_date"]).toordinal()
+        hosp = claim["hospital_id"]
+        pat = claim["patient_id"]
+        proc = claim["procedure_code"]
+
+        with self._lock:
+            p_days, p_hosps = self._patients.get(pat, ((), ()))
+            lo30 = bisect_left(p_days, day - 30)
+            upto = bisect_right(p_days, day)
+
+            pp_days, pp_amounts = self._patient_procs.get((pat, proc), ((), ()))
+            pp_upto = bisect_right(pp_days, day)
+
+            hospital_cost = {}
+            for q, (cnt_tree, amt_tree) in self._hosp_cost.get(hosp, {}).items():
+                n_q = cnt_tree.prefix(day)
+                if n_q:
+                    hospital_cost[q] = (n_q, amt_tree.prefix(day))
+
+            return {
+                **self._shared_history(claim),
+                "patient_window": list(zip(p_days[lo30:upto], p_hosps[lo30:upto])),
+                "patient_last_day": p_days[upto - 1] if upto > 0 else None,
+                "hospital_cost": hospital_cost,
+                "patient_proc_last_amount": pp_amounts[pp_upto - 1] if pp_upto > 0 else None,
+                "patient_proc_recent": bisect_left(pp_days, day) > bisect_left(pp_days, day - 30),
+            }
+
+    def features_for(self, claim: dict) -> dict:
+        """Compute the feature row for a claim not yet folded into the store."""
+        return features_from_history(claim, self.history_for(claim))
+
+    def _shared_history(self, claim: dict, folded: bool = False) -> dict:
+        """
+        The slice fields taken over every claim, whatever its admission date.
+        folded=True: the claim has been added already and is left out again.
+        Copies all procedure moments and package-rate counts under the lock:
+        O(#procedures + #distinct rates).
+        """
+        day = to_date(claim["admission_date"]).toordinal()
+        hosp = claim["hospital_id"]
+        proc = claim["procedure_code"]
+
+        with self._lock:
+            proc_stats = {q: tuple(stats) for q, stats in self._proc.items()}
+            rates, counts, total = list(self._pkg_sorted), dict(self._pkg_counts), self._count
+            n_days, volume, sumsq = self._hosp_vol.get(hosp, (0, 0, 0))
+            day_count = self._hosp_days.get(hosp, {}).get(day, 0)
+
+        if folded:
+            rate = float(claim["package_rate"])
+            proc_stats[proc] = _unfold_moments(proc_stats[proc], float(claim["claim_amount"]))
+            total -= 1
+            counts[rate] -= 1
+            if not counts[rate]:
+                del counts[rate]
+                rates.remove(rate)
+            n_days -= 1 if day_count == 1 else 0
+            volume -= 1
+            sumsq -= day_count ** 2 - (day_count - 1) ** 2
+            day_count -= 1
+        return {
+            "proc_stats": proc_stats,
+            "package_rates": (rates, counts, total),
+            "hospital_volume": (n_days, volume, sumsq),
+            "hospital_day_count": day_count,
+        }
+
+
+def features_for_batch(state: FeatureStateStore, claims: list, sequential: bool = False) -> list:
+    """
+    Feature rows for new claims scored together, over `state`, which is
+    modified: pass a scratch store (FeatureStateStore.scratch, or one built
+    from_aggregates), never the live one.
+
+    By default each row matches compute_features(history + claims): every
+    other claim of the batch counts in the procedure, package-rate and
+    hospital-volume statistics, and those sorting before it (an earlier
+    admission date, or the same date and earlier in the list) are part of its
+    patient and hospital history. With sequential=True each claim is
+    featurized as if submitted on its own, in list order.
+    """
+    if sequential:
+        rows = []
+        for claim in claims:
+            rows.append(state.features_for(claim))
+            state.add(claim)
+        return rows
+
+    # `state` walks the batch in admission order for the order-dependent
+    # fields; `whole` holds all of it for the statistics over every claim
+    whole = state.scratch(claims)
+    for claim in claims:
+        whole.add(claim)
+    rows = [None] * len(claims)
+    for i in sorted(range(len(claims)), key=lambda i: to_date(claims[i]["admission_date"])):
+        history = state.history_for(claims[i])
+        history.update(whole._shared_history(claims[i], folded=True))
+        rows[i] = features_from_history(claims[i], history)
+        state.add(claims[i])
+    return rows
+
+
+# ── Feature math over a history slice ───────────────────────────────────────
+# A history slice describes everything before the claim that its features
+# depend on (days are date ordinals, "<= day" includes the claim's own date):
+#   proc_stats               {procedure_code: (n, mean, m2)} over all claims
+#   package_rates            (sorted distinct rates, {rate: count}, total claims)
+#   patient_window           [(day, hospital_id)] of the patient in [day-30, day]
+#   patient_last_day         patient's latest admission day <= day, or None
+#   hospital_volume          (n_days, Σcount, Σcount²) over the hospital's days
+#   hospital_day_count       hospital's claim count on the claim's day
+#   hospital_cost            {procedure_code: (count, Σamount)} at the hospital, <= day
+#   patient_proc_last_amount latest amount of this patient+procedure <= day, or None
+#   patient_proc_recent      patient+procedure has a claim in [day-30, day)
+# FeatureStateStore.history_for() and crud.get_feature_history() both produce it.
+def _moments(stats, extra: Optional[float] = None) -> tuple:
+    n, mean, m2 = stats
+    if extra is not None:
+        n += 1
+        delta = extra - mean
+        mean += delta / n
+        m2 += delta * (extra - mean)
+    std = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+    return mean, std
+
+
+def _unfold_moments(stats, value: float) -> tuple:
+    """(n, mean, m2) with one value taken back out: the Welford step reversed."""
+    n, mean, m2 = stats
+    if n <= 1:
+        return 0, 0.0, 0.0
+    n -= 1
+    prev_mean = mean - (value - mean) / n
+    return n, prev_mean, m2 - (value - prev_mean) * (value - mean)
+
+
+def _rate_at(rates: list, counts: dict, k: int, extra: float) -> float:
+    """k-th smallest package rate (0-based) with `extra` counted in; linear in len(rates)."""
+    seen = 0
+    extra_placed = False
+    for rate in rates:
+        if not extra_placed and extra <= rate:
+            if k == seen:
+                return extra
+            seen += 1
+            extra_placed = True
+        seen += counts[rate]
+        if k < seen:
+            return rate
+    return extra
+
+
+def _package_rate_q75(rates: list, counts: dict, total: int, extra: float) -> float:
+    # Same interpolation as numpy's "linear" percentile (used by Series.quantile)
+    n = total + 1
+    pos = 0.75 * (n - 1)
+    lo = int(math.floor(pos))
+    frac = pos - lo
+    a = _rate_at(rates, counts, lo, extra)
+    b = _rate_at(rates, counts, min(lo + 1, n - 1), extra)
+    diff = b - a
+    if frac >= 0.5:
+        return b - diff * (1 - frac)
+    return a + diff * frac
+
+
+def features_from_history(claim: dict, history: dict) -> dict:
+    """
+    Feature row for `claim` given its history slice. Matches the row
+    compute_features(history + [claim]) yields, the claim sorting after
+    existing claims that share its admission date.
+    """
+    adm = to_date(claim["admission_date"])
+    dis = to_date(claim["discharge_date"])
+    day = adm.toordinal()
+    amount = float(claim["claim_amount"])
+    rate = float(claim["package_rate"])
+    proc = claim["procedure_code"]
+    hosp = claim["hospital_id"]
+    pat = claim["patient_id"]
+    proc_stats = history["proc_stats"]
+
+    proc_mean, proc_std = _moments(proc_stats.get(proc, (0, 0.0, 0.0)), amount)
+    claim_amount_zscore = (amount - proc_mean) / (proc_std + _EPS)
+
+    stay = (dis - adm).days
+
+    window = history["patient_window"]
+    freq_30d = sum(1 for d, _ in window if d < day)
+    last_day = history["patient_last_day"]
+    days_since = float(day - last_day) if last_day is not None else _NO_PRIOR_CLAIM_DAYS
+    multi_hosp = 1 if len({h for d, h in window if day - 15 <= d < day}) > 1 else 0
+
+    n_days, total, sumsq = history["hospital_volume"]
+    prev = history["hospital_day_count"]
+    day_count = prev + 1
+    n_days += 1 if prev == 0 else 0
+    total += 1
+    sumsq += day_count ** 2 - prev ** 2
+    hosp_mean = total / n_days
+    hosp_std = (
+        math.sqrt((n_days * sumsq - total * total) / (n_days * (n_days - 1)))
+        if n_days > 1 else 0.0
+    )
+    hosp_vol_zscore = (day_count - hosp_mean) / (hosp_std + _EPS)
+
+    prior_n = 0.0
+    prior_z = 0.0
+    for q, (n_q, amount_sum) in history["hospital_cost"].items():
+        if n_q == 0:
+            continue
+        q_mean, q_std = (proc_mean, proc_std) if q == proc else _moments(proc_stats[q])
+        prior_n += n_q
+        prior_z += (amount_sum - n_q * q_mean) / (q_std + _EPS)
+    hosp_cost_dev = prior_z / prior_n if prior_n else 0.0
+
+    last = history["patient_proc_last_amount"]
+    repeat_dev = abs(amount - last) / last if last is not None else 1.0
+    same_proc_repeat = 1 if history["patient_proc_recent"] else 0
+
+    rates, counts, n_claims = history["package_rates"]
+    q75 = _package_rate_q75(rates, counts, n_claims, rate)
+
+    return {
+        "claim_id": claim["claim_id"],
+        "hospital_id": hosp,
+        "patient_id": pat,
+        "procedure_code": proc,
+        "package_rate": rate,
+        "claim_amount": amount,
+        "admission_date": adm,
+        "discharge_date": dis,
+        "is_inpatient": int(claim["is_inpatient"]),
+        "claim_amount_zscore": claim_amount_zscore,
+        "stay_duration_days": stay,
+        "claim_to_package_ratio": amount / rate,
+        "patient_claim_freq_30d": freq_30d,
+        "days_since_last_claim": days_since,
+        "hospital_claim_volume_zscore": hosp_vol_zscore,
+        "hospital_cost_deviation_index": hosp_cost_dev,
+        "repeat_claim_amount_deviation": float(repeat_dev),
+        "is_zero_day_stay": 1 if stay == 0 else 0,
+        "same_proc_repeat_flag": same_proc_repeat,
+        "is_high_cost_procedure": 1 if rate >= q75 else 0,
+        "patient_multi_hospital_flag": multi_hosp,
+    }
@@ -0,0 +1,136 @@
+"""
+Model Artifacts — memory-mappable export of the fraud model.
+
+The trained model ships as joblib pickles in data/models. Unpickling gives
+every worker process a private copy of the forest. The compiled export in
+data/models/compiled/ holds the same model as:
+
+  manifest.json  format version, hash of the source pickles, scaler mean/scale,
+                 anomaly bounds (A_min / A_max) and forest scalars
+  *.npy          CompiledForest node arrays
+
+Loaded with np.load(mmap_mode="r"), the arrays are read-only views of the OS
+page cache, so N workers on one host share a single physical copy and start
+without unpickling anything. The export is keyed by a hash of the pickles: a
+retrained model invalidates it and FraudEngine re-exports on the next load.
+
+    python -m backend.ml.model_artifacts [--model-dir DIR]   # (re)export
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Optional
+
+from backend.ml.compiled_forest import CompiledForest
+
+logger = logging.getLogger("model_artifacts")
+
+ARTIFACT_FORMAT_VERSION = 1
+PICKLE_ARTIFACTS = ["isolation_forest.pkl", "scaler.pkl", "anomaly_metadata.pkl", "feature_metadata.pkl"]
+COMPILED_DIRNAME = "compiled"
+_MANIFEST = "manifest.json"
+
+
+def compiled_dir(model_dir: str) -> str:
+    return os.path.join(model_dir, COMPILED_DIRNAME)
+
+
+def source_hash(model_dir: str) -> str:
+    """sha256 over the pickled artifacts, in PICKLE_ARTIFACTS order."""
+    digest = hashlib.sha256()
+    for name in PICKLE_ARTIFACTS:
+        with open(os.path.join(model_dir, name), "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def save_compiled_artifacts(
+    model_dir: str,
+    forest: CompiledForest,
+    scaler_mean,
+    scaler_scale,
+    a_min: float,
+    a_max: float,
+    verified_deviation: float,
+) -> str:
+    """
+    Write the compiled export next to the pickles. The directory is built under
+    a temporary name and swapped in with renames, so concurrent readers see
+    either the old export, the new one, or none (and fall back to pickles).
+    """
+    final = compiled_dir(model_dir)
+    staging = f"{final}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "source_sha256": source_hash(model_dir),
+        "scaler_mean": [float(v) for v in scaler_mean],
+        "scaler_scale": [float(v) for v in scaler_scale],
+        "A_min": float(a_min),
+        "A_max": float(a_max),
+        "forest": forest.save(staging),
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.n_nodes,
+        "verified_max_deviation": verified_deviation,
+    }
+    with open(os.path.join(staging, _MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    retired = f"{final}.old-{os.getpid()}"
+    if os.path.exists(final):
+        os.replace(final, retired)
+    os.replace(staging, final)
+    shutil.rmtree(retired, ignore_errors=True)
+    return final
+
+
+def load_compiled_artifacts(model_dir: str, mmap: bool = True) -> Optional[dict]:
+    """
+    Load the compiled export if present and built from the current pickles.
+    Returns {"forest", "scaler_mean", "scaler_scale", "A_min", "A_max", "manifest"}
+    or None when missing, stale or unreadable.
+    """
+    directory = compiled_dir(model_dir)
+    try:
+        with open(os.path.join(directory, _MANIFEST)) as fh:
+            manifest = json.load(fh)
+        if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            return None
+        if manifest.get("source_sha256") != source_hash(model_dir):
+            logger.info("Compiled model export is stale (pickles changed).")
+            return None
+        forest = CompiledForest.load(directory, manifest["forest"], mmap=mmap)
+    except (OSError, ValueError, KeyError) as exc:
+        logger.info("Compiled model export unavailable: %s", exc)
+        return None
+    return {
+        "forest": forest,
+        "scaler_mean": manifest["scaler_mean"],
+        "scaler_scale": manifest["scaler_scale"],
+        "A_min": manifest["A_min"],
+        "A_max": manifest["A_max"],
+        "manifest": manifest,
+    }
+
+
+def main():
+    from backend.ml.risk_engine import FraudEngine, _MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="Export memory-mappable model artifacts.")
+    parser.add_argument("--model-dir", default=os.path.abspath(_MODEL_DIR))
+    args = parser.parse_args()
+
+    engine = FraudEngine(model_dir=args.model_dir)
+    path = engine.export_compiled()
+    print(f"Compiled model written to {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,9 +1,17 @@
+import logging
 import numpy as np
 import pandas as pd
 import joblib
 import os
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+from backend.ml.compiled_forest import CompiledForest
+from backend.ml.model_artifacts import (
+    PICKLE_ARTIFACTS, load_compiled_artifacts, save_compiled_artifacts, source_hash,
+)
+
+logger = logging.getLogger("risk_engine")
 
 CONTINUOUS_FEATURES = [
     "claim_amount_zscore", "stay_duration_days", "claim_to_package_ratio",
@@ -13,9 +21,26 @@ CONTINUOUS_FEATURES = [
 BINARY_FEATURES = [
     "is_zero_day_stay", "same_proc_repeat_flag", "is_high_cost_procedure", "patient_multi_hospital_flag",
 ]
+# Column order of the feature matrix accepted by FraudEngine.score_batch
+MODEL_FEATURES = CONTINUOUS_FEATURES + BINARY_FEATURES
+_N_CONTINUOUS = len(CONTINUOUS_FEATURES)
+_COL = {name: i for i, name in enumerate(MODEL_FEATURES)}
 
 _MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "models")
 
+# "compiled": packed-array forest (falls back to sklearn if verification fails)
+# "sklearn": IsolationForest.score_samples
+SCORERS = ("compiled", "sklearn")
+DEFAULT_SCORER = os.getenv("FRAUD_SCORER", "compiled").lower()
+# Above this many rows sklearn's Cython traversal outpaces the NumPy one
+# (measured crossover ~1.5k rows), so large batches go to sklearn either way.
+COMPILED_MAX_ROWS = int(os.getenv("FRAUD_COMPILED_MAX_ROWS", "1024"))
+_VERIFY_PROBES = 512
+# Map the compiled export's arrays instead of reading them into private memory,
+# and write that export from the pickles when it is missing or stale.
+MODEL_MMAP = os.getenv("FRAUD_MODEL_MMAP", "true").lower() == "true"
+MODEL_AUTO_EXPORT = os.getenv("FRAUD_MODEL_AUTO_EXPORT", "true").lower() == "true"
+
 
 def classify_risk(score: float) -> str:
     if score <= 0.30:
@@ -26,62 +51,216 @@ def classify_risk(score: float) -> str:
 
 
 class FraudEngine:
-    def __init__(self):
+    def __init__(self, model_dir: Optional[str] = None):
+        self.model_dir = os.path.abspath(model_dir or _MODEL_DIR)
         self.iso_forest = None
         self.scaler = None
         self.A_min = None
         self.A_max = None
         self.feature_metadata = None
+        self._scaler_mean = None
+        self._scaler_scale = None
+        self.compiled_forest = None
+        self.scorer = None
+        self.artifact_source = None
+        self.model_version = None  # sha256 of the pickled artifacts this engine was built from
+        self.loaded_at = None
+        self._verified_deviation = None
+        self._sklearn_lock = threading.Lock()
 
-    def load(self):
-        model_dir = os.path.abspath(_MODEL_DIR)
-        required = ["isolation_forest.pkl", "scaler.pkl", "anomaly_metadata.pkl", "feature_metadata.pkl"]
-        missing = [f for f in required if not os.path.exists(os.path.join(model_dir, f))]
+    def load(self, scorer: Optional[str] = None, mmap: bool = MODEL_MMAP):
+        """
+        Load artifacts; `scorer` is one of SCORERS (default FRAUD_SCORER).
+        The compiled scorer prefers the memory-mapped export (no unpickling) and
+        builds + exports it from the pickles when missing or stale.
+        """
+        scorer = (scorer or DEFAULT_SCORER).lower()
+        if scorer not in SCORERS:
+            raise RuntimeError(f"Unknown scorer '{scorer}'; expected one of {SCORERS}")
+        missing = [f for f in PICKLE_ARTIFACTS if not os.path.exists(os.path.join(self.model_dir, f))]
         if missing:
             raise RuntimeError(f"Model artifacts missing: {missing}")
+
+        self.iso_forest = None
+        self.compiled_forest = None
+        self.scorer = None
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        if scorer == "compiled":
+            bundle = load_compiled_artifacts(self.model_dir, mmap=mmap)
+            if bundle is not None:
+                self._use_compiled_bundle(bundle)
+                self.model_version = bundle["manifest"]["source_sha256"]
+                return
+
+        self.model_version = source_hash(self.model_dir)
+        self._load_pickles()
+        self.scorer = "sklearn"
+        self.artifact_source = "pickle"
+        if scorer == "compiled":
+            self._compile()
+            if self.compiled_forest is not None and MODEL_AUTO_EXPORT:
+                try:
+                    self._save_compiled()
+                    bundle = load_compiled_artifacts(self.model_dir, mmap=mmap)
+                    if bundle is not None:
+                        self.compiled_forest = bundle["forest"]
+                        self.artifact_source = "compiled-export"
+                except OSError as exc:
+                    logger.warning("Could not export compiled model: %s", exc)
+
+    def _load_pickles(self):
+        model_dir = self.model_dir
         try:
-            self.iso_forest = joblib.load(os.path.join(model_dir, "isolation_forest.pkl"))
+            iso_forest = joblib.load(os.path.join(model_dir, "isolation_forest.pkl"))
             self.scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
             meta = joblib.load(os.path.join(model_dir, "anomaly_metadata.pkl"))
             self.A_min = meta["A_min"]
             self.A_max = meta["A_max"]
             self.feature_metadata = joblib.load(os.path.join(model_dir, "feature_metadata.pkl"))
+            # StandardScaler.transform is (X - mean_) / scale_; applied inline in score_batch
+            self._scaler_mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+            self._scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float64)
         except Exception as exc:
             self.iso_forest = None
             raise RuntimeError(f"Failed to load model artifacts: {exc}") from exc
+        self.iso_forest = iso_forest
+
+    def _use_compiled_bundle(self, bundle: dict):
+        self.compiled_forest = bundle["forest"]
+        self._scaler_mean = np.asarray(bundle["scaler_mean"], dtype=np.float64)
+        self._scaler_scale = np.asarray(bundle["scaler_scale"], dtype=np.float64)
+        self.A_min = bundle["A_min"]
+        self.A_max = bundle["A_max"]
+        self.scorer = "compiled"
+        self.artifact_source = "compiled-export"
+        logger.info(
+            "Compiled forest mapped from export: %d trees, %d nodes",
+            self.compiled_forest.n_trees, self.compiled_forest.n_nodes,
+        )
+
+    def _save_compiled(self) -> str:
+        return save_compiled_artifacts(
+            self.model_dir, self.compiled_forest, self._scaler_mean, self._scaler_scale,
+            self.A_min, self.A_max, self._verified_deviation,
+        )
+
+    def export_compiled(self) -> str:
+        """Build, verify and write the memory-mappable export. Returns its directory."""
+        self._load_pickles()
+        self._compile()
+        if self.compiled_forest is None:
+            raise RuntimeError("Compiled forest failed verification; nothing exported.")
+        return self._save_compiled()
+
+    def _ensure_sklearn(self):
+        # Engines mapped from the export only unpickle the forest if a batch
+        # too large for the compiled path actually arrives.
+        if self.iso_forest is None:
+            with self._sklearn_lock:
+                if self.iso_forest is None:
+                    self._load_pickles()
+
+    def _sklearn_raw_scores(self, X: np.ndarray) -> np.ndarray:
+        self._ensure_sklearn()
+        X_inf = np.array(X, dtype=np.float64)
+        X_inf[:, :_N_CONTINUOUS] -= self._scaler_mean
+        X_inf[:, :_N_CONTINUOUS] /= self._scaler_scale
+        return self.iso_forest.score_samples(X_inf)
+
+    def _compile(self):
+        """Build the compiled forest and check it against sklearn on probe rows."""
+        try:
+            compiled = CompiledForest.from_sklearn(self.iso_forest, self._scaler_mean, self._scaler_scale)
+            rng = np.random.default_rng(0)
+            probes = np.empty((_VERIFY_PROBES, len(MODEL_FEATURES)))
+            probes[:, :_N_CONTINUOUS] = self._scaler_mean + self._scaler_scale * rng.normal(0.0, 2.0, (_VERIFY_PROBES, _N_CONTINUOUS))
+            probes[:, _N_CONTINUOUS:] = rng.integers(0, 2, (_VERIFY_PROBES, len(BINARY_FEATURES)))
+            diff = compiled.verify_against(self._sklearn_raw_scores, probes)
+        except Exception as exc:
+            logger.warning("Compiled forest unavailable, scoring with sklearn: %s", exc)
+            return
+        self.compiled_forest = compiled
+        self._verified_deviation = diff
+        self.scorer = "compiled"
+        logger.info(
+            "Compiled forest ready: %d trees, %d nodes, depth %d (max deviation %.2g)",
+            compiled.n_trees, compiled.n_nodes, compiled.max_depth, diff,
+        )
 
     @property
     def is_ready(self) -> bool:
-        return self.iso_forest is not None
+        return self.iso_forest is not None or self.compiled_forest is not None
 
 
-    def score_row(self, feat_row: pd.Series) -> dict:
-        X_cont = self.scaler.transform(feat_row[CONTINUOUS_FEATURES].values.reshape(1, -1))
-        X_bin = feat_row[BINARY_FEATURES].values.reshape(1, -1)
-        X_inf = np.hstack([X_cont, X_bin])
+    def score_batch(self, X: np.ndarray, is_inpatient: np.ndarray) -> dict:
+        """
+        Score a feature matrix in MODEL_FEATURES column order (float32/float64, shape (n, 12)).
+        `is_inpatient` (shape (n,)) feeds the zero-day inpatient rule.
+        Returns struct-of-arrays: anomaly_score_norm, rule_score_norm and
+        final_risk_score (float64, rounded to 6 dp) and risk_level (str array).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        is_inpatient = np.asarray(is_inpatient).reshape(-1)
 
-        raw = self.iso_forest.score_samples(X_inf)
+        if self.compiled_forest is not None and len(X) <= COMPILED_MAX_ROWS:
+            raw = self.compiled_forest.score_samples(X)
+        else:
+            raw = self._sklearn_raw_scores(X)
         denom = (self.A_max - self.A_min) if (self.A_max - self.A_min) != 0 else 1e-6
-        a_norm = float(np.clip((self.A_max - raw) / denom, 0.0, 1.0)[0])
-
-        r_raw = 0.0
-        r_raw += 30.0 if (feat_row["is_zero_day_stay"] == 1 and feat_row["is_inpatient"] == 1) else 0.0
-        r_raw += 25.0 if feat_row["claim_amount_zscore"] > 2.0 else 0.0
-        r_raw += 20.0 if feat_row["same_proc_repeat_flag"] == 1 else 0.0
-        r_raw += 15.0 if feat_row["claim_to_package_ratio"] > 0.95 else 0.0
-        r_raw += 10.0 if feat_row["patient_claim_freq_30d"] >= 3 else 0.0
-        r_norm = r_raw / 100.0
+        a_norm = np.clip((self.A_max - raw) / denom, 0.0, 1.0)
 
+        r_raw = (
+            30.0 * ((X[:, _COL["is_zero_day_stay"]] == 1) & (is_inpatient == 1))
+            + 25.0 * (X[:, _COL["claim_amount_zscore"]] > 2.0)
+            + 20.0 * (X[:, _COL["same_proc_repeat_flag"]] == 1)
+            + 15.0 * (X[:, _COL["claim_to_package_ratio"]] > 0.95)
+            + 10.0 * (X[:, _COL["patient_claim_freq_30d"]] >= 3)
+        )
+        r_norm = r_raw / 100.0
         final = 0.70 * r_norm + 0.30 * a_norm
 
         return {
-            "anomaly_score_norm": round(a_norm, 6),
-            "rule_score_norm": round(r_norm, 6),
-            "final_risk_score": round(final, 6),
-            "risk_level": classify_risk(final),
+            "anomaly_score_norm": np.round(a_norm, 6),
+            "rule_score_norm": np.round(r_norm, 6),
+            "final_risk_score": np.round(final, 6),
+            "risk_level": np.where(final <= 0.30, "LOW", np.where(final <= 0.60, "MEDIUM", "HIGH")),
+        }
+
+    def score_row(self, feat_row: pd.Series) -> dict:
+        X = feat_row[MODEL_FEATURES].to_numpy(dtype=np.float64)
+        batch = self.score_batch(X, np.array([feat_row["is_inpatient"]]))
+        return {
+            "anomaly_score_norm": float(batch["anomaly_score_norm"][0]),
+            "rule_score_norm": float(batch["rule_score_norm"][0]),
+            "final_risk_score": float(batch["final_risk_score"][0]),
+            "risk_level": str(batch["risk_level"][0]),
             "feat_row": feat_row,
         }
 
+    def score_frame(self, df_features: pd.DataFrame) -> list:
+        """
+        Score many feature rows with one matrix call.
+        Returns one dict per row, same keys as score_row (without feat_row).
+        """
+        batch = self.score_batch(
+            df_features[MODEL_FEATURES].to_numpy(dtype=np.float64),
+            df_features["is_inpatient"].to_numpy(),
+        )
+        return [
+            {
+                "anomaly_score_norm": float(a),
+                "rule_score_norm": float(r),
+                "final_risk_score": float(f),
+                "risk_level": str(level),
+            }
+            for a, r, f, level in zip(
+                batch["anomaly_score_norm"], batch["rule_score_norm"],
+                batch["final_risk_score"], batch["risk_level"],
+            )
+        ]
+
 
 def get_fraud_engine() -> FraudEngine:
     """
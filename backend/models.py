@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, Text, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, String, Float, Integer, Text, Date, DateTime, ForeignKey, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from backend.database import Base
@@ -40,6 +40,19 @@ class Claim(Base):
     fraud_analysis = relationship("FraudAnalysis", back_populates="claim", uselist=False)
     investigation_reports = relationship("InvestigationReport", back_populates="claim", order_by="InvestigationReport.generated_at.desc()")
 
+    # Patient window scans behind crud.get_feature_history; submission-order
+    # keyset paging behind crud.get_claims_page_by_submission; per-hospital and
+    # per-user profile / loss queries; GET /claims ordering. Created by
+    # backend.migrations.
+    __table_args__ = (
+        Index("ix_claims_patient_admission", "patient_id", "admission_date"),
+        Index("ix_claims_patient_proc_admission", "patient_id", "procedure_code", "admission_date"),
+        Index("ix_claims_created_claim", "created_at", "claim_id"),
+        Index("ix_claims_hospital_created", "hospital_id", "created_at"),
+        Index("ix_claims_user_created", "user_id", "created_at"),
+        Index("ix_claims_amount_claim", "claim_amount", "claim_id"),
+    )
+
 
 class FraudAnalysis(Base):
     __tablename__ = "fraud_analysis"
@@ -71,6 +84,13 @@ class FraudAnalysis(Base):
 
     claim = relationship("Claim", back_populates="fraud_analysis")
 
+    # Threat / risk level filters and ranking by composite index
+    __table_args__ = (
+        Index("ix_fraud_analysis_threat_composite", "threat_level", "composite_index"),
+        Index("ix_fraud_analysis_risk_level", "risk_level"),
+        Index("ix_fraud_analysis_composite_claim", "composite_index", "claim_id"),
+    )
+
 
 class InvestigationReport(Base):
     __tablename__ = "investigation_reports"
@@ -88,6 +108,11 @@ class InvestigationReport(Base):
 
     claim = relationship("Claim", back_populates="investigation_reports")
 
+    # Latest report per claim (crud.get_latest_report_by_claim_id)
+    __table_args__ = (
+        Index("ix_investigation_reports_claim_generated", "claim_id", "generated_at"),
+    )
+
 
 class RuleConfig(Base):
     __tablename__ = "rule_config"
@@ -108,3 +133,114 @@ class SystemConfig(Base):
     config_key = Column(String, unique=True, nullable=False, index=True)
     config_value = Column(String, nullable=False)
     description = Column(String, nullable=True)
+
+
+class CacheVersion(Base):
+    """Monotonic version counters used to invalidate per-process caches across workers."""
+    __tablename__ = "cache_versions"
+
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+
+
+class IdempotencyKey(Base):
+    """Client-supplied Idempotency-Key → the claim its first request created."""
+    __tablename__ = "idempotency_keys"
+
+    idempotency_key = Column(String, primary_key=True)
+    claim_id = Column(String, ForeignKey("claims.claim_id"), nullable=False)
+    request_hash = Column(String, nullable=False)  # sha256 of the canonical claim payload
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class ClaimFeature(Base):
+    """
+    The engineered features a claim was scored with (risk_engine.MODEL_FEATURES
+    plus is_inpatient), written alongside its FraudAnalysis. feature_version is
+    feature_engineering.FEATURE_VERSION at the time the row was computed.
+    """
+    __tablename__ = "claim_features"
+
+    claim_id = Column(String, ForeignKey("claims.claim_id"), primary_key=True)
+    feature_version = Column(String, nullable=False)
+
+    claim_amount_zscore = Column(Float, nullable=False)
+    stay_duration_days = Column(Float, nullable=False)
+    claim_to_package_ratio = Column(Float, nullable=False)
+    patient_claim_freq_30d = Column(Float, nullable=False)
+    days_since_last_claim = Column(Float, nullable=False)
+    hospital_claim_volume_zscore = Column(Float, nullable=False)
+    hospital_cost_deviation_index = Column(Float, nullable=False)
+    repeat_claim_amount_deviation = Column(Float, nullable=False)
+    is_zero_day_stay = Column(Integer, nullable=False)
+    same_proc_repeat_flag = Column(Integer, nullable=False)
+    is_high_cost_procedure = Column(Integer, nullable=False)
+    patient_multi_hospital_flag = Column(Integer, nullable=False)
+    is_inpatient = Column(Integer, nullable=False)
+
+    computed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+# ── Feature aggregates ──────────────────────────────────────────────────────
+# Maintained alongside every claim insert (crud._fold_feature_aggregates) so
+# single-claim feature history never scans the claims table.
+class ProcedureAmountStats(Base):
+    __tablename__ = "procedure_amount_stats"
+
+    procedure_code = Column(String, primary_key=True)
+    claim_count = Column(Integer, nullable=False, default=0)
+    amount_mean = Column(Float, nullable=False, default=0.0)
+    amount_m2 = Column(Float, nullable=False, default=0.0)  # Σ(x - mean)²
+
+
+class PackageRateCount(Base):
+    __tablename__ = "package_rate_counts"
+
+    package_rate = Column(Float, primary_key=True)
+    claim_count = Column(Integer, nullable=False, default=0)
+
+
+class HospitalProcedureDaily(Base):
+    __tablename__ = "hospital_procedure_daily"
+
+    hospital_id = Column(String, primary_key=True)
+    admission_date = Column(String, primary_key=True)
+    procedure_code = Column(String, primary_key=True)
+    claim_count = Column(Integer, nullable=False, default=0)
+    amount_sum = Column(Float, nullable=False, default=0.0)
+
+
+# ── Analysis aggregates ─────────────────────────────────────────────────────
+# Maintained alongside every FraudAnalysis insert and rewrite
+# (crud._fold_analysis_rollup) so the dashboard metrics never scan
+# fraud_analysis.
+class AnalysisRollup(Base):
+    __tablename__ = "analysis_rollup"
+
+    threat_level = Column(String, primary_key=True)  # NULL (pre-intelligence rows) counted as LOW
+    risk_level = Column(String, primary_key=True)
+    anomaly_band = Column(String, primary_key=True)  # signal_vector.anomaly_intensity_band
+    hard_stop = Column(Boolean, primary_key=True)
+    claim_count = Column(Integer, nullable=False, default=0)
+    composite_sum = Column(Float, nullable=False, default=0.0)
+    final_risk_sum = Column(Float, nullable=False, default=0.0)
+
+
+# Per hospital and UTC day of claim submission (claims.created_at), maintained
+# alongside every FraudAnalysis insert and rewrite (crud._fold_hospital_loss)
+# so hospital loss over any date range sums rollup rows, never the fact tables.
+class HospitalLossDaily(Base):
+    __tablename__ = "hospital_loss_daily"
+
+    hospital_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    claim_count = Column(Integer, nullable=False, default=0)
+    high_risk_count = Column(Integer, nullable=False, default=0)  # composite_index >= 70
+    claim_amount_sum = Column(Float, nullable=False, default=0.0)
+    risk_weighted_loss = Column(Float, nullable=False, default=0.0)  # Σ claim_amount × final_risk_score
+
+    __table_args__ = (
+        Index("ix_hospital_loss_daily_day", "day"),
+    )
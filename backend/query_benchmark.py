@@ -0,0 +1,253 @@
+"""
+Query Benchmark — plans and latencies of the hot read paths, before and after
+the hot_path_indexes migration.
+
+Builds (or reuses) a synthetic dataset of --rows claims with one FraudAnalysis
+each, a few hundred users and investigation reports for 5% of claims, drops
+the HOT_PATH_INDEXES, then for each query prints the planner's plan and the
+median latency over --repeat runs; creates the indexes and repeats.
+
+    python -m backend.query_benchmark --rows 1000000
+    python -m backend.query_benchmark --database-url postgresql://... --rows 1000000
+
+Without --database-url a throwaway SQLite file in the temp directory is used.
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import DateTime, bindparam, create_engine, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.migrations import HOT_PATH_INDEXES, create_indexes, drop_indexes, migrate
+from backend.models import Claim, FraudAnalysis, InvestigationReport, User
+
+logger = logging.getLogger("query_benchmark")
+
+_N_HOSPITALS = 500
+_N_USERS = 200
+_PATIENTS_PER_CLAIM = 0.2
+_SPAN_DAYS = 365
+_THREAT_LEVELS = np.array(["LOW", "MEDIUM", "HIGH", "CRITICAL"])
+_RISK_LEVELS = np.array(["LOW", "MEDIUM", "HIGH"])
+_INSERT_CHUNK = 20_000
+
+_NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# (name, SQL, params) — the shapes of the dashboard / profile / report queries
+QUERIES = [
+    (
+        "user_profile_claims",
+        "SELECT claim_id, claim_amount FROM claims WHERE user_id = :user_id ORDER BY created_at DESC",
+        {"user_id": 7},
+    ),
+    (
+        "hospital_profile_claims",
+        "SELECT claim_id, claim_amount FROM claims WHERE hospital_id = :hospital_id",
+        {"hospital_id": "HB0042"},
+    ),
+    (
+        "hospital_claims_last_30d",
+        "SELECT count(*), sum(claim_amount) FROM claims WHERE hospital_id = :hospital_id AND created_at >= :since",
+        {"hospital_id": "HB0042", "since": _NOW - timedelta(days=30)},
+    ),
+    (
+        "critical_queue_top_50",
+        "SELECT claim_id, composite_index FROM fraud_analysis WHERE threat_level = 'CRITICAL' "
+        "ORDER BY composite_index DESC LIMIT 50",
+        {},
+    ),
+    (
+        "threat_level_counts",
+        "SELECT threat_level, count(*) FROM fraud_analysis GROUP BY threat_level",
+        {},
+    ),
+    (
+        "high_risk_count",
+        "SELECT count(*) FROM fraud_analysis WHERE risk_level = 'HIGH'",
+        {},
+    ),
+    (
+        "latest_report_for_claim",
+        "SELECT id, generated_at FROM investigation_reports WHERE claim_id = :claim_id "
+        "ORDER BY generated_at DESC LIMIT 1",
+        {"claim_id": "QB0000040"},
+    ),
+]
+
+
+def _statement(sql: str, params: dict):
+    stmt = text(sql)
+    if "since" in params:
+        stmt = stmt.bindparams(bindparam("since", type_=DateTime(timezone=True)))
+    return stmt
+
+
+# ── Dataset ──────────────────────────────────────────────────────────────────
+def _populate(bind: Engine, rows: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    with bind.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"bench{i}@example.org", "role": "AUDITOR", "is_active": True, "auth_provider": "LOCAL"}
+            for i in range(1, _N_USERS + 1)
+        ])
+
+    n_patients = max(1, int(rows * _PATIENTS_PER_CLAIM))
+    for start in range(0, rows, _INSERT_CHUNK):
+        n = min(_INSERT_CHUNK, rows - start)
+        hospitals = rng.integers(0, _N_HOSPITALS, n)
+        patients = rng.integers(0, n_patients, n)
+        users = rng.integers(1, _N_USERS + 1, n)
+        amounts = np.round(rng.uniform(4000, 80000, n), 2)
+        admitted = rng.integers(0, _SPAN_DAYS, n)
+        created = rng.uniform(0, _SPAN_DAYS * 86400, n)
+        composite = rng.integers(0, 101, n)
+        threat = _THREAT_LEVELS[np.minimum(composite // 26, 3)]
+        risk = _RISK_LEVELS[np.minimum(composite // 34, 2)]
+
+        claims, analyses, reports = [], [], []
+        for i in range(n):
+            claim_id = f"QB{start + i:07d}"
+            admission = (_NOW - timedelta(days=int(admitted[i]))).date()
+            claims.append({
+                "claim_id": claim_id,
+                "hospital_id": f"HB{hospitals[i]:04d}",
+                "patient_id": f"PB{patients[i]:07d}",
+                "procedure_code": f"P{1 + (start + i) % 8}",
+                "package_rate": float(amounts[i]),
+                "claim_amount": float(amounts[i]),
+                "admission_date": admission.isoformat(),
+                "discharge_date": admission.isoformat(),
+                "is_inpatient": 0,
+                "user_id": int(users[i]),
+                "created_at": _NOW - timedelta(seconds=float(created[i])),
+            })
+            score = float(composite[i]) / 100
+            analyses.append({
+                "claim_id": claim_id,
+                "anomaly_score_norm": score,
+                "rule_score_norm": score,
+                "final_risk_score": score,
+                "risk_level": str(risk[i]),
+                "fraud_pattern_detected": "NONE",
+                "investigation_priority": "AUTO_APPROVE",
+                "rule_triggers": {},
+                "risk_breakdown": {},
+                "explanation": "",
+                "composite_index": int(composite[i]),
+                "threat_level": str(threat[i]),
+                "confidence_score": 50.0,
+                "enforcement_state": "CLEAR",
+                "signal_vector": {},
+                "knowledge_signals": [],
+                "hard_stop": False,
+            })
+            if (start + i) % 20 == 0:
+                for version in range(2):
+                    reports.append({
+                        "claim_id": claim_id,
+                        "report_text": "",
+                        "model_name": "benchmark",
+                        "generated_at": _NOW - timedelta(days=version),
+                        "generation_status": "SUCCESS",
+                        "version": "1.0",
+                    })
+        with bind.begin() as conn:
+            conn.execute(insert(Claim), claims)
+            conn.execute(insert(FraudAnalysis), analyses)
+            if reports:
+                conn.execute(insert(InvestigationReport), reports)
+        logger.info("Inserted %d / %d claims.", start + n, rows)
+
+
+# ── Measurement ──────────────────────────────────────────────────────────────
+def _analyze(bind: Engine):
+    with bind.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def _plan(conn: Connection, sql: str, params: dict) -> list:
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(_statement("EXPLAIN QUERY PLAN " + sql, params), params)
+        return [row[-1] for row in rows]
+    rows = conn.execute(_statement("EXPLAIN " + sql, params), params)
+    return [row[0] for row in rows]
+
+
+def _median_ms(conn: Connection, sql: str, params: dict, repeat: int) -> float:
+    stmt = _statement(sql, params)
+    conn.execute(stmt, params).fetchall()  # warm the page cache
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(stmt, params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure(bind: Engine, repeat: int) -> dict:
+    """{query name: {"ms": median latency, "plan": [plan lines]}}."""
+    results = {}
+    with bind.connect() as conn:
+        for name, sql, params in QUERIES:
+            results[name] = {
+                "ms": _median_ms(conn, sql, params, repeat),
+                "plan": _plan(conn, sql, params),
+            }
+    return results
+
+
+def _report(before: dict, after: dict):
+    print(f"\n{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, _, _ in QUERIES:
+        b, a = before[name]["ms"], after[name]["ms"]
+        print(f"{name:<28}{b:>12.2f}{a:>12.2f}{b / a if a else float('inf'):>9.1f}x")
+    for name, _, _ in QUERIES:
+        print(f"\n{name}")
+        print("  before: " + "\n          ".join(before[name]["plan"]))
+        print("  after:  " + "\n          ".join(after[name]["plan"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot query paths before and after the hot-path indexes.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Claims to generate (if the database is empty).")
+    parser.add_argument("--database-url", default=None, help="Defaults to a throwaway SQLite file.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_benchmark.db")
+    bind = create_engine(url)
+    migrate(bind)
+
+    with bind.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(Claim)).scalar()
+    if not existing:
+        started = time.perf_counter()
+        _populate(bind, args.rows)
+        logger.info("Dataset built in %.1fs.", time.perf_counter() - started)
+    else:
+        logger.info("Reusing %d existing claims.", existing)
+
+    with bind.begin() as conn:
+        drop_indexes(conn, HOT_PATH_INDEXES)
+    _analyze(bind)
+    before = measure(bind, args.repeat)
+
+    started = time.perf_counter()
+    with bind.begin() as conn:
+        create_indexes(conn, HOT_PATH_INDEXES)
+    logger.info("Hot-path indexes built in %.1fs.", time.perf_counter() - started)
+    _analyze(bind)
+    after = measure(bind, args.repeat)
+
+    _report(before, after)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,26 +1,35 @@
 """
-Analytics Router — user fraud profiling + hospital risk intelligence + CSV export.
+Analytics Router — user fraud profiling + hospital risk intelligence + dataset export.
 All calculations are DB-driven via analytics_service.
 """
-import csv
-import io
 import logging
+from datetime import date
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from backend.database import get_db
 from backend import crud
-from backend.models import Claim, FraudAnalysis
 from backend.auth_utils import get_current_user
-from backend.services.analytics_service import build_user_profile, build_hospital_profile
-from backend.schemas import HospitalLossItem
-from backend.services.fraud_analytics_service import get_hospital_loss
+from backend.services.analytics_service import (
+    build_user_profile, build_hospital_profile, build_user_profiles, build_hospital_profiles,
+)
+from backend.schemas import HospitalLossBucket, HospitalLossItem
+from backend.services.fraud_analytics_service import get_hospital_loss, get_hospital_loss_series
+from backend.services.export_service import columnar_export_available, stream_columnar, stream_csv
+from backend.services.response_cache import cached_response
 
 logger = logging.getLogger("analytics_router")
 
 router = APIRouter()
 
+MAX_BATCH_PROFILES = 1000
+
+
+def _check_batch(ids: Optional[list]):
+    if ids is not None and len(ids) > MAX_BATCH_PROFILES:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_PROFILES} ids per request.")
+
 
 @router.get("/analytics/user/{user_id}")
 def user_analytics(user_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -31,80 +40,117 @@ def user_analytics(user_id: int, db: Session = Depends(get_db), current_user: di
 
 
 @router.get("/analytics/hospital/{hospital_id}")
-def hospital_analytics(hospital_id: str, db: Session = Depends(get_db)):
-    return build_hospital_profile(hospital_id, db)
+def hospital_analytics(hospital_id: str, request: Request, db: Session = Depends(get_db)):
+    return cached_response(request, db, lambda: build_hospital_profile(hospital_id, db))
+
+
+@router.get("/analytics/users")
+def users_analytics(
+    user_id: Optional[List[int]] = Query(default=None, description="Repeat for each user; omit for every user with claims."),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    _check_batch(user_id)
+    return build_user_profiles(user_id, db)
+
+
+@router.get("/analytics/hospitals")
+def hospitals_analytics(
+    hospital_id: Optional[List[str]] = Query(default=None, description="Repeat for each hospital; omit for every hospital."),
+    db: Session = Depends(get_db),
+):
+    _check_batch(hospital_id)
+    return build_hospital_profiles(hospital_id, db)
+
+
+# format → (media type, file extension)
+_EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
 
 
 @router.get("/export/dataset")
-def export_dataset_csv(db: Session = Depends(get_db)):
+def export_dataset(
+    format: str = Query(default="csv", pattern="^(csv|parquet|arrow)$", description="csv, parquet or arrow (IPC stream)."),
+    admission_from: Optional[date] = Query(default=None),
+    admission_to: Optional[date] = Query(default=None),
+    hospital_id: Optional[str] = Query(default=None),
+    threat_level: Optional[str] = Query(default=None, pattern="^(LOW|MEDIUM|HIGH|CRITICAL)$"),
+    gzip: bool = Query(default=False, description="Stream the CSV gzip-compressed (.csv.gz)."),
+):
     """
-    Server-side CSV export of all claims + fraud analysis.
-    No frontend-only filtering — all data comes from DB.
+    Server-side export of scored claims + fraud analysis, filtered in SQL
+    and streamed as it is read. No frontend-only filtering — all data comes from DB.
+    parquet / arrow carry typed columns, rule trigger booleans, signal vector
+    fields and the stored model features.
     """
-    claims = db.query(Claim).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    writer.writerow([
-        "Claim ID",
-        "Hospital",
-        "Patient",
-        "Procedure",
-        "Amount",
-        "Package Rate",
-        "Admission Date",
-        "Discharge Date",
-        "Composite Score",
-        "Threat Level",
-        "Confidence Score",
-        "Fraud Pattern",
-        "Enforcement State",
-        "Investigation Priority",
-    ])
-
-    for claim in claims:
-        analysis = db.query(FraudAnalysis).filter(FraudAnalysis.claim_id == claim.claim_id).first()
-        if not analysis:
-            continue
-
-        writer.writerow([
-            claim.claim_id,
-            claim.hospital_id,
-            claim.patient_id,
-            claim.procedure_code,
-            claim.claim_amount,
-            claim.package_rate,
-            claim.admission_date,
-            claim.discharge_date,
-            analysis.composite_index,
-            analysis.threat_level,
-            analysis.confidence_score,
-            analysis.fraud_pattern_detected,
-            analysis.enforcement_state,
-            analysis.investigation_priority,
-        ])
-
-    output.seek(0)
-
+    filters = {
+        "admission_from": admission_from,
+        "admission_to": admission_to,
+        "hospital_id": hospital_id,
+        "threat_level": threat_level,
+    }
+    media_type, extension = _EXPORT_FORMATS[format]
+    if format == "csv":
+        body = stream_csv(filters, compress=gzip)
+        if gzip:
+            media_type, extension = "application/gzip", "csv.gz"
+    else:
+        if not columnar_export_available():
+            raise HTTPException(status_code=501, detail="Parquet / Arrow export needs the pyarrow package on the server.")
+        body = stream_columnar(filters, format)
     return StreamingResponse(
-        output,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=pmjay_dataset_export.csv"}
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=pmjay_dataset_export.{extension}"}
     )
 
 
+def _check_date_range(date_from: Optional[date], date_to: Optional[date]):
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=422, detail="date_from must not be after date_to.")
+
+
 @router.get("/hospital-loss", response_model=List[HospitalLossItem], tags=["Analytics"])
 def hospital_loss(
+    request: Request,
     range: Optional[str] = Query(None, pattern=r"^(7d|30d|all)$"),
+    date_from: Optional[date] = Query(None, description="First UTC submission day (overrides range)."),
+    date_to: Optional[date] = Query(None, description="Last UTC submission day (overrides range)."),
     db: Session = Depends(get_db)
 ):
     """
     Hospital-Level Fraud Exposure Analytics (Hitha's Feature).
     Returns risk-weighted financial loss and fraud exposure % per hospital.
     """
+    _check_date_range(date_from, date_to)
     try:
-        return get_hospital_loss(db, range)
+        return cached_response(
+            request, db, lambda: get_hospital_loss(db, range, date_from, date_to), List[HospitalLossItem],
+        )
     except Exception as exc:
         logger.error("Failed to compute hospital loss", exc_info=exc)
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/hospital-loss/series", response_model=List[HospitalLossBucket], tags=["Analytics"])
+def hospital_loss_series(
+    request: Request,
+    granularity: str = Query("day", pattern=r"^(day|week|month)$"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    hospital_id: Optional[str] = Query(None, description="Omit for all hospitals."),
+    db: Session = Depends(get_db)
+):
+    """Loss exposure over time, bucketed by UTC submission day, ISO week or month."""
+    _check_date_range(date_from, date_to)
+    try:
+        return cached_response(
+            request, db, lambda: get_hospital_loss_series(db, granularity, date_from, date_to, hospital_id),
+            List[HospitalLossBucket],
+        )
+    except Exception as exc:
+        logger.error("Failed to compute hospital loss series", exc_info=exc)
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,10 +1,17 @@
 """
 Dataset Router — GET /api/v1/claims
 Serves live claim + analysis data for the Dataset Explorer page.
+
+Filtering, ordering and paging all happen in SQL: each call returns one page
+plus an opaque next_cursor (keyset on the sort key and claim_id) to pass back
+as `cursor` for the following page; it is null on the last page.
 """
+import base64
+import json
 import logging
+from datetime import date, datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from backend.database import get_db
 from backend import crud
@@ -14,13 +21,66 @@ logger = logging.getLogger("dataset_router")
 router = APIRouter()
 
 
+def _encode_cursor(sort: str, after: tuple) -> str:
+    value, claim_id = after
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, claim_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, claim_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort or not isinstance(claim_id, str):
+            raise ValueError
+        if sort.lstrip("-") == "created_at":
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, (int, float)):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid cursor for this sort order.")
+    return value, claim_id
+
+
 @router.get("/claims")
 def list_claims(
     min_score: Optional[int] = Query(default=None, ge=0, le=100),
     max_score: Optional[int] = Query(default=None, ge=0, le=100),
     risk_level: Optional[str] = Query(default=None, regex="^(LOW|MEDIUM|HIGH|CRITICAL)$"),
+    hospital_id: Optional[str] = Query(default=None),
+    procedure_code: Optional[str] = Query(default=None),
+    admission_from: Optional[date] = Query(default=None),
+    admission_to: Optional[date] = Query(default=None),
+    enforcement_state: Optional[str] = Query(default=None, regex="^(CLEAR|MONITOR|ESCALATED|HARD_STOP)$"),
+    sort: str = Query(
+        default="created_at", regex="^-?(created_at|composite_index|claim_amount)$",
+        description="Sort key; prefix with '-' for descending.",
+    ),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page."),
     limit: int = Query(default=500, ge=1, le=2000),
     db: Session = Depends(get_db),
 ):
-    results = crud.get_claims_with_analysis(db, min_score=min_score, max_score=max_score, risk_level=risk_level)
-    return results[:limit]
+    sort_key = sort.lstrip("-")
+    after = _decode_cursor(cursor, sort) if cursor else None
+    items, next_after = crud.get_claims_page(
+        db,
+        min_score=min_score,
+        max_score=max_score,
+        risk_level=risk_level,
+        hospital_id=hospital_id,
+        procedure_code=procedure_code,
+        admission_from=admission_from,
+        admission_to=admission_to,
+        enforcement_state=enforcement_state,
+        sort=sort_key,
+        descending=sort.startswith("-"),
+        after=after,
+        limit=limit,
+    )
+    return {
+        "items": items,
+        "count": len(items),
+        "next_cursor": _encode_cursor(sort, next_after) if next_after else None,
+    }
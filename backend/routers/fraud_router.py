@@ -1,12 +1,20 @@
 import logging
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from backend.database import get_db
-from backend.schemas import ClaimInput, IntelligenceResponse, IntelligenceMetricsResponse
+from backend.schemas import (
+    ClaimInput, IntelligenceResponse, IntelligenceMetricsResponse,
+    BatchScoreRequest, BatchScoreResponse,
+)
 from backend import crud
-from backend.services.fraud_service import score_claim_intelligence
+from backend.services.fraud_service import (
+    score_claim_intelligence, score_claims_batch, replay_idempotent_request,
+)
+from backend.services.response_cache import cached_response
 
 logger = logging.getLogger("fraud_router")
 
@@ -17,12 +25,22 @@ def _get_engine(request: Request):
     return request.app.state.fraud_engine
 
 
+def _get_feature_store(request: Request):
+    return getattr(request.app.state, "feature_store", None)
+
+
+def _get_scoring_executor(request: Request):
+    return getattr(request.app.state, "scoring_executor", None)
+
+
 @router.post("/score-intelligence", response_model=IntelligenceResponse, status_code=200)
 def score_intelligence(
     claim: ClaimInput,
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    test_case: int = 0
+    test_case: int = 0,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", min_length=1, max_length=255),
 ):
     # -------- MANDATORY UI TEST MOCKS ENFORCEMENT --------
     if test_case == 1:
@@ -128,24 +146,34 @@ def score_intelligence(
     if not engine.is_ready:
         raise HTTPException(status_code=503, detail="Model artifacts unavailable. Service is degraded.")
 
-    claim_data = {
-        "claim_id": claim.claim_id,
-        "hospital_id": claim.hospital_id,
-        "patient_id": claim.patient_id,
-        "procedure_code": claim.procedure_code,
-        "package_rate": claim.package_rate,
-        "claim_amount": claim.claim_amount,
-        "admission_date": claim.admission_date,
-        "discharge_date": claim.discharge_date,
-        "is_inpatient": claim.is_inpatient,
-    }
+    claim_data = _claim_data(claim)
 
     try:
-        result = score_claim_intelligence(claim_data, db, engine)
+        if idempotency_key is not None:
+            # A retry of a request that already succeeded: answer from the stored analysis
+            replayed = replay_idempotent_request(db, idempotency_key, claim_data)
+            if replayed is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return replayed
+        result = score_claim_intelligence(
+            claim_data, db, engine, _get_feature_store(request), _get_scoring_executor(request),
+            idempotency_key=idempotency_key,
+        )
         return result
     except ValueError as ve:
         db.rollback()
         msg = str(ve)
+        if msg.startswith("IDEMPOTENCY_MISMATCH:"):
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different claim payload.",
+            )
+        if msg.startswith("DUPLICATE:") and idempotency_key is not None:
+            # A concurrent request with the same key may have just committed
+            replayed = replay_idempotent_request(db, idempotency_key, claim_data)
+            if replayed is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return replayed
         if msg.startswith("DUPLICATE:"):
             logger.warning(
                 "Duplicate claim",
@@ -180,12 +208,92 @@ def score_intelligence(
         raise HTTPException(status_code=500, detail="Internal scoring error. No data was persisted.")
 
 
+def _claim_data(claim: ClaimInput) -> dict:
+    return {
+        "claim_id": claim.claim_id,
+        "hospital_id": claim.hospital_id,
+        "hospital_name": claim.hospital_name,
+        "patient_id": claim.patient_id,
+        "patient_name": claim.patient_name,
+        "procedure_code": claim.procedure_code,
+        "package_rate": claim.package_rate,
+        "claim_amount": claim.claim_amount,
+        "admission_date": claim.admission_date,
+        "discharge_date": claim.discharge_date,
+        "is_inpatient": claim.is_inpatient,
+    }
+
+
+@router.post("/score-intelligence/batch", response_model=BatchScoreResponse, status_code=200)
+def score_intelligence_batch(
+    payload: BatchScoreRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """
+    Score a batch of claims in one pass. Invalid or duplicate claims are
+    reported in `errors` without aborting the rest of the batch.
+    """
+    engine = _get_engine(request)
+    if not engine.is_ready:
+        raise HTTPException(status_code=503, detail="Model artifacts unavailable. Service is degraded.")
+
+    valid = []
+    validation_errors = []
+    for index, raw in enumerate(payload.claims):
+        try:
+            valid.append((index, _claim_data(ClaimInput.model_validate(raw))))
+        except ValidationError as ve:
+            validation_errors.append({
+                "index": index,
+                "claim_id": raw.get("claim_id") if isinstance(raw, dict) else None,
+                "error": "VALIDATION",
+                "detail": "; ".join(err["msg"] for err in ve.errors()),
+            })
+
+    try:
+        outcome = score_claims_batch([c for _, c in valid], db, engine, _get_feature_store(request))
+    except Exception as exc:
+        db.rollback()
+        logger.error(
+            "Unhandled exception during batch scoring",
+            extra={
+                "batch_size": len(valid),
+                "error_type": type(exc).__name__,
+                "ts": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+        raise HTTPException(status_code=500, detail="Internal scoring error. No data was persisted.")
+
+    # Service indexes refer to the validated sub-list; map back to request positions
+    errors = validation_errors + [
+        {**err, "index": valid[err["index"]][0]} for err in outcome["errors"]
+    ]
+    errors.sort(key=lambda e: e["index"])
+
+    logger.info(
+        "Batch scored",
+        extra={"batch_size": len(payload.claims), "scored": len(outcome["results"]), "failed": len(errors)},
+    )
+    return {
+        "total": len(payload.claims),
+        "scored": len(outcome["results"]),
+        "failed": len(errors),
+        "results": outcome["results"],
+        "errors": errors,
+    }
+
+
 @router.get("/intelligence/{claim_id}", response_model=IntelligenceResponse)
-def get_intelligence_by_claim(claim_id: str, db: Session = Depends(get_db)):
+def get_intelligence_by_claim(claim_id: str, request: Request, db: Session = Depends(get_db)):
     """
     Fetch stored intelligence result for an already-scored claim.
     Used by the Dataset Explorer to view intelligence results without re-scoring.
     """
+    return cached_response(request, db, lambda: _stored_intelligence(claim_id, db), IntelligenceResponse)
+
+
+def _stored_intelligence(claim_id: str, db: Session) -> IntelligenceResponse:
     claim = crud.get_claim_by_id(db, claim_id)
     if not claim:
         raise HTTPException(status_code=404, detail=f"Claim '{claim_id}' not found.")
@@ -220,14 +328,14 @@ def get_intelligence_by_claim(claim_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/intelligence-metrics", response_model=IntelligenceMetricsResponse)
-def intelligence_metrics(db: Session = Depends(get_db)):
-    return crud.get_intelligence_metrics(db)
+def intelligence_metrics(request: Request, db: Session = Depends(get_db)):
+    return cached_response(request, db, lambda: crud.get_intelligence_metrics(db), IntelligenceMetricsResponse)
 
 
 
 @router.get("/dataset-summary")
-def dataset_summary(db: Session = Depends(get_db)):
-    return crud.get_dataset_summary(db)
+def dataset_summary(request: Request, db: Session = Depends(get_db)):
+    return cached_response(request, db, lambda: crud.get_dataset_summary(db))
 
 
 @router.get("/health")
@@ -241,5 +349,8 @@ def health(request: Request):
     return {
         "status": "ok",
         "model": "IsolationForest",
+        "scorer": engine.scorer,
+        "model_version": engine.model_version,
+        "model_loaded_at": engine.loaded_at,
         "artifacts_loaded": True,
     }
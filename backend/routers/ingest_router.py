@@ -0,0 +1,120 @@
+import logging
+import os
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from backend.schemas import MAX_BATCH_CLAIMS
+from backend.services.ingest_service import (
+    INGEST_CHUNK_SIZE, INGEST_MAX_INFLIGHT_CHUNKS, results_path_for, run_ingest,
+)
+from backend.services.job_registry import create_job, get_job, list_jobs
+
+logger = logging.getLogger("ingest_router")
+
+router = APIRouter()
+
+INGEST_JOB_KIND = "ingest"
+
+# Media types read as NDJSON when ?format= is not given; CSV is any "*csv*" type
+_NDJSON_CONTENT_TYPES = {
+    "", "application/x-ndjson", "application/ndjson", "application/jsonl", "application/json",
+    "application/octet-stream", "text/plain",
+}
+
+
+def _resolve_format(request: Request, fmt: Optional[str]) -> str:
+    """
+    The body is parsed as the raw file, so form envelopes are refused (415)
+    rather than read as rows; other unknown types need an explicit ?format=.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type.startswith("multipart/"):
+        raise HTTPException(
+            status_code=415,
+            detail="Multipart uploads are not supported. Send the NDJSON or CSV file as the raw "
+                   "request body (e.g. curl --data-binary @claims.csv -H 'Content-Type: text/csv').",
+        )
+    if fmt:
+        return fmt
+    if "csv" in content_type:
+        return "csv"
+    if content_type in _NDJSON_CONTENT_TYPES:
+        return "ndjson"
+    raise HTTPException(
+        status_code=415,
+        detail=f"Unsupported Content-Type '{content_type}'. Send the raw file body as text/csv or "
+               "application/x-ndjson, or pass ?format=csv|ndjson.",
+    )
+
+
+@router.post("/ingest/claims")
+async def ingest_claims(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = Query(default=None, description="Defaults from Content-Type (text/csv → csv, NDJSON/JSON/plain → ndjson)"),
+    chunk_size: int = Query(default=INGEST_CHUNK_SIZE, ge=1, le=MAX_BATCH_CLAIMS),
+    max_inflight: int = Query(default=INGEST_MAX_INFLIGHT_CHUNKS, ge=1, le=32),
+    job_id: Optional[str] = Query(default=None, pattern=r"^[A-Za-z0-9_-]{1,64}$",
+                                  description="Client-chosen id, so progress can be polled during the upload"),
+):
+    """
+    Stream a file of claims (NDJSON or CSV) through scoring in fixed-size chunks.
+    CSV follows RFC 4180: quoted fields may hold commas, doubled quotes and
+    line breaks (stored as \n); a row left with an open quote is reported as
+    malformed.
+    Returns the final job summary once the upload is consumed; progress is
+    available at GET /ingest/jobs/{job_id} while it runs and per-row outcomes at
+    GET /ingest/jobs/{job_id}/results.
+    """
+    engine = request.app.state.fraud_engine
+    if not engine.is_ready:
+        raise HTTPException(status_code=503, detail="Model artifacts unavailable. Service is degraded.")
+    fmt = _resolve_format(request, format)
+
+    content_length = request.headers.get("content-length")
+    try:
+        job = create_job(
+            INGEST_JOB_KIND,
+            job_id=job_id,
+            total_units=int(content_length) if content_length and content_length.isdigit() else None,
+            unit="bytes",
+        )
+    except ValueError:
+        raise HTTPException(status_code=409, detail=f"Ingest job '{job_id}' is already running.")
+
+    await run_ingest(
+        request.stream(),
+        fmt,
+        job,
+        engine,
+        getattr(request.app.state, "feature_store", None),
+        chunk_size=chunk_size,
+        max_inflight=max_inflight,
+    )
+    summary = job.snapshot()
+    summary["results_url"] = f"/api/v1/ingest/jobs/{job.job_id}/results"
+    return summary
+
+
+@router.get("/ingest/jobs")
+def list_ingest_jobs():
+    return list_jobs(INGEST_JOB_KIND)
+
+
+@router.get("/ingest/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    job = get_job(job_id)
+    if job is None or job.kind != INGEST_JOB_KIND:
+        raise HTTPException(status_code=404, detail=f"Ingest job '{job_id}' not found.")
+    return job.snapshot()
+
+
+@router.get("/ingest/jobs/{job_id}/results")
+def get_ingest_job_results(job_id: str):
+    """Per-row outcomes as NDJSON, in input order within each chunk."""
+    job = get_job(job_id)
+    if job is None or job.kind != INGEST_JOB_KIND:
+        raise HTTPException(status_code=404, detail=f"Ingest job '{job_id}' not found.")
+    path = results_path_for(job_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"No results recorded for ingest job '{job_id}'.")
+    return FileResponse(path, media_type="application/x-ndjson", filename=f"{job_id}.ndjson")
@@ -1,3 +1,4 @@
+import threading
 import time
 import uuid
 import random
@@ -6,6 +7,7 @@ from typing import Optional
 import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.orm import Session
+from backend.auth_utils import require_role
 from backend.database import get_db
 from backend.ml.claims_generator import PACKAGE_RATES, INPATIENT_PROCEDURES, HOSPITALS, PROCEDURES, PATIENTS, START_DATE
 from backend.ml.feature_engineering import compute_features
@@ -89,6 +91,7 @@ def batch_benchmark(
 def self_check(request: Request, db: Session = Depends(get_db)):
     from backend.services.fraud_service import score_claim_intelligence
     engine = request.app.state.fraud_engine
+    feature_store = getattr(request.app.state, "feature_store", None)
 
     low_claim = {
         "claim_id": f"SELF_CHK_LOW_{uuid.uuid4().hex[:6]}",
@@ -115,8 +118,8 @@ def self_check(request: Request, db: Session = Depends(get_db)):
     }
 
     try:
-        low_res = score_claim_intelligence(low_claim, db, engine)
-        high_res = score_claim_intelligence(high_claim, db, engine)
+        low_res = score_claim_intelligence(low_claim, db, engine, feature_store)
+        high_res = score_claim_intelligence(high_claim, db, engine, feature_store)
     finally:
         db.rollback()
 
@@ -133,3 +136,94 @@ def self_check(request: Request, db: Session = Depends(get_db)):
             "confidence_score": high_res["confidence_score"]
         }
     }
+
+
+@router.get("/internal/telemetry")
+def telemetry_stats():
+    from backend.services.telemetry import get_telemetry_sink
+    return get_telemetry_sink().stats()
+
+
+@router.get("/internal/scoring-executor")
+def scoring_executor_stats(request: Request):
+    executor = getattr(request.app.state, "scoring_executor", None)
+    if executor is None:
+        return {"mode": "inline", "workers": 0}
+    return executor.stats()
+
+
+@router.get("/internal/claim-index")
+def claim_index_stats():
+    from backend.services.claim_index import get_claim_index
+    return get_claim_index().stats()
+
+
+@router.get("/internal/response-cache")
+def response_cache_stats():
+    from backend.services.response_cache import get_response_cache
+    return get_response_cache().stats()
+
+
+@router.get("/internal/feature-store")
+def feature_store_coverage(db: Session = Depends(get_db)):
+    """claim_features coverage; stale or missing rows are backfilled by a rescore job."""
+    from backend import crud
+    from backend.ml.feature_engineering import FEATURE_VERSION
+
+    coverage = crud.get_claim_feature_coverage(db)
+    current = coverage["by_version"].get(FEATURE_VERSION, 0)
+    stored = sum(coverage["by_version"].values())
+    return {
+        "feature_version": FEATURE_VERSION,
+        "claims": coverage["claims"],
+        "current": current,
+        "stale": stored - current,
+        "missing": max(0, coverage["claims"] - stored),
+        "by_version": coverage["by_version"],
+    }
+
+
+# ── Model hot reload ────────────────────────────────────────────────────────
+@router.get("/internal/model")
+def model_status(request: Request):
+    engine = request.app.state.fraud_engine
+    reloader = request.app.state.model_reloader
+    return {
+        "model_version": engine.model_version,
+        "loaded_at": engine.loaded_at,
+        "scorer": engine.scorer,
+        "artifact_source": engine.artifact_source,
+        "reload_in_progress": reloader.in_progress,
+        "last_reload": reloader.last_result,
+    }
+
+
+@router.post("/internal/model/reload", status_code=202)
+def reload_model(
+    request: Request,
+    force: bool = Query(default=False, description="Accept the candidate even if many canary claims change risk level"),
+    _admin: dict = Depends(require_role("ADMIN")),
+):
+    """Load the artifacts on disk into a new engine in the background; poll the returned job."""
+    from backend.services.job_registry import create_job
+    from backend.services.model_reloader import RELOAD_JOB_KIND
+
+    reloader = request.app.state.model_reloader
+    if reloader.in_progress:
+        raise HTTPException(status_code=409, detail="A model reload is already in progress.")
+    job = create_job(RELOAD_JOB_KIND)
+    threading.Thread(
+        target=reloader.reload, kwargs={"force": force, "job": job}, name="model-reload", daemon=True
+    ).start()
+    return job.snapshot()
+
+
+@router.get("/internal/model/reload/{job_id}")
+def reload_model_status(job_id: str):
+    from backend.services.job_registry import get_job
+    from backend.services.model_reloader import RELOAD_JOB_KIND
+
+    job = get_job(job_id)
+    if job is None or job.kind != RELOAD_JOB_KIND:
+        raise HTTPException(status_code=404, detail=f"Reload job '{job_id}' not found.")
+    return job.snapshot()
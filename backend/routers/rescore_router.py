@@ -0,0 +1,42 @@
+"""
+Rescore Router — POST /api/v1/rescore/jobs, GET /api/v1/rescore/jobs[/{job_id}]
+Re-applies the current rules, threat bands and model to every stored claim.
+"""
+import logging
+from fastapi import APIRouter, HTTPException, Query, Request
+from backend.services.job_registry import get_job, list_jobs
+from backend.services.rescore_service import RESCORE_CHUNK_SIZE, RESCORE_JOB_KIND, start_rescore
+
+logger = logging.getLogger("rescore_router")
+
+router = APIRouter()
+
+
+@router.post("/rescore/jobs", status_code=202)
+def create_rescore_job(
+    request: Request,
+    chunk_size: int = Query(default=RESCORE_CHUNK_SIZE, ge=100, le=50_000),
+):
+    """
+    Start rescoring all stored claims in the background. A rescore already
+    running is cancelled and replaced. Poll GET /rescore/jobs/{job_id}.
+    """
+    engine = request.app.state.fraud_engine
+    if not engine.is_ready:
+        raise HTTPException(status_code=503, detail="Model artifacts unavailable. Service is degraded.")
+    job = start_rescore(engine, reason="manual", chunk_size=chunk_size)
+    logger.info("Rescore job started", extra={"job_id": job.job_id})
+    return job.snapshot()
+
+
+@router.get("/rescore/jobs")
+def list_rescore_jobs():
+    return list_jobs(RESCORE_JOB_KIND)
+
+
+@router.get("/rescore/jobs/{job_id}")
+def get_rescore_job(job_id: str):
+    job = get_job(job_id)
+    if job is None or job.kind != RESCORE_JOB_KIND:
+        raise HTTPException(status_code=404, detail=f"Rescore job '{job_id}' not found.")
+    return job.snapshot()
@@ -1,12 +1,18 @@
 """
-Rule Config Router — GET /api/v1/rules, PATCH /api/v1/rules/{rule_key}
-Allows auditors and admins to view and configure fraud detection rule thresholds.
+Rule Config Router — GET /api/v1/rules, PATCH /api/v1/rules/{rule_key},
+POST /api/v1/rules/simulate
+Allows auditors and admins to view and configure fraud detection rule thresholds,
+and to preview the effect of a change before making it.
 """
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from backend.database import get_db
 from backend import crud
+from backend.schemas import ThresholdSimulationRequest
+from backend.services.config_cache import refresh_config_snapshot
+from backend.services.rescore_service import start_rescore
+from backend.services.simulation_service import simulate_thresholds
 
 logger = logging.getLogger("rule_router")
 
@@ -29,8 +35,35 @@ def list_rules(db: Session = Depends(get_db)):
     ]
 
 
+@router.post("/rules/simulate")
+def simulate_rules(
+    proposal: ThresholdSimulationRequest,
+    hospital_limit: int = Query(default=20, ge=0, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    What-if preview: evaluate proposed rule thresholds / enable flags and threat
+    band edges against every stored claim, without writing any config.
+    """
+    try:
+        return simulate_thresholds(
+            db,
+            {key: override.model_dump() for key, override in proposal.rules.items()},
+            proposal.bands.model_dump() if proposal.bands else None,
+            hospital_limit=hospital_limit,
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+
 @router.patch("/rules/{rule_key}")
-def patch_rule(rule_key: str, payload: dict, db: Session = Depends(get_db)):
+def patch_rule(
+    rule_key: str,
+    payload: dict,
+    request: Request,
+    rescore: bool = False,
+    db: Session = Depends(get_db),
+):
     allowed_keys = {"threshold_value", "is_enabled"}
     filtered = {k: v for k, v in payload.items() if k in allowed_keys}
     if not filtered:
@@ -40,8 +73,9 @@ def patch_rule(rule_key: str, payload: dict, db: Session = Depends(get_db)):
     if not updated:
         raise HTTPException(status_code=404, detail=f"Rule '{rule_key}' not found.")
 
+    refresh_config_snapshot(db)
     logger.info("Rule config updated", extra={"rule_key": rule_key, "changes": str(filtered)})
-    return {
+    response = {
         "id": updated.id,
         "rule_key": updated.rule_key,
         "description": updated.description,
@@ -49,3 +83,8 @@ def patch_rule(rule_key: str, payload: dict, db: Session = Depends(get_db)):
         "is_enabled": updated.is_enabled,
         "updated_at": updated.updated_at.isoformat() if updated.updated_at else None,
     }
+    if rescore:
+        # Stored analyses keep the old triggers until rescored
+        job = start_rescore(request.app.state.fraud_engine, reason=f"rule:{rule_key}")
+        response["rescore_job"] = job.snapshot()
+    return response
@@ -3,10 +3,12 @@ Settings Router — GET /api/v1/config, PATCH /api/v1/config/{key}
 Controls dynamic threat level thresholds (LOW_MAX, MEDIUM_MAX, HIGH_MAX).
 """
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from backend.database import get_db
 from backend import crud
+from backend.services.config_cache import refresh_config_snapshot
+from backend.services.rescore_service import start_rescore
 
 logger = logging.getLogger("settings_router")
 
@@ -27,7 +29,13 @@ def list_config(db: Session = Depends(get_db)):
 
 
 @router.patch("/config/{key}")
-def update_config(key: str, payload: dict, db: Session = Depends(get_db)):
+def update_config(
+    key: str,
+    payload: dict,
+    request: Request,
+    rescore: bool = False,
+    db: Session = Depends(get_db),
+):
     if "value" not in payload:
         raise HTTPException(status_code=422, detail="Payload must contain 'value' field.")
 
@@ -44,9 +52,15 @@ def update_config(key: str, payload: dict, db: Session = Depends(get_db)):
     if not updated:
         raise HTTPException(status_code=404, detail=f"Config key '{key}' not found.")
 
+    refresh_config_snapshot(db)
     logger.info("System config updated", extra={"key": key, "new_value": payload["value"]})
-    return {
+    response = {
         "config_key": updated.config_key,
         "config_value": updated.config_value,
         "description": updated.description,
     }
+    if rescore:
+        # Stored analyses keep the old threat level / enforcement state until rescored
+        job = start_rescore(request.app.state.fraud_engine, reason=f"config:{key}")
+        response["rescore_job"] = job.snapshot()
+    return response
@@ -110,6 +110,65 @@ class IntelligenceResponse(BaseModel):
     knowledge_signals: List[KnowledgeSignalSchema]
 
 
+# ── Batch Scoring ────────────────────────────────────────────────────────────
+MAX_BATCH_CLAIMS = 5000
+
+
+class BatchScoreRequest(BaseModel):
+    # Raw dicts so one malformed claim is reported per-claim instead of
+    # failing the whole request; each item is validated against ClaimInput.
+    claims: List[dict]
+
+    @field_validator("claims")
+    @classmethod
+    def batch_size_limit(cls, v):
+        if not v:
+            raise ValueError("claims must contain at least one claim")
+        if len(v) > MAX_BATCH_CLAIMS:
+            raise ValueError(f"A batch may contain at most {MAX_BATCH_CLAIMS} claims")
+        return v
+
+
+class BatchClaimError(BaseModel):
+    index: int
+    claim_id: str | None = None
+    error: Literal["VALIDATION", "DUPLICATE", "SCORING_ERROR"]
+    detail: str
+
+
+class BatchScoreResponse(BaseModel):
+    total: int
+    scored: int
+    failed: int
+    results: List[IntelligenceResponse]
+    errors: List[BatchClaimError]
+
+
+# ── Threshold Simulation ─────────────────────────────────────────────────────
+class RuleOverride(BaseModel):
+    threshold_value: float | None = None
+    is_enabled: bool | None = None
+
+
+class BandOverride(BaseModel):
+    LOW_MAX: int | None = None
+    MEDIUM_MAX: int | None = None
+    HIGH_MAX: int | None = None
+
+    @field_validator("LOW_MAX", "MEDIUM_MAX", "HIGH_MAX")
+    @classmethod
+    def band_range(cls, v):
+        if v is not None and not (0 <= v <= 100):
+            raise ValueError("band edges must be integers between 0 and 100")
+        return v
+
+
+class ThresholdSimulationRequest(BaseModel):
+    # Omitted rules / bands keep their current configured values
+    rules: dict[str, RuleOverride] = {}
+    bands: BandOverride | None = None
+
+
 class IntelligenceMetricsResponse(BaseModel):
     total_scored: int
     threat_level_distribution: dict
@@ -191,3 +250,11 @@ class HospitalLossItem(BaseModel):
 
 HospitalLossResponse = List[HospitalLossItem]
 
+
+class HospitalLossBucket(BaseModel):
+    period_start: date  # first day of the day / ISO week / month bucket
+    total_claims: int
+    high_risk_claims: int
+    total_claim_amount: float
+    risk_weighted_loss: float
+    fraud_exposure_percentage: float
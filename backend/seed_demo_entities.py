@@ -4,9 +4,10 @@ from faker import Faker
 import random
 
 from backend import crud, schemas
-from backend.database import SessionLocal, engine, Base
+from backend.database import SessionLocal, engine
+from backend.migrations import migrate
 from backend.ml.risk_engine import get_fraud_engine
-from backend.services.fraud_service import score_claim_intelligence
+from backend.services.fraud_service import score_claims_batch
 
 logger = logging.getLogger(__name__)
 fake = Faker()
@@ -81,22 +82,25 @@ def seed_demo_data():
     if not crud.get_user_by_email(db, "auditor-demo@claimhawk.gov.in"):
         crud.create_user(db, "auditor-demo@claimhawk.gov.in", full_name="Auditor Demo", role="AUDITOR")
         
-    for claim in DEMO_CLAIMS:
-        try:
-            score_claim_intelligence(claim, db, engine_ml)
-            logger.info(f"Successfully scored & inserted demo claim: {claim['claim_id']}")
-        except ValueError as e:
-            if "DUPLICATE" in str(e):
-                logger.debug(f"Skipping duplicate claim: {claim['claim_id']}")
+    # Sequential featurization keeps the curated arrival order of the demo
+    # cases; persistence is one bulk insert, duplicates are skipped set-wise.
+    try:
+        outcome = score_claims_batch(DEMO_CLAIMS, db, engine_ml, sequential=True)
+        for result in outcome["results"]:
+            logger.info(f"Successfully scored & inserted demo claim: {result['claim_id']}")
+        for error in outcome["errors"]:
+            if error["error"] == "DUPLICATE":
+                logger.debug(f"Skipping duplicate claim: {error['claim_id']}")
             else:
-                logger.error(f"Error seeding {claim['claim_id']}: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error seeding {claim['claim_id']}: {e}")
+                logger.error(f"Error seeding {error['claim_id']}: {error['detail']}")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Unexpected error seeding demo claims: {e}")
             
     db.close()
     logger.info("DEMO dataset seeding complete.")
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    Base.metadata.create_all(bind=engine)
+    migrate(engine)
     seed_demo_data()
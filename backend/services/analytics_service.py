@@ -1,20 +1,74 @@
 """
 Analytics Service — deterministic, DB-driven fraud profiling.
 All calculations are server-side. No mock data.
+
+Profiles come from one claims ⟕ fraud_analysis GROUP BY query (per entity,
+threat level and fraud pattern), however many claims or entities are
+involved; the batch builders profile many hospitals or users in that one query.
 """
+from typing import Iterable, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from backend.models import Claim, FraudAnalysis, User
 
-
-def build_user_profile(user_id: int, db: Session) -> dict:
-    """Build behavioral fraud profile from ALL claims made by a user."""
-    user = db.query(User).filter(User.id == user_id).first()
-    email = user.email if user else "unknown"
-
-    claims = db.query(Claim).filter(Claim.user_id == user_id).all()
-    total_claims = len(claims)
-
-    if total_claims == 0:
+_IN_CHUNK = 500
+
+
+def _empty_threats() -> dict:
+    return {"LOW": 0, "MEDIUM": 0, "HIGH": 0, "CRITICAL": 0}
+
+
+def _aggregate_claims(db: Session, group_column, keys: Optional[list]) -> dict:
+    """
+    {key: {"total", "scored", "composite_sum", "threats", "patterns", "name"}}
+    for each value of group_column (restricted to `keys` when given). Claims
+    without an analysis count towards total only.
+    """
+    query = (
+        db.query(
+            group_column,
+            FraudAnalysis.threat_level,
+            FraudAnalysis.fraud_pattern_detected,
+            func.count(Claim.claim_id),
+            func.count(FraudAnalysis.id),
+            func.sum(func.coalesce(FraudAnalysis.composite_index, 0)),
+            func.min(Claim.hospital_name),
+        )
+        .outerjoin(FraudAnalysis, FraudAnalysis.claim_id == Claim.claim_id)
+        .group_by(group_column, FraudAnalysis.threat_level, FraudAnalysis.fraud_pattern_detected)
+    )
+    if keys is None:
+        batches = [query.all()]
+    else:
+        batches = [
+            query.filter(group_column.in_(keys[start:start + _IN_CHUNK])).all()
+            for start in range(0, len(keys), _IN_CHUNK)
+        ]
+
+    aggregates: dict = {}
+    for rows in batches:
+        for key, threat_level, pattern, n_claims, n_scored, composite_sum, name in rows:
+            agg = aggregates.setdefault(key, {
+                "total": 0, "scored": 0, "composite_sum": 0, "threats": _empty_threats(), "patterns": {}, "name": None,
+            })
+            agg["total"] += n_claims
+            if name is not None and (agg["name"] is None or name < agg["name"]):
+                agg["name"] = name
+            if not n_scored:
+                continue
+            agg["scored"] += n_scored
+            agg["composite_sum"] += composite_sum or 0
+            tl = threat_level or "LOW"
+            if tl in agg["threats"]:
+                agg["threats"][tl] += n_scored
+            pat = pattern or "NONE"
+            agg["patterns"][pat] = agg["patterns"].get(pat, 0) + n_scored
+    return aggregates
+
+
+# ── User profiles ───────────────────────────────────────────────────────────
+def _user_profile(user_id: int, email: str, agg: Optional[dict]) -> dict:
+    if not agg or agg["total"] == 0:
         return {
             "user_id": user_id,
             "email": email,
@@ -22,34 +76,14 @@ def build_user_profile(user_id: int, db: Session) -> dict:
             "avg_composite_score": 0,
             "high_risk_count": 0,
             "high_risk_ratio": 0,
-            "risk_distribution": {"LOW": 0, "MEDIUM": 0, "HIGH": 0, "CRITICAL": 0},
+            "risk_distribution": _empty_threats(),
             "fraud_patterns": {},
             "behavior_label": "NO_ACTIVITY",
         }
 
-    composite_scores = []
-    high_risk_count = 0
-    risk_distribution = {"LOW": 0, "MEDIUM": 0, "HIGH": 0, "CRITICAL": 0}
-    pattern_counts: dict[str, int] = {}
-
-    for claim in claims:
-        analysis = db.query(FraudAnalysis).filter(FraudAnalysis.claim_id == claim.claim_id).first()
-        if not analysis:
-            continue
-
-        composite_scores.append(analysis.composite_index or 0)
-        tl = analysis.threat_level or "LOW"
-        if tl in risk_distribution:
-            risk_distribution[tl] += 1
-
-        if tl in ("HIGH", "CRITICAL"):
-            high_risk_count += 1
-
-        pat = analysis.fraud_pattern_detected or "NONE"
-        pattern_counts[pat] = pattern_counts.get(pat, 0) + 1
-
-    scored_total = len(composite_scores) or 1
-    avg_score = round(sum(composite_scores) / scored_total, 2)
+    high_risk_count = agg["threats"]["HIGH"] + agg["threats"]["CRITICAL"]
+    scored_total = agg["scored"] or 1
+    avg_score = round(agg["composite_sum"] / scored_total, 2)
     high_ratio = round(high_risk_count / scored_total, 2)
 
     if high_ratio < 0.1:
@@ -62,25 +96,37 @@ def build_user_profile(user_id: int, db: Session) -> dict:
     return {
         "user_id": user_id,
         "email": email,
-        "total_claims": total_claims,
+        "total_claims": agg["total"],
         "avg_composite_score": avg_score,
         "high_risk_count": high_risk_count,
         "high_risk_ratio": high_ratio,
-        "risk_distribution": risk_distribution,
-        "fraud_patterns": pattern_counts,
+        "risk_distribution": agg["threats"],
+        "fraud_patterns": agg["patterns"],
         "behavior_label": behavior_label,
     }
 
 
-def build_hospital_profile(hospital_id: str, db: Session) -> dict:
-    """Analyze systemic fraud behavior at a hospital facility."""
-    claims = db.query(Claim).filter(Claim.hospital_id == hospital_id).all()
-    total = len(claims)
-    
-    # Get hospital name from the first claim found (or fallback to ID)
-    hospital_name = claims[0].hospital_name if total > 0 else hospital_id
+def build_user_profiles(user_ids: Optional[Iterable[int]], db: Session) -> list:
+    """Behavioral fraud profiles for many users (every user with claims when user_ids is None)."""
+    keys = None if user_ids is None else list(dict.fromkeys(user_ids))
+    aggregates = _aggregate_claims(db, Claim.user_id, keys)
+    if keys is None:
+        keys = sorted(k for k in aggregates if k is not None)
 
-    if total == 0:
+    emails = {}
+    for start in range(0, len(keys), _IN_CHUNK):
+        emails.update(db.query(User.id, User.email).filter(User.id.in_(keys[start:start + _IN_CHUNK])).all())
+    return [_user_profile(uid, emails.get(uid, "unknown"), aggregates.get(uid)) for uid in keys]
+
+
+def build_user_profile(user_id: int, db: Session) -> dict:
+    """Build behavioral fraud profile from ALL claims made by a user."""
+    return build_user_profiles([user_id], db)[0]
+
+
+# ── Hospital profiles ───────────────────────────────────────────────────────
+def _hospital_profile(hospital_id: str, agg: Optional[dict]) -> dict:
+    if not agg or agg["total"] == 0:
         return {
             "hospital_id": hospital_id,
             "hospital_name": hospital_id,
@@ -89,44 +135,16 @@ def build_hospital_profile(hospital_id: str, db: Session) -> dict:
             "high_risk_count": 0,
             "high_risk_percent": 0,
             "fraud_patterns": {"upcoding": 0, "phantom": 0, "repeat_abuse": 0},
-            "threat_distribution": {"LOW": 0, "MEDIUM": 0, "HIGH": 0, "CRITICAL": 0},
+            "threat_distribution": _empty_threats(),
             "pattern_distribution": {},
             "hospital_risk_rating": "NO_DATA",
         }
 
-    high = 0
-    upcoding = 0
-    phantom = 0
-    repeat_abuse = 0
-    composite_scores = []
-    threat_dist: dict[str, int] = {"LOW": 0, "MEDIUM": 0, "HIGH": 0, "CRITICAL": 0}
-    pattern_dist: dict[str, int] = {}
-
-    for claim in claims:
-        analysis = db.query(FraudAnalysis).filter(FraudAnalysis.claim_id == claim.claim_id).first()
-        if not analysis:
-            continue
-
-        composite_scores.append(analysis.composite_index or 0)
-        tl = analysis.threat_level or "LOW"
-        if tl in threat_dist:
-            threat_dist[tl] += 1
-
-        if tl in ("HIGH", "CRITICAL"):
-            high += 1
-
-        pat = analysis.fraud_pattern_detected or "NONE"
-        pattern_dist[pat] = pattern_dist.get(pat, 0) + 1
-
-        if pat == "UPCODING":
-            upcoding += 1
-        elif pat == "PHANTOM":
-            phantom += 1
-        elif pat == "REPEAT_ABUSE":
-            repeat_abuse += 1
-
-    scored_total = len(composite_scores) or 1
-    avg_score = round(sum(composite_scores) / scored_total, 2)
+    patterns = agg["patterns"]
+    high = agg["threats"]["HIGH"] + agg["threats"]["CRITICAL"]
+    upcoding = patterns.get("UPCODING", 0)
+    scored_total = agg["scored"] or 1
+    avg_score = round(agg["composite_sum"] / scored_total, 2)
     high_percent = round((high / scored_total) * 100, 2)
 
     if high_percent < 15:
@@ -136,24 +154,35 @@ def build_hospital_profile(hospital_id: str, db: Session) -> dict:
     else:
         rating = "CRITICAL"
 
-    upcoding_count = upcoding
-    upcoding_percent = round((upcoding / scored_total) * 100, 2)
-
     return {
         "hospital_id": hospital_id,
-        "hospital_name": hospital_name,
-        "total_claims": total,
+        "hospital_name": agg["name"],
+        "total_claims": agg["total"],
         "avg_composite_score": avg_score,
         "high_risk_count": high,
         "high_risk_percent": high_percent,
-        "upcoding_count": upcoding_count,
-        "upcoding_frequency_percent": upcoding_percent,
+        "upcoding_count": upcoding,
+        "upcoding_frequency_percent": round((upcoding / scored_total) * 100, 2),
         "fraud_patterns": {
             "upcoding": upcoding,
-            "phantom": phantom,
-            "repeat_abuse": repeat_abuse,
+            "phantom": patterns.get("PHANTOM", 0),
+            "repeat_abuse": patterns.get("REPEAT_ABUSE", 0),
         },
-        "threat_distribution": threat_dist,
-        "pattern_distribution": pattern_dist,
+        "threat_distribution": agg["threats"],
+        "pattern_distribution": patterns,
         "hospital_risk_rating": rating,
     }
+
+
+def build_hospital_profiles(hospital_ids: Optional[Iterable[str]], db: Session) -> list:
+    """Systemic fraud profiles for many hospitals (every hospital with claims when hospital_ids is None)."""
+    keys = None if hospital_ids is None else list(dict.fromkeys(hospital_ids))
+    aggregates = _aggregate_claims(db, Claim.hospital_id, keys)
+    if keys is None:
+        keys = sorted(aggregates)
+    return [_hospital_profile(hid, aggregates.get(hid)) for hid in keys]
+
+
+def build_hospital_profile(hospital_id: str, db: Session) -> dict:
+    """Analyze systemic fraud behavior at a hospital facility."""
+    return build_hospital_profiles([hospital_id], db)[0]
@@ -0,0 +1,156 @@
+"""
+Claim Index — in-memory "have we seen this claim_id?" filter.
+
+score_claim_intelligence used to SELECT the claims table for every submission
+just to reject duplicates. The index is warmed from the claims table at boot
+and updated on every insert in this process, so a claim_id it has never seen
+is known to be new without a query; only ids it reports as possibly present
+(true duplicates, Bloom false positives) pay for the SELECT.
+
+CLAIM_INDEX_MODE selects the representation:
+  set    exact set of ids (default)
+  bloom  fixed-size Bloom filter, CLAIM_INDEX_BLOOM_CAPACITY ids at a
+         CLAIM_INDEX_BLOOM_FPR false-positive rate (~1.8 MB per million ids at
+         0.1%) — for tables too large to hold every id
+  off    always check the database
+
+The index only knows this process's view: with several API workers, a claim
+inserted by another worker is still caught by the claims primary key at insert
+time, so the index saves queries but is never the only line of defence.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+from typing import Iterable, Optional
+
+logger = logging.getLogger("claim_index")
+
+CLAIM_INDEX_MODES = ("set", "bloom", "off")
+
+
+class _BloomFilter:
+    def __init__(self, capacity: int, fpr: float):
+        self.capacity = max(1, capacity)
+        self.n_bits = max(8, int(math.ceil(-self.capacity * math.log(fpr) / (math.log(2) ** 2))))
+        self.n_hashes = max(1, int(round(self.n_bits / self.capacity * math.log(2))))
+        self._bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing (Kirsch–Mitzenmacher) from one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.n_bits for i in range(self.n_hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+
+class ClaimIdIndex:
+    def __init__(self, mode: str = "set", bloom_capacity: int = 1_000_000, bloom_fpr: float = 0.001):
+        if mode not in CLAIM_INDEX_MODES:
+            raise ValueError(f"CLAIM_INDEX_MODE must be one of {CLAIM_INDEX_MODES}, got '{mode}'.")
+        self.mode = mode
+        self._bloom_capacity = bloom_capacity
+        self._bloom_fpr = bloom_fpr
+        self._lock = threading.Lock()
+        self._ids = None
+        self.count = 0
+        self.ready = False
+        self.known_new = 0        # lookups answered without a query
+        self.checked = 0          # lookups that fell through to the DB
+        self._reset()
+
+    def _reset(self):
+        if self.mode == "set":
+            self._ids = set()
+        elif self.mode == "bloom":
+            self._ids = _BloomFilter(self._bloom_capacity, self._bloom_fpr)
+        self.count = 0
+
+    def warm(self, claim_ids: Iterable[str]):
+        """(Re)build from the full list of persisted claim ids."""
+        if self.mode == "off":
+            return
+        with self._lock:
+            self.ready = False
+            self._reset()
+            for claim_id in claim_ids:
+                self._ids.add(claim_id)
+                self.count += 1
+            self.ready = True
+        if self.mode == "bloom" and self.count > self._bloom_capacity:
+            logger.warning(
+                "Claim index holds %d ids, above its Bloom capacity of %d; false positives will rise.",
+                self.count, self._bloom_capacity,
+            )
+        logger.info("Claim index warmed (%s): %d ids.", self.mode, self.count)
+
+    def add(self, claim_id: str):
+        self.add_many([claim_id])
+
+    def add_many(self, claim_ids: Iterable[str]):
+        if self.mode == "off":
+            return
+        with self._lock:
+            for claim_id in claim_ids:
+                self._ids.add(claim_id)
+                self.count += 1
+            if self.mode == "set":
+                self.count = len(self._ids)
+
+    def might_contain(self, claim_id: str) -> bool:
+        """False only when claim_id is certainly absent from the claims table (as of warm-up)."""
+        if not self.ready:
+            self.checked += 1
+            return True
+        present = claim_id in self._ids
+        if present:
+            self.checked += 1
+        else:
+            self.known_new += 1
+        return present
+
+    def stats(self) -> dict:
+        stats = {
+            "mode": self.mode,
+            "ready": self.ready,
+            "ids": self.count,
+            "known_new": self.known_new,
+            "checked": self.checked,
+        }
+        if isinstance(self._ids, _BloomFilter):
+            stats.update({
+                "bloom_bytes": self._ids.size_bytes,
+                "bloom_hashes": self._ids.n_hashes,
+                "bloom_capacity": self._ids.capacity,
+            })
+        return stats
+
+
+_index: Optional[ClaimIdIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_claim_index() -> ClaimIdIndex:
+    """Process-wide index configured from CLAIM_INDEX_* environment variables."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ClaimIdIndex(
+                    mode=os.getenv("CLAIM_INDEX_MODE", "set").strip().lower(),
+                    bloom_capacity=int(os.getenv("CLAIM_INDEX_BLOOM_CAPACITY", "1000000")),
+                    bloom_fpr=float(os.getenv("CLAIM_INDEX_BLOOM_FPR", "0.001")),
+                )
+    return _index
@@ -0,0 +1,82 @@
+"""
+Config Cache — versioned in-memory snapshot of RuleConfig + SystemConfig.
+
+Scoring reads rule thresholds and threat bands from this snapshot instead of
+querying the config tables per claim. Writers (crud.update_rule_config /
+crud.update_system_config) bump the "config" counter in cache_versions in the
+same transaction; the routers refresh this process's snapshot right after the
+commit, and other workers notice the new version on their next revalidation
+(a single-row read, at most once every CONFIG_CACHE_REVALIDATE_SECONDS).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from sqlalchemy.orm import Session
+from backend import crud
+
+logger = logging.getLogger("config_cache")
+
+_REVALIDATE_SECONDS = float(os.getenv("CONFIG_CACHE_REVALIDATE_SECONDS", "2"))
+
+
+class ConfigSnapshot:
+    __slots__ = ("version", "rules", "system")
+
+    def __init__(self, version: int, rules: dict, system: dict):
+        self.version = version
+        # rule_key -> (is_enabled, threshold_value)
+        self.rules = rules
+        # config_key -> config_value (raw string, as stored)
+        self.system = system
+
+
+_lock = threading.Lock()
+_snapshot: Optional[ConfigSnapshot] = None
+_checked_at = 0.0
+
+
+def _load_snapshot(db: Session, version: int) -> ConfigSnapshot:
+    rules = {
+        key: (rule.is_enabled, rule.threshold_value)
+        for key, rule in crud.get_rule_config_map(db).items()
+    }
+    snapshot = ConfigSnapshot(version, rules, crud.get_config_map(db))
+    logger.info("Config snapshot loaded", extra={"config_version": version})
+    return snapshot
+
+
+def get_config_snapshot(db: Session) -> ConfigSnapshot:
+    """
+    Return the cached snapshot, re-validating it against the DB version
+    counter at most once per revalidation interval.
+    """
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _checked_at < _REVALIDATE_SECONDS:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _checked_at < _REVALIDATE_SECONDS:
+            return _snapshot
+        # Read the version before the rows: the rows are then at least as new
+        # as the recorded version, so a concurrent change is never missed.
+        version = crud.get_cache_version(db, crud.CONFIG_CACHE_SCOPE)
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _load_snapshot(db, version)
+        _checked_at = time.monotonic()
+        return _snapshot
+
+
+def refresh_config_snapshot(db: Session) -> ConfigSnapshot:
+    """Force a reload; called by the config routers after a committed change."""
+    invalidate_config_snapshot()
+    return get_config_snapshot(db)
+
+
+def invalidate_config_snapshot():
+    global _snapshot, _checked_at
+    with _lock:
+        _snapshot = None
+        _checked_at = 0.0
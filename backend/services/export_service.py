@@ -0,0 +1,213 @@
+"""
+Export Service — streaming dataset exports.
+
+Rows come from crud.iter_export_batches (one joined query, filtered in SQL
+and read in partitions through yield_per) and are encoded one partition at a
+time, so memory stays flat and the first bytes go out as soon as the first
+partition is read.
+
+  csv      EXPORT_COLUMNS as text, EXPORT_BATCH_SIZE rows per chunk;
+           with compress=True the stream is gzip-encoded on the fly
+  parquet  COLUMNAR_COLUMNS, typed: claim and analysis fields, one boolean
+  arrow    per rule trigger, the signal vector fields and the stored model
+           features; one Parquet row group / Arrow IPC record batch per
+           EXPORT_ROW_GROUP_SIZE rows, zstd-compressed
+
+The columnar formats need the optional pyarrow package.
+
+The generators open their own session: they run while the response streams,
+after the request's dependencies may have been torn down.
+"""
+import csv
+import io
+import logging
+import os
+import zlib
+
+from backend import crud
+from backend.database import SessionLocal
+from backend.ml.feature_state import to_date
+from backend.ml.risk_engine import BINARY_FEATURES, MODEL_FEATURES
+from backend.models import Claim, ClaimFeature, FraudAnalysis
+from backend.services.fraud_service import RULE_META
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only the columnar formats need it
+    pa = pq = None
+
+logger = logging.getLogger("export_service")
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "50000"))
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+# wbits=31 selects the gzip container rather than a raw zlib stream
+_GZIP_WBITS = 31
+
+
+def stream_csv(filters: dict, compress: bool = False):
+    """Yield the CSV export (header row first) in encoded chunks."""
+    gzip = zlib.compressobj(wbits=_GZIP_WBITS) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in crud.EXPORT_COLUMNS])
+
+    rows = 0
+    with SessionLocal() as db:
+        for batch in crud.iter_export_batches(db, batch_size=EXPORT_BATCH_SIZE, **filters):
+            writer.writerows(batch)
+            rows += len(batch)
+            chunk = buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            if gzip:
+                chunk = gzip.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = buffer.getvalue().encode("utf-8")
+    if gzip:
+        chunk = gzip.compress(chunk) + gzip.flush()
+    if chunk:
+        yield chunk
+    logger.info("CSV export streamed %d rows | filters=%s gzip=%s", rows, filters, compress)
+
+
+# ── Columnar (Parquet / Arrow IPC) ───────────────────────────────────────────
+# (output column, source column, type)
+COLUMNAR_COLUMNS = [
+    ("claim_id", Claim.claim_id, "string"),
+    ("hospital_id", Claim.hospital_id, "string"),
+    ("hospital_name", Claim.hospital_name, "string"),
+    ("patient_id", Claim.patient_id, "string"),
+    ("procedure_code", Claim.procedure_code, "string"),
+    ("package_rate", Claim.package_rate, "float64"),
+    ("claim_amount", Claim.claim_amount, "float64"),
+    ("admission_date", Claim.admission_date, "date"),
+    ("discharge_date", Claim.discharge_date, "date"),
+    ("is_inpatient", Claim.is_inpatient, "bool"),
+    ("created_at", Claim.created_at, "timestamp"),
+    ("anomaly_score_norm", FraudAnalysis.anomaly_score_norm, "float64"),
+    ("rule_score_norm", FraudAnalysis.rule_score_norm, "float64"),
+    ("final_risk_score", FraudAnalysis.final_risk_score, "float64"),
+    ("risk_level", FraudAnalysis.risk_level, "string"),
+    ("composite_index", FraudAnalysis.composite_index, "int32"),
+    ("threat_level", FraudAnalysis.threat_level, "string"),
+    ("confidence_score", FraudAnalysis.confidence_score, "float64"),
+    ("fraud_pattern_detected", FraudAnalysis.fraud_pattern_detected, "string"),
+    ("investigation_priority", FraudAnalysis.investigation_priority, "string"),
+    ("enforcement_state", FraudAnalysis.enforcement_state, "string"),
+    ("hard_stop", FraudAnalysis.hard_stop, "bool"),
+]
+# Rule triggers and signal vector fields are extracted from the JSON in SQL
+COLUMNAR_COLUMNS += [
+    (f"rule_{key}", FraudAnalysis.rule_triggers[key].as_boolean(), "bool") for key in RULE_META
+]
+COLUMNAR_COLUMNS += [
+    ("signal_rule_weight", FraudAnalysis.signal_vector["rule_weight"].as_float(), "float64"),
+    ("signal_anomaly_weight", FraudAnalysis.signal_vector["anomaly_weight"].as_float(), "float64"),
+    ("signal_rule_trigger_count", FraudAnalysis.signal_vector["rule_trigger_count"].as_integer(), "int32"),
+    ("signal_anomaly_intensity_band", FraudAnalysis.signal_vector["anomaly_intensity_band"].as_string(), "string"),
+]
+# Stored model features (null where the claim has no row at the current FEATURE_VERSION)
+COLUMNAR_COLUMNS += [
+    (name, getattr(ClaimFeature, name), "int8" if name in BINARY_FEATURES else "float64") for name in MODEL_FEATURES
+]
+
+
+def columnar_export_available() -> bool:
+    return pa is not None
+
+
+def _arrow_type(kind: str):
+    return {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int32": pa.int32(),
+        "int8": pa.int8(),
+        "bool": pa.bool_(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[kind]
+
+
+def _convert(values, kind: str) -> list:
+    if kind == "date":
+        return [None if v is None else to_date(v) for v in values]
+    if kind == "bool":
+        return [None if v is None else bool(v) for v in values]
+    return list(values)
+
+
+def _record_batch(rows: list, schema):
+    arrays = [
+        pa.array(_convert(values, kind), type=_arrow_type(kind))
+        for values, (_, _, kind) in zip(zip(*rows), COLUMNAR_COLUMNS)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object for the Arrow writers; drained after every batch."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_columnar(filters: dict, fmt: str):
+    """Yield the export as a Parquet file or an Arrow IPC stream, one row group / record batch at a time."""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; Parquet / Arrow export is unavailable.")
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"fmt must be one of {COLUMNAR_FORMATS}, got '{fmt}'.")
+
+    schema = pa.schema([(name, _arrow_type(kind)) for name, _, kind in COLUMNAR_COLUMNS])
+    columns = [column for _, column, _ in COLUMNAR_COLUMNS]
+
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+    rows = 0
+    with SessionLocal() as db:
+        batches = crud.iter_export_batches(
+            db, columns=columns, with_features=True, batch_size=EXPORT_ROW_GROUP_SIZE, **filters,
+        )
+        for batch in batches:
+            writer.write_batch(_record_batch(batch, schema))
+            rows += len(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+    writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+    logger.info("%s export streamed %d rows | filters=%s", fmt, rows, filters)
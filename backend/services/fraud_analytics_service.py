@@ -3,29 +3,37 @@ fraud_analytics_service.py
 --------------------------
 Hospital-Level Loss Calculation for PM-JAY Fraud Intelligence System.
 
-Computes risk-weighted financial loss exposure per hospital
-using a single optimised SQL JOIN query.
+Computes risk-weighted financial loss exposure per hospital from the
+hospital_loss_daily rollup (one row per hospital and UTC day of claim
+submission, maintained by crud as claims are scored and rescored), so any
+date range or day/week/month series sums a few hundred rollup rows instead
+of joining claims with fraud_analysis.
+
+Date ranges are whole UTC days: "7d" covers the day seven days ago through
+today.
 
 High-risk definition:
-  composite_index >= 70  (0–100 scale)
+  composite_index >= 70  (0–100 scale, crud.HIGH_RISK_COMPOSITE_MIN)
 
 Feature developed by: Hitha
 """
 
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
-from sqlalchemy import func, case
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from backend.models import Claim, FraudAnalysis
-from backend.schemas import HospitalLossItem
+from backend.models import HospitalLossDaily
+from backend.schemas import HospitalLossBucket, HospitalLossItem
 
 logger = logging.getLogger("fraud_analytics_service")
 
+GRANULARITIES = ("day", "week", "month")
+
 # ---------------------------------------------------------------------------
-# Time-range helper
+# Time-range helpers
 # ---------------------------------------------------------------------------
 
 _RANGE_DAYS: dict[str, Optional[int]] = {
@@ -35,54 +43,60 @@ _RANGE_DAYS: dict[str, Optional[int]] = {
 }
 
 
-def _resolve_since(range_param: Optional[str]) -> Optional[datetime]:
+def _resolve_since(range_param: Optional[str]) -> Optional[date]:
     if range_param is None or range_param == "all":
         return None
     days = _RANGE_DAYS.get(range_param)
     if days is None:
         return None
-    return datetime.now(timezone.utc) - timedelta(days=days)
+    return (datetime.now(timezone.utc) - timedelta(days=days)).date()
+
+
+def _bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _exposure_pct(total_amount: float, risk_loss: float) -> float:
+    return round((risk_loss / total_amount) * 100, 2) if total_amount > 0 else 0.0
+
+
+def _sums(db: Session, *group_by):
+    H = HospitalLossDaily
+    return db.query(
+        *group_by,
+        func.sum(H.claim_count).label("total_claims"),
+        func.sum(H.high_risk_count).label("high_risk_claims"),
+        func.coalesce(func.sum(H.claim_amount_sum), 0.0).label("total_claim_amount"),
+        func.coalesce(func.sum(H.risk_weighted_loss), 0.0).label("risk_weighted_loss"),
+    ).group_by(*group_by).having(func.sum(H.claim_count) > 0)
+
+
+def _in_range(query, date_from: Optional[date], date_to: Optional[date]):
+    if date_from is not None:
+        query = query.filter(HospitalLossDaily.day >= date_from)
+    if date_to is not None:
+        query = query.filter(HospitalLossDaily.day <= date_to)
+    return query
 
 
 def get_hospital_loss(
     db: Session,
     range_param: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
 ) -> list[HospitalLossItem]:
+    """Per-hospital loss, largest risk-weighted loss first. date_from / date_to take precedence over range_param."""
 
-    since = _resolve_since(range_param)
-
-    # Define high-risk condition directly from composite_index
-    high_risk_condition = case(
-        (FraudAnalysis.composite_index >= 70, 1),
-        else_=0
-    )
-
-    query = (
-        db.query(
-            Claim.hospital_id.label("hospital_id"),
-            func.count(Claim.claim_id).label("total_claims"),
-            func.sum(high_risk_condition).label("high_risk_claims"),
-            func.coalesce(func.sum(Claim.claim_amount), 0.0).label("total_claim_amount"),
-            func.coalesce(
-                func.sum(Claim.claim_amount * FraudAnalysis.final_risk_score),
-                0.0
-            ).label("risk_weighted_loss"),
-        )
-        .join(FraudAnalysis, FraudAnalysis.claim_id == Claim.claim_id)
-        .filter(FraudAnalysis.final_risk_score.isnot(None))
-    )
-
-    if since is not None:
-        query = query.filter(Claim.created_at >= since)
+    if date_from is None and date_to is None:
+        date_from = _resolve_since(range_param)
 
     rows = (
-        query.group_by(Claim.hospital_id)
-        .order_by(
-            func.coalesce(
-                func.sum(Claim.claim_amount * FraudAnalysis.final_risk_score),
-                0.0
-            ).desc()
-        )
+        _in_range(_sums(db, HospitalLossDaily.hospital_id), date_from, date_to)
+        .order_by(func.coalesce(func.sum(HospitalLossDaily.risk_weighted_loss), 0.0).desc())
         .all()
     )
 
@@ -92,8 +106,6 @@ def get_hospital_loss(
         total_amount = float(row.total_claim_amount)
         risk_loss = float(row.risk_weighted_loss)
 
-        exposure_pct = round((risk_loss / total_amount) * 100, 2) if total_amount > 0 else 0.0
-
         results.append(
             HospitalLossItem(
                 hospital_id=row.hospital_id,
@@ -101,14 +113,64 @@ def get_hospital_loss(
                 high_risk_claims=int(row.high_risk_claims or 0),
                 total_claim_amount=round(total_amount, 2),
                 risk_weighted_loss=round(risk_loss, 2),
-                fraud_exposure_percentage=exposure_pct,
+                fraud_exposure_percentage=_exposure_pct(total_amount, risk_loss),
             )
         )
 
     logger.info(
-        "hospital_loss query returned %d hospitals | range=%s",
+        "hospital_loss query returned %d hospitals | range=%s from=%s to=%s",
         len(results),
         range_param or "all",
+        date_from,
+        date_to,
+    )
+
+    return results
+
+
+def get_hospital_loss_series(
+    db: Session,
+    granularity: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    hospital_id: Optional[str] = None,
+) -> list[HospitalLossBucket]:
+    """Loss per day / ISO week (from Monday) / month, oldest first, for one hospital or all."""
+
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}, got '{granularity}'.")
+
+    query = _in_range(_sums(db, HospitalLossDaily.day), date_from, date_to)
+    if hospital_id:
+        query = query.filter(HospitalLossDaily.hospital_id == hospital_id)
+
+    buckets: dict[date, list] = {}
+    for row in query.order_by(HospitalLossDaily.day).all():
+        bucket = buckets.setdefault(_bucket_start(row.day, granularity), [0, 0, 0.0, 0.0])
+        bucket[0] += int(row.total_claims)
+        bucket[1] += int(row.high_risk_claims or 0)
+        bucket[2] += float(row.total_claim_amount)
+        bucket[3] += float(row.risk_weighted_loss)
+
+    results = [
+        HospitalLossBucket(
+            period_start=start,
+            total_claims=n,
+            high_risk_claims=high,
+            total_claim_amount=round(amount, 2),
+            risk_weighted_loss=round(loss, 2),
+            fraud_exposure_percentage=_exposure_pct(amount, loss),
+        )
+        for start, (n, high, amount, loss) in buckets.items()
+    ]
+
+    logger.info(
+        "hospital_loss series returned %d %s buckets | hospital=%s from=%s to=%s",
+        len(results),
+        granularity,
+        hospital_id or "all",
+        date_from,
+        date_to,
     )
 
     return results
@@ -1,14 +1,33 @@
+import hashlib
+import json
 import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import numpy as np
 import pandas as pd
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from backend import crud
-from backend.ml.feature_engineering import compute_features
-from backend.ml.risk_engine import FraudEngine, classify_risk
+from backend.services.claim_index import get_claim_index
+from backend.services.config_cache import get_config_snapshot
+from backend.services.telemetry import get_telemetry_sink
+from backend.ml.feature_engineering import FEATURE_VERSION
+from backend.ml.feature_state import FeatureStateStore, features_for_batch, features_from_history
+from backend.ml.risk_engine import BINARY_FEATURES, FraudEngine, classify_risk
 
 logger = logging.getLogger("fraud_service")
 
+# "store": single-claim features from the in-process FeatureStateStore when one
+# is available; "db": always load a windowed history slice from the database
+# (use when several workers write claims, since each store only sees its own).
+FEATURE_SOURCE = os.getenv("FEATURE_SOURCE", "store").lower()
+
+# Idempotency-Key records older than this are ignored (and purged at boot).
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
 # ── Rule metadata for Knowledge Signal Graph ────────────────────────────────
-_RULE_META = {
+RULE_META = {
     "zero_day_inpatient": {
         "signal_code": "RULE_01",
         "signal_type": "DETERMINISTIC",
@@ -47,45 +66,61 @@ _RULE_META = {
 }
 
 
-def _get_rule_triggers(row: pd.Series, db=None) -> dict:
+_DEFAULT_RULE_THRESHOLDS = {
+    "high_amount_zscore": 2.0,
+    "near_package_ceiling": 0.95,
+    "high_patient_frequency": 3.0,
+}
+_DEFAULT_THREAT_BANDS = (29, 59, 84)
+
+
+def load_rule_settings(db=None) -> dict:
     """
-    Evaluate all deterministic fraud rules.
-    Thresholds and enabled-state are read from the RuleConfig DB table.
-    Falls back to hardcoded defaults if DB is unavailable.
+    Read rule enabled-state and thresholds from the cached RuleConfig snapshot.
+    Returns {rule_key: (is_enabled, threshold)}; falls back to hardcoded defaults.
     """
     rule_map = {}
     if db is not None:
         try:
-            from backend import crud as _crud
-            rule_map = _crud.get_rule_config_map(db)
+            rule_map = get_config_snapshot(db).rules
         except Exception:
             pass
 
-    def _threshold(key: str, default: float) -> float:
-        r = rule_map.get(key)
-        return r.threshold_value if (r and r.threshold_value is not None) else default
+    settings = {}
+    for key in RULE_META:
+        enabled, threshold = rule_map.get(key, (True, None))
+        if threshold is None:
+            threshold = _DEFAULT_RULE_THRESHOLDS.get(key)
+        settings[key] = (enabled, threshold)
+    return settings
 
-    def _enabled(key: str) -> bool:
-        r = rule_map.get(key)
-        return r.is_enabled if r is not None else True
 
-    return {
-        "zero_day_inpatient": _enabled("zero_day_inpatient") and bool(
-            row["is_zero_day_stay"] == 1 and row["is_inpatient"] == 1
-        ),
-        "high_amount_zscore": _enabled("high_amount_zscore") and bool(
-            row["claim_amount_zscore"] > _threshold("high_amount_zscore", 2.0)
-        ),
-        "repeat_procedure_flag": _enabled("repeat_procedure_flag") and bool(
-            row["same_proc_repeat_flag"] == 1
-        ),
-        "near_package_ceiling": _enabled("near_package_ceiling") and bool(
-            row["claim_to_package_ratio"] > _threshold("near_package_ceiling", 0.95)
-        ),
-        "high_patient_frequency": _enabled("high_patient_frequency") and bool(
-            row["patient_claim_freq_30d"] >= _threshold("high_patient_frequency", 3.0)
-        ),
+def rule_trigger_masks(feats, settings: dict) -> dict:
+    """
+    Evaluate all deterministic fraud rules. `feats` may be a single feature row
+    (scalar results) or a feature DataFrame (one boolean per claim).
+    """
+    def _col(name):
+        return np.asarray(feats[name])
+
+    conditions = {
+        "zero_day_inpatient": (_col("is_zero_day_stay") == 1) & (_col("is_inpatient") == 1),
+        "high_amount_zscore": _col("claim_amount_zscore") > settings["high_amount_zscore"][1],
+        "repeat_procedure_flag": _col("same_proc_repeat_flag") == 1,
+        "near_package_ceiling": _col("claim_to_package_ratio") > settings["near_package_ceiling"][1],
+        "high_patient_frequency": _col("patient_claim_freq_30d") >= settings["high_patient_frequency"][1],
     }
+    return {key: cond & settings[key][0] for key, cond in conditions.items()}
+
+
+def _get_rule_triggers(row: pd.Series, db=None) -> dict:
+    """
+    Evaluate all deterministic fraud rules for one claim.
+    Thresholds and enabled-state come from the cached RuleConfig snapshot.
+    Falls back to hardcoded defaults if DB is unavailable.
+    """
+    masks = rule_trigger_masks(row, load_rule_settings(db))
+    return {key: bool(value) for key, value in masks.items()}
 
 
 def _detect_fraud_pattern(triggers: dict) -> str:
@@ -120,29 +155,33 @@ def _risk_breakdown(rule_score_norm: float, anomaly_score_norm: float) -> dict:
     }
 
 
-
-
-
 # ── 1. Composite Risk Index & Threat Level ───────────────────────────────────
 def _compute_composite_index(final_risk_score: float) -> int:
     return min(100, max(0, round(final_risk_score * 100)))
 
 
-def _classify_threat_level(composite_index: int, db=None) -> str:
+def load_threat_bands(db=None) -> tuple:
     """
-    Classify threat level using DB-configured bands.
+    Read (LOW_MAX, MEDIUM_MAX, HIGH_MAX) from the cached SystemConfig snapshot.
     Falls back to hardcoded defaults (29/59/84) if DB unavailable.
     """
-    low_max, medium_max, high_max = 29, 59, 84
+    low_max, medium_max, high_max = _DEFAULT_THREAT_BANDS
     if db is not None:
         try:
-            from backend import crud as _crud
-            cfg = _crud.get_config_map(db)
-            low_max = int(cfg.get("LOW_MAX", 29))
-            medium_max = int(cfg.get("MEDIUM_MAX", 59))
-            high_max = int(cfg.get("HIGH_MAX", 84))
+            cfg = get_config_snapshot(db).system
+            low_max = int(cfg.get("LOW_MAX", low_max))
+            medium_max = int(cfg.get("MEDIUM_MAX", medium_max))
+            high_max = int(cfg.get("HIGH_MAX", high_max))
         except Exception:
             pass
+    return low_max, medium_max, high_max
+
+
+def _classify_threat_level(composite_index: int, db=None, bands: Optional[tuple] = None) -> str:
+    """
+    Classify threat level using DB-configured bands (or pre-loaded `bands`).
+    """
+    low_max, medium_max, high_max = bands if bands is not None else load_threat_bands(db)
     if composite_index <= low_max:
         return "LOW"
     elif composite_index <= medium_max:
@@ -197,7 +236,7 @@ def _build_knowledge_signals(triggers: dict, anomaly_score_norm: float) -> list:
     signals = []
     for key, active in triggers.items():
         if active:
-            meta = _RULE_META[key]
+            meta = RULE_META[key]
             signals.append({
                 "signal_code": meta["signal_code"],
                 "signal_type": meta["signal_type"],
@@ -289,13 +328,8 @@ def _generate_explanation(
     return (prefix + body + suffix).strip()
 
 
-def score_claim_intelligence(claim_data: dict, db: Session, engine: FraudEngine) -> dict:
-    claim_id = claim_data["claim_id"]
-
-    if crud.get_claim_by_id(db, claim_id):
-        raise ValueError(f"DUPLICATE:{claim_id}")
-
-    crud.insert_claim(db, {
+def _claim_record(claim_data: dict) -> dict:
+    return {
         "claim_id": claim_data["claim_id"],
         "hospital_id": claim_data["hospital_id"],
         "hospital_name": claim_data.get("hospital_name"),
@@ -307,41 +341,70 @@ def score_claim_intelligence(claim_data: dict, db: Session, engine: FraudEngine)
         "admission_date": str(claim_data["admission_date"]),
         "discharge_date": str(claim_data["discharge_date"]),
         "is_inpatient": claim_data["is_inpatient"],
-    })
+    }
 
-    historical_df = crud.get_all_claims_as_df(db)
-    new_row = pd.DataFrame([{
-        "claim_id": claim_data["claim_id"],
-        "hospital_id": claim_data["hospital_id"],
-        "hospital_name": claim_data.get("hospital_name"),
-        "patient_id": claim_data["patient_id"],
-        "patient_name": claim_data.get("patient_name"),
-        "procedure_code": claim_data["procedure_code"],
-        "package_rate": claim_data["package_rate"],
-        "claim_amount": claim_data["claim_amount"],
-        "admission_date": claim_data["admission_date"],
-        "discharge_date": claim_data["discharge_date"],
-        "is_inpatient": claim_data["is_inpatient"],
-    }])
-    full_df = pd.concat([historical_df, new_row], ignore_index=True)
-    df_features = compute_features(full_df)
-    feat_row = df_features[df_features["claim_id"] == claim_id].iloc[0]
 
-    scores = engine.score_row(feat_row)
+_INTEGER_FEATURES = frozenset(BINARY_FEATURES) | {"is_inpatient"}
+
+
+def _feature_record(row) -> dict:
+    """claim_features row for one feature row (dict or Series)."""
+    record = {"claim_id": row["claim_id"], "feature_version": FEATURE_VERSION}
+    for col in crud.CLAIM_FEATURE_COLUMNS:
+        record[col] = int(row[col]) if col in _INTEGER_FEATURES else float(row[col])
+    return record
+
+
+def replay_page_features(db: Session, claims: list, store: FeatureStateStore) -> tuple:
+    """
+    Feature rows for one submission-order page of stored claims, folding each
+    claim into `store` (a scratch replay of the claims before it). Features
+    persisted at the current FEATURE_VERSION are read back as scored; only
+    claims without them are featurized against the replay.
+    Returns (frame of claim_id + CLAIM_FEATURE_COLUMNS in page order,
+    feature records computed here).
+    """
+    columns = crud.CLAIM_FEATURE_COLUMNS
+    ids, stored = crud.get_feature_matrix(db, [claim["claim_id"] for claim in claims])
+    position = {claim_id: j for j, claim_id in enumerate(ids)}
+    matrix = np.empty((len(claims), len(columns)))
+    computed = []
+    for i, claim in enumerate(claims):
+        j = position.get(claim["claim_id"])
+        if j is not None:
+            matrix[i] = stored[j]
+        else:
+            record = _feature_record(store.features_for(claim))
+            computed.append(record)
+            matrix[i] = [record[col] for col in columns]
+        store.add(claim)
+    feats = pd.DataFrame(matrix, columns=columns)
+    feats.insert(0, "claim_id", [claim["claim_id"] for claim in claims])
+    return feats, computed
+
+
+def build_intelligence(
+    claim_id: str,
+    scores: dict,
+    triggers: dict,
+    claim_amount_zscore: float,
+    bands: tuple,
+) -> tuple:
+    """
+    Composite Intelligence Layer for one scored claim.
+    Returns (response dict, FraudAnalysis record, debug telemetry payload).
+    """
     a_norm = scores["anomaly_score_norm"]
     r_norm = scores["rule_score_norm"]
     final = scores["final_risk_score"]
     risk_level = scores["risk_level"]
 
-    triggers = _get_rule_triggers(feat_row, db)
     pattern = _detect_fraud_pattern(triggers)
     priority = _investigation_priority(risk_level)
     breakdown = _risk_breakdown(r_norm, a_norm)
 
-    # Composite Intelligence Layer
     composite_index = _compute_composite_index(final)
-    threat_level = _classify_threat_level(composite_index, db)
-    claim_amount_zscore = float(feat_row.get("claim_amount_zscore", 0.0))
+    threat_level = _classify_threat_level(composite_index, bands=bands)
     confidence_score = _compute_confidence(a_norm, triggers, claim_amount_zscore)
     signal_vector = _build_signal_vector(r_norm, a_norm, triggers)
     knowledge_signals = _build_knowledge_signals(triggers, a_norm)
@@ -352,8 +415,8 @@ def score_claim_intelligence(claim_data: dict, db: Session, engine: FraudEngine)
     if composite_index != round(final * 100):
         logger.critical(f"Integrity Error: composite_index={composite_index}, final={final}")
         raise RuntimeError("COMPUTATION_INTEGRITY_MISMATCH: composite_index")
-    
-    expected_threat = _classify_threat_level(composite_index, db)
+
+    expected_threat = _classify_threat_level(composite_index, bands=bands)
     if threat_level != expected_threat:
         logger.critical(f"Integrity Error: threat_level={threat_level}, expected={expected_threat}")
         raise RuntimeError("COMPUTATION_INTEGRITY_MISMATCH: threat_level")
@@ -361,13 +424,13 @@ def score_claim_intelligence(claim_data: dict, db: Session, engine: FraudEngine)
     if not (0 <= confidence_score <= 100):
         logger.critical(f"Integrity Error: confidence_score={confidence_score}")
         raise RuntimeError("COMPUTATION_INTEGRITY_MISMATCH: confidence_score bounds")
-        
+
     recomputed_confidence = _compute_confidence(a_norm, triggers, claim_amount_zscore)
     if confidence_score != recomputed_confidence:
         logger.critical(f"Integrity Error: confidence={confidence_score}, recomputed={recomputed_confidence}")
         raise RuntimeError("COMPUTATION_INTEGRITY_MISMATCH: confidence_score deterministic mismatch")
 
-    # --- Debug Telemetry ---
+    # --- Debug Telemetry (enqueued to the background sink after commit) ---
     debug_payload = {
         "claim_id": claim_id,
         "final_risk_score": final,
@@ -376,32 +439,19 @@ def score_claim_intelligence(claim_data: dict, db: Session, engine: FraudEngine)
         "anomaly_score_norm": a_norm,
         "rule_score_norm": r_norm,
         "confidence_score": confidence_score,
+        "enforcement_state": enforcement_state,
         "rule_trigger_count": sum(triggers.values()),
     }
-    logger.info("INTELLIGENCE_DEBUG", extra=debug_payload)
-    
-    # Write to discrete file for verification
-    import json
-    with open("intelligence_debug.jsonl", "a") as df:
-        df.write(json.dumps(debug_payload) + "\n")
 
     explanation = _generate_explanation(
         triggers, pattern, risk_level, a_norm,
         composite_index, threat_level, confidence_score, enforcement_state
     )
 
-    logger.info(
-        "Claim scored",
-        extra={
-            "claim_id": claim_id,
-            "composite_index": composite_index,
-            "threat_level": threat_level,
-            "confidence_score": confidence_score,
-            "enforcement_state": enforcement_state,
-        },
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Claim scored", extra=debug_payload)
 
-    crud.insert_fraud_analysis(db, {
+    analysis = {
         "claim_id": claim_id,
         "anomaly_score_norm": a_norm,
         "rule_score_norm": r_norm,
@@ -420,11 +470,9 @@ def score_claim_intelligence(claim_data: dict, db: Session, engine: FraudEngine)
         "signal_vector": signal_vector,
         "knowledge_signals": knowledge_signals,
         "hard_stop": is_hard_stop,
-    })
-
-    db.commit()
+    }
 
-    return {
+    result = {
         "claim_id": claim_id,
         # Legacy
         "anomaly_score_norm": a_norm,
@@ -444,3 +492,267 @@ def score_claim_intelligence(claim_data: dict, db: Session, engine: FraudEngine)
         "signal_vector": signal_vector,
         "knowledge_signals": knowledge_signals,
     }
+    return result, analysis, debug_payload
+
+
+def score_from_history(
+    claim_data: dict,
+    history: dict,
+    engine: FraudEngine,
+    rule_settings: dict,
+    bands: tuple,
+) -> tuple:
+    """
+    CPU-only half of single-claim scoring (features, model, rules, intelligence
+    layer) — no DB access, so it can run in a scoring executor worker.
+    Returns (response dict, FraudAnalysis record, debug telemetry payload,
+    claim_features record).
+    """
+    feat_row = pd.Series(features_from_history(claim_data, history))
+    scores = engine.score_row(feat_row)
+    masks = rule_trigger_masks(feat_row, rule_settings)
+    triggers = {key: bool(value) for key, value in masks.items()}
+    claim_amount_zscore = float(feat_row.get("claim_amount_zscore", 0.0))
+    result, analysis, debug_payload = build_intelligence(
+        claim_data["claim_id"], scores, triggers, claim_amount_zscore, bands
+    )
+    return result, analysis, debug_payload, _feature_record(feat_row)
+
+
+# ── Idempotent replay ───────────────────────────────────────────────────────
+def _request_hash(claim_data: dict) -> str:
+    canonical = json.dumps(claim_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _stored_result(analysis) -> dict:
+    """Rebuild the scoring response from a persisted FraudAnalysis row."""
+    return {
+        "claim_id": analysis.claim_id,
+        "anomaly_score_norm": analysis.anomaly_score_norm,
+        "rule_score_norm": analysis.rule_score_norm,
+        "final_risk_score": analysis.final_risk_score,
+        "risk_level": analysis.risk_level,
+        "risk_breakdown": analysis.risk_breakdown,
+        "rule_triggers": analysis.rule_triggers,
+        "fraud_pattern_detected": analysis.fraud_pattern_detected,
+        "investigation_priority": analysis.investigation_priority,
+        "explanation": analysis.explanation,
+        "composite_index": analysis.composite_index,
+        "threat_level": analysis.threat_level,
+        "confidence_score": int(analysis.confidence_score),
+        "enforcement_state": analysis.enforcement_state,
+        "signal_vector": analysis.signal_vector,
+        "knowledge_signals": analysis.knowledge_signals,
+    }
+
+
+def replay_idempotent_request(db: Session, idempotency_key: str, claim_data: dict) -> Optional[dict]:
+    """
+    Return the stored result of an earlier request made with the same
+    Idempotency-Key, or None if the key is new (or expired). Reusing a key with
+    a different claim payload raises ValueError("IDEMPOTENCY_MISMATCH:...").
+    """
+    record = crud.get_idempotency_key(db, idempotency_key)
+    if record is None:
+        return None
+    created_at = record.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) - created_at > timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS):
+        # Removed in the new request's transaction, so an expired key can be reused
+        crud.delete_idempotency_key(db, idempotency_key)
+        return None
+    if record.request_hash != _request_hash(claim_data):
+        raise ValueError(f"IDEMPOTENCY_MISMATCH:{idempotency_key}")
+    analysis = crud.get_fraud_analysis_by_claim_id(db, record.claim_id)
+    return _stored_result(analysis) if analysis is not None else None
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    return crud.purge_idempotency_keys(db, cutoff)
+
+
+def score_claim_intelligence(
+    claim_data: dict,
+    db: Session,
+    engine: FraudEngine,
+    feature_store: Optional[FeatureStateStore] = None,
+    executor=None,
+    idempotency_key: Optional[str] = None,
+) -> dict:
+    """
+    Score a single claim and persist Claim + FraudAnalysis + its features.
+    With a feature_store the claim's features come from incremental per-entity
+    state; otherwise (or with FEATURE_SOURCE=db) from a windowed history slice
+    loaded with indexed queries, so latency does not grow with the table.
+    With an executor the CPU-bound scoring runs in a worker process (in this
+    one while the executor has no pool); the DB reads and writes always stay
+    in this process.
+    An idempotency_key is recorded in the same transaction as the claim, for
+    replay_idempotent_request to answer retries with.
+    """
+    claim_id = claim_data["claim_id"]
+
+    # Only ids the claim index may have seen cost a lookup; new ids skip it
+    claim_index = get_claim_index()
+    if claim_index.might_contain(claim_id) and crud.get_claim_by_id(db, claim_id):
+        raise ValueError(f"DUPLICATE:{claim_id}")
+
+    if feature_store is not None and FEATURE_SOURCE == "store":
+        history = feature_store.history_for(claim_data)
+    else:
+        history = crud.get_feature_history(db, claim_data)
+
+    rule_settings = load_rule_settings(db)
+    bands = load_threat_bands(db)
+    outcome = executor.score(claim_data, history, rule_settings, bands) if executor is not None else None
+    if outcome is None:  # no executor, or its pool is not running
+        outcome = score_from_history(claim_data, history, engine, rule_settings, bands)
+    result, analysis, debug_payload, features = outcome
+
+    try:
+        crud.insert_claim(db, _claim_record(claim_data))
+        crud.insert_fraud_analysis(db, analysis)
+        crud.upsert_claim_features(db, [features])
+        if idempotency_key is not None:
+            crud.insert_idempotency_key(db, idempotency_key, claim_id, _request_hash(claim_data))
+        db.commit()
+    except IntegrityError:
+        # Lost a race (or the id was inserted by another worker, outside this
+        # process's claim index): report it as the duplicate it is.
+        db.rollback()
+        if crud.get_claim_by_id(db, claim_id):
+            claim_index.add(claim_id)
+            raise ValueError(f"DUPLICATE:{claim_id}")
+        raise
+    claim_index.add(claim_id)
+    get_telemetry_sink().emit(debug_payload)
+
+    if feature_store is not None:
+        feature_store.add(claim_data)
+
+    return result
+
+
+def score_claims_batch(
+    claims: list,
+    db: Session,
+    engine: FraudEngine,
+    feature_store: Optional[FeatureStateStore] = None,
+    sequential: bool = False,
+) -> dict:
+    """
+    Score many claims in one pass: featurize them together, score with a
+    single matrix call, evaluate rules vectorized, and persist every Claim +
+    FraudAnalysis (and its features) in one transaction via bulk inserts.
+    Features come from a snapshot of just the state the batch reads: taken
+    from the feature_store, or (without one, or with FEATURE_SOURCE=db)
+    loaded from the aggregate tables, so cost follows the batch, not the table.
+
+    Claims in a batch are featurized as if they arrived together (each sees
+    the others as history, as in compute_features). With sequential=True each
+    claim is featurized as if submitted on its own, in list order — the same
+    features score_claim_intelligence would produce one call at a time.
+    Per-claim failures are returned in `errors` and never abort the rest of
+    the batch.
+    Returns {"results": [...], "indexes": [...], "errors": [{"index", "claim_id",
+    "error", "detail"}]}, where indexes[i] is the position in `claims` of results[i].
+    """
+    errors = []
+    accepted = []
+    seen = set()
+    claim_index = get_claim_index()
+    existing = crud.get_existing_claim_ids(
+        db, [c["claim_id"] for c in claims if claim_index.might_contain(c["claim_id"])]
+    )
+    for index, claim_data in enumerate(claims):
+        claim_id = claim_data["claim_id"]
+        if claim_id in existing or claim_id in seen:
+            errors.append({
+                "index": index,
+                "claim_id": claim_id,
+                "error": "DUPLICATE",
+                "detail": f"Claim '{claim_id}' already exists." if claim_id in existing
+                else f"Claim '{claim_id}' appears more than once in this batch.",
+            })
+            continue
+        seen.add(claim_id)
+        accepted.append((index, claim_data))
+
+    if not accepted:
+        return {"results": [], "indexes": [], "errors": errors}
+
+    # Only the state these claims read is snapshotted (or loaded), never the table
+    batch = [claim_data for _, claim_data in accepted]
+    if feature_store is not None and FEATURE_SOURCE == "store":
+        state = feature_store.scratch(batch)
+    else:
+        state = crud.get_feature_state(db, batch)
+    feats = pd.DataFrame(features_for_batch(state, batch, sequential))
+
+    scores = engine.score_frame(feats)
+    masks = rule_trigger_masks(feats, load_rule_settings(db))
+    bands = load_threat_bands(db)
+    zscores = feats["claim_amount_zscore"].to_numpy(dtype=float)
+    feature_rows = feats.to_dict("records")
+
+    results = []
+    scored_claims = []
+    scored_indexes = []
+    analyses = []
+    debug_payloads = []
+    feature_records = []
+    for i, (index, claim_data) in enumerate(accepted):
+        claim_id = claim_data["claim_id"]
+        triggers = {key: bool(mask[i]) for key, mask in masks.items()}
+        try:
+            result, analysis, debug_payload = build_intelligence(
+                claim_id, scores[i], triggers, float(zscores[i]), bands
+            )
+        except RuntimeError as exc:
+            errors.append({"index": index, "claim_id": claim_id, "error": "SCORING_ERROR", "detail": str(exc)})
+            continue
+        results.append(result)
+        scored_claims.append(claim_data)
+        scored_indexes.append((index, claim_data))
+        analyses.append(analysis)
+        debug_payloads.append(debug_payload)
+        feature_records.append(_feature_record(feature_rows[i]))
+
+    # Claims first: a concurrent writer may have inserted one of these ids since
+    # the duplicate check, in which case its analysis is dropped, not written.
+    outcomes = crud.bulk_insert_claims(db, [_claim_record(c) for c in scored_claims])
+    persisted = []
+    kept_indexes, kept_results, kept_analyses, kept_payloads, kept_features = [], [], [], [], []
+    for (index, claim_data), outcome, result, analysis, payload, features in zip(
+        scored_indexes, outcomes, results, analyses, debug_payloads, feature_records
+    ):
+        if outcome != crud.INSERTED:
+            errors.append({
+                "index": index,
+                "claim_id": claim_data["claim_id"],
+                "error": "DUPLICATE",
+                "detail": f"Claim '{claim_data['claim_id']}' already exists.",
+            })
+            continue
+        persisted.append(claim_data)
+        kept_indexes.append(index)
+        kept_results.append(result)
+        kept_analyses.append(analysis)
+        kept_payloads.append(payload)
+        kept_features.append(features)
+    crud.bulk_insert_fraud_analyses(db, kept_analyses)
+    crud.upsert_claim_features(db, kept_features)
+    db.commit()
+    claim_index.add_many(c["claim_id"] for c in persisted)
+    get_telemetry_sink().emit_many(kept_payloads)
+    results = kept_results
+
+    if feature_store is not None:
+        for claim_data in persisted:
+            feature_store.add(claim_data)
+
+    errors.sort(key=lambda e: e["index"])
+    return {"results": results, "indexes": kept_indexes, "errors": errors}
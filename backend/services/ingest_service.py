@@ -0,0 +1,274 @@
+"""
+Ingest Service — streaming NDJSON / CSV claim ingestion.
+
+The upload body is read incrementally and parsed line by line (NDJSON: one JSON
+object per line; CSV: a header line, then one claim per record, where a quoted
+field may span lines as RFC 4180 allows). Rows are
+validated against ClaimInput and grouped into fixed-size chunks, which a single
+consumer scores with score_claims_batch in a worker thread (own DB session per
+chunk). score_claims_batch featurizes a chunk from a snapshot of only the state
+its claims touch, so a chunk costs the same on an empty table as on a full one.
+At most INGEST_MAX_INFLIGHT_CHUNKS chunks wait for the consumer; once that queue
+is full the reader stops pulling from the socket, so a slow database applies
+backpressure to the client instead of growing memory. Every put is raced
+against the consumer: if the consumer dies, the reader stops and the job fails
+instead of waiting on a queue nobody drains.
+
+Per-row outcomes are appended to an NDJSON results file (one line per input
+row) and summarised on the job record; nothing proportional to the upload size
+is held in memory.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from backend.database import SessionLocal
+from backend.ml.feature_state import FeatureStateStore
+from backend.ml.risk_engine import FraudEngine
+from backend.schemas import ClaimInput
+from backend.services.fraud_service import score_claims_batch
+from backend.services.job_registry import Job
+
+logger = logging.getLogger("ingest_service")
+
+INGEST_FORMATS = ("ndjson", "csv")
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "500"))
+INGEST_MAX_INFLIGHT_CHUNKS = int(os.getenv("INGEST_MAX_INFLIGHT_CHUNKS", "2"))
+INGEST_RESULTS_DIR = os.getenv("INGEST_RESULTS_DIR", "ingest_results")
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(1024 * 1024)))
+
+
+def results_path_for(job_id: str) -> str:
+    return os.path.join(INGEST_RESULTS_DIR, f"{job_id}.ndjson")
+
+
+# ── Incremental parsing ─────────────────────────────────────────────────────
+async def _iter_lines(stream: AsyncIterator[bytes], job: Job) -> AsyncIterator[str]:
+    buffer = b""
+    first = True
+    async for piece in stream:
+        job.advance(units=len(piece))
+        buffer += piece
+        if b"\n" not in piece:
+            if len(buffer) > INGEST_MAX_LINE_BYTES:
+                raise ValueError(f"Line exceeds {INGEST_MAX_LINE_BYTES} bytes.")
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line = raw.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+            first = False
+            yield line
+    if buffer:
+        yield buffer.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+
+
+async def _iter_csv_lines(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Join physical lines into CSV records: a line with an open quote continues."""
+    pending = None
+    async for line in lines:
+        if pending is not None:
+            line = pending + "\n" + line
+            pending = None
+        # Escaped quotes come in pairs, so an odd count leaves a quoted field open
+        if line.count('"') % 2:
+            if len(line) > INGEST_MAX_LINE_BYTES:
+                raise ValueError(f"CSV record exceeds {INGEST_MAX_LINE_BYTES} bytes.")
+            pending = line
+            continue
+        yield line
+    if pending is not None:
+        yield pending  # unterminated quote: reported as a malformed row
+
+
+async def _iter_records(stream: AsyncIterator[bytes], fmt: str, job: Job) -> AsyncIterator[tuple]:
+    """Yield (index, record_or_None, parse_error_or_None) per non-blank data record."""
+    header = None
+    index = 0
+    lines = _iter_lines(stream, job)
+    if fmt == "csv":
+        lines = _iter_csv_lines(lines)
+    async for line in lines:
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            try:
+                values = next(csv.reader([line], strict=True))
+            except csv.Error as exc:
+                if header is None:
+                    raise ValueError(f"Malformed CSV header: {exc}")
+                yield index, None, f"Malformed CSV row: {exc}"
+                index += 1
+                continue
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            if len(values) != len(header):
+                yield index, None, f"Expected {len(header)} columns, got {len(values)}."
+            else:
+                # Empty cells are treated as absent so optional fields keep their defaults
+                yield index, {k: v for k, v in zip(header, values) if v != ""}, None
+        else:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield index, None, f"Invalid JSON: {exc.msg}"
+            else:
+                if isinstance(record, dict):
+                    yield index, record, None
+                else:
+                    yield index, None, "Each NDJSON line must be a JSON object."
+        index += 1
+
+
+def _validate(index: int, record: Optional[dict], parse_error: Optional[str]) -> tuple:
+    """Return (claim_data, None) or (None, error_row)."""
+    if parse_error is not None:
+        return None, {"index": index, "claim_id": None, "error": "VALIDATION", "detail": parse_error}
+    try:
+        claim = ClaimInput.model_validate(record)
+    except ValidationError as ve:
+        return None, {
+            "index": index,
+            "claim_id": record.get("claim_id"),
+            "error": "VALIDATION",
+            "detail": "; ".join(err["msg"] for err in ve.errors()),
+        }
+    return claim.model_dump(), None
+
+
+# ── Chunk scoring (worker thread) ───────────────────────────────────────────
+def _score_chunk(
+    chunk: list,
+    invalid: list,
+    engine: FraudEngine,
+    feature_store: Optional[FeatureStateStore],
+    results_file,
+) -> tuple:
+    """Score one chunk, append its outcome lines, return (succeeded, errors)."""
+    claims = [claim for _, claim in chunk]
+    errors = list(invalid)
+    results, positions = [], []
+    if claims:
+        db = SessionLocal()
+        try:
+            outcome = score_claims_batch(claims, db, engine, feature_store)
+            results, positions = outcome["results"], outcome["indexes"]
+            errors.extend({**err, "index": chunk[err["index"]][0]} for err in outcome["errors"])
+        except Exception as exc:
+            db.rollback()
+            logger.error(
+                "Ingest chunk failed",
+                extra={"chunk_size": len(claims), "error_type": type(exc).__name__},
+            )
+            errors.extend(
+                {"index": index, "claim_id": claim["claim_id"], "error": "SCORING_ERROR",
+                 "detail": "Internal scoring error. Chunk was not persisted."}
+                for index, claim in chunk
+            )
+            results, positions = [], []
+        finally:
+            db.close()
+
+    # Positions, not claim ids: a repeated id is scored once (its first row)
+    # and reported as a duplicate on the others
+    lines = [
+        {"index": chunk[position][0], "status": "SCORED", "result": r}
+        for position, r in zip(positions, results)
+    ] + [{**err, "status": "FAILED"} for err in errors]
+    lines.sort(key=lambda row: row["index"])
+    results_file.write("".join(json.dumps(row, default=str) + "\n" for row in lines))
+    results_file.flush()
+    return len(results), sorted(errors, key=lambda e: e["index"])
+
+
+# ── Pipeline ────────────────────────────────────────────────────────────────
+async def _put(queue: asyncio.Queue, item, consumer: asyncio.Task):
+    """queue.put(item), unless the consumer stops first — then raise its error."""
+    put = asyncio.ensure_future(queue.put(item))
+    done, _ = await asyncio.wait({put, consumer}, return_when=asyncio.FIRST_COMPLETED)
+    if put in done:
+        return
+    put.cancel()
+    await asyncio.gather(put, return_exceptions=True)
+    consumer.result()  # re-raises the consumer's exception
+    raise RuntimeError("Ingest consumer stopped before the upload was consumed.")
+
+
+async def run_ingest(
+    stream: AsyncIterator[bytes],
+    fmt: str,
+    job: Job,
+    engine: FraudEngine,
+    feature_store: Optional[FeatureStateStore] = None,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    max_inflight: int = INGEST_MAX_INFLIGHT_CHUNKS,
+):
+    """
+    Consume the upload stream, scoring it chunk by chunk. Updates `job` with
+    progress as it goes and finishes (or fails) it before returning.
+    """
+    os.makedirs(INGEST_RESULTS_DIR, exist_ok=True)
+    results_path = results_path_for(job.job_id)
+    job.meta.update({
+        "format": fmt,
+        "chunk_size": chunk_size,
+        "max_inflight_chunks": max_inflight,
+        "results_path": results_path,
+        "chunks_completed": 0,
+    })
+    job.start()
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_inflight)
+
+    with open(results_path, "w", encoding="utf-8") as results_file:
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                chunk, invalid = item
+                succeeded, errors = await run_in_threadpool(
+                    _score_chunk, chunk, invalid, engine, feature_store, results_file
+                )
+                job.advance(processed=len(chunk) + len(invalid), succeeded=succeeded, failed=len(errors))
+                job.add_errors(errors)
+                job.meta["chunks_completed"] += 1
+
+        consumer = asyncio.create_task(consume())
+        try:
+            chunk, invalid = [], []
+            async for index, record, parse_error in _iter_records(stream, fmt, job):
+                claim_data, error = _validate(index, record, parse_error)
+                if error is not None:
+                    invalid.append(error)
+                else:
+                    chunk.append((index, claim_data))
+                if len(chunk) + len(invalid) >= chunk_size:
+                    # Blocks while max_inflight chunks are queued — backpressure
+                    await _put(queue, (chunk, invalid), consumer)
+                    chunk, invalid = [], []
+            if chunk or invalid:
+                await _put(queue, (chunk, invalid), consumer)
+            await _put(queue, None, consumer)
+            await consumer
+        except Exception as exc:
+            # Let an in-progress chunk finish writing before the file closes;
+            # chunks already scored stay committed.
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+            job.fail(str(exc) or type(exc).__name__)
+            logger.error("Ingest job failed", extra={"job_id": job.job_id, "error_type": type(exc).__name__})
+            return
+
+    job.finish()
+    logger.info(
+        "Ingest job completed",
+        extra={"job_id": job.job_id, "processed": job.processed, "succeeded": job.succeeded, "failed": job.failed},
+    )
@@ -0,0 +1,177 @@
+"""
+Job Registry — in-process tracking for long-running work (streaming ingestion,
+bulk rescoring).
+
+A Job carries row counters (processed / succeeded / failed), an optional unit
+based progress measure (e.g. bytes of an upload, claims of a rescore) used for
+percent complete and ETA, and the first JOB_MAX_ERRORS error records. Jobs live
+in memory only: they are lost on restart and are not shared between worker
+processes. The registry retains the most recent JOB_REGISTRY_MAX_JOBS jobs.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+JOB_PENDING = "PENDING"
+JOB_RUNNING = "RUNNING"
+JOB_COMPLETED = "COMPLETED"
+JOB_FAILED = "FAILED"
+
+JOB_MAX_ERRORS = int(os.getenv("JOB_MAX_ERRORS", "100"))
+JOB_REGISTRY_MAX_JOBS = int(os.getenv("JOB_REGISTRY_MAX_JOBS", "200"))
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    def __init__(self, job_id: str, kind: str, total_units: Optional[float] = None, unit: str = "rows"):
+        self.job_id = job_id
+        self.kind = kind
+        self.unit = unit
+        self.total_units = total_units
+        self.done_units = 0.0
+        self.status = JOB_PENDING
+        self.created_at = _now_iso()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.detail: Optional[str] = None
+        self.meta: dict = {}
+
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: list = []
+        self.errors_truncated = False
+
+        self._lock = threading.Lock()
+        self._t_start: Optional[float] = None
+        self._t_end: Optional[float] = None
+
+    # ── State transitions ────────────────────────────────────────────────────
+    def start(self):
+        with self._lock:
+            self.status = JOB_RUNNING
+            self.started_at = _now_iso()
+            self._t_start = time.perf_counter()
+
+    def finish(self, detail: Optional[str] = None):
+        with self._lock:
+            self.status = JOB_COMPLETED
+            self.detail = detail
+            self.finished_at = _now_iso()
+            self._t_end = time.perf_counter()
+
+    def fail(self, detail: str):
+        with self._lock:
+            self.status = JOB_FAILED
+            self.detail = detail
+            self.finished_at = _now_iso()
+            self._t_end = time.perf_counter()
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (JOB_PENDING, JOB_RUNNING)
+
+    # ── Progress ─────────────────────────────────────────────────────────────
+    def advance(self, processed: int = 0, succeeded: int = 0, failed: int = 0, units: float = 0.0):
+        with self._lock:
+            self.processed += processed
+            self.succeeded += succeeded
+            self.failed += failed
+            self.done_units += units
+
+    def set_done_units(self, units: float):
+        with self._lock:
+            self.done_units = units
+
+    def add_errors(self, errors: list):
+        with self._lock:
+            room = JOB_MAX_ERRORS - len(self.errors)
+            if len(errors) > room:
+                self.errors_truncated = True
+            if room > 0:
+                self.errors.extend(errors[:room])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            if self._t_start is None:
+                elapsed = 0.0
+            else:
+                elapsed = (self._t_end or time.perf_counter()) - self._t_start
+            rows_per_second = self.processed / elapsed if elapsed > 0 else 0.0
+
+            percent = None
+            eta_seconds = None
+            if self.total_units:
+                percent = min(100.0, 100.0 * self.done_units / self.total_units)
+                if self.status == JOB_RUNNING and self.done_units > 0 and elapsed > 0:
+                    rate = self.done_units / elapsed
+                    eta_seconds = round(max(0.0, self.total_units - self.done_units) / rate, 1)
+            if self.status == JOB_COMPLETED:
+                percent = 100.0
+                eta_seconds = 0.0
+
+            return {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_seconds": round(elapsed, 3),
+                "processed": self.processed,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "rows_per_second": round(rows_per_second, 1),
+                "progress": {
+                    "unit": self.unit,
+                    "done": self.done_units,
+                    "total": self.total_units,
+                    "percent": round(percent, 2) if percent is not None else None,
+                },
+                "eta_seconds": eta_seconds,
+                "detail": self.detail,
+                "meta": dict(self.meta),
+                "errors": list(self.errors),
+                "errors_truncated": self.errors_truncated,
+            }
+
+
+# ── Registry ────────────────────────────────────────────────────────────────
+_jobs: "OrderedDict[str, Job]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def create_job(kind: str, job_id: Optional[str] = None, total_units: Optional[float] = None, unit: str = "rows") -> Job:
+    """Register a new job. Raises ValueError if job_id is already in use by an active job."""
+    job_id = job_id or uuid.uuid4().hex
+    with _jobs_lock:
+        existing = _jobs.get(job_id)
+        if existing is not None and existing.is_active:
+            raise ValueError(f"JOB_EXISTS: job '{job_id}' is still running.")
+        job = Job(job_id, kind, total_units=total_units, unit=unit)
+        _jobs.pop(job_id, None)
+        _jobs[job_id] = job
+        while len(_jobs) > JOB_REGISTRY_MAX_JOBS:
+            oldest_id = next(iter(_jobs))
+            if _jobs[oldest_id].is_active:
+                break
+            _jobs.pop(oldest_id)
+    return job
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs(kind: Optional[str] = None) -> list:
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [j.snapshot() for j in reversed(jobs) if kind is None or j.kind == kind]
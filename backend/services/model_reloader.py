@@ -0,0 +1,223 @@
+"""
+Model Reloader — hot swap of the fraud model without restarting workers.
+
+A reload builds a fresh FraudEngine from the artifacts currently on disk, in a
+background thread, while the serving engine keeps answering requests. The
+candidate is validated on a canary sample (the MODEL_CANARY_SIZE most recent
+claims, featurized against their stored history):
+
+  - every canary score must be finite and inside [0, 1]
+  - the share of canary claims whose risk level differs from the serving
+    engine's must not exceed MODEL_CANARY_MAX_LEVEL_CHANGE (skipped with force)
+
+If it passes, the scoring executor pool (if any) is replaced by one warmed on
+the new artifacts, then app.state.fraud_engine is re-pointed in one assignment.
+Requests that already hold the old engine finish on it; new requests see the
+new one. A rejected candidate is dropped and the serving engine is untouched.
+
+Reloads are triggered through POST /internal/model/reload, or by the watcher
+(MODEL_WATCH=true), which polls the pickled artifacts every
+MODEL_WATCH_INTERVAL_SECONDS and reloads once a change has stayed unchanged for
+one full interval, so half-copied files are never loaded.
+"""
+import logging
+import math
+import os
+import threading
+from typing import Optional
+
+import pandas as pd
+
+from backend import crud
+from backend.database import SessionLocal
+from backend.ml.feature_state import features_from_history
+from backend.ml.model_artifacts import PICKLE_ARTIFACTS
+from backend.ml.risk_engine import FraudEngine
+from backend.services.job_registry import Job
+
+logger = logging.getLogger("model_reloader")
+
+MODEL_CANARY_SIZE = int(os.getenv("MODEL_CANARY_SIZE", "200"))
+MODEL_CANARY_MAX_LEVEL_CHANGE = float(os.getenv("MODEL_CANARY_MAX_LEVEL_CHANGE", "0.25"))
+MODEL_WATCH = os.getenv("MODEL_WATCH", "false").lower() == "true"
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "10"))
+
+RELOAD_JOB_KIND = "model_reload"
+
+
+def _canary_features() -> pd.DataFrame:
+    with SessionLocal() as db:
+        claims = crud.get_recent_claims(db, MODEL_CANARY_SIZE)
+        rows = [features_from_history(claim, crud.get_feature_history(db, claim)) for claim in claims]
+    return pd.DataFrame(rows)
+
+
+def validate_candidate(candidate: FraudEngine, serving: Optional[FraudEngine], force: bool = False) -> dict:
+    """Score the canary sample on both engines; returns a report with `passed`."""
+    report = {"passed": False, "canary_rows": 0, "level_change_rate": None, "max_score_delta": None}
+    if not candidate.is_ready:
+        report["reason"] = "Candidate engine failed to load artifacts."
+        return report
+
+    feats = _canary_features()
+    report["canary_rows"] = len(feats)
+    if feats.empty:
+        report["passed"] = True
+        report["reason"] = "No claims available for a canary sample; load checks only."
+        return report
+
+    new_scores = candidate.score_frame(feats)
+    finals = [s["final_risk_score"] for s in new_scores] + [s["anomaly_score_norm"] for s in new_scores]
+    if not all(math.isfinite(v) and 0.0 <= v <= 1.0 for v in finals):
+        report["reason"] = "Candidate produced non-finite or out-of-range scores."
+        return report
+
+    if serving is not None and serving.is_ready:
+        old_scores = serving.score_frame(feats)
+        changed = sum(o["risk_level"] != n["risk_level"] for o, n in zip(old_scores, new_scores))
+        report["level_change_rate"] = round(changed / len(feats), 4)
+        report["max_score_delta"] = round(max(
+            abs(o["final_risk_score"] - n["final_risk_score"]) for o, n in zip(old_scores, new_scores)
+        ), 6)
+        if report["level_change_rate"] > MODEL_CANARY_MAX_LEVEL_CHANGE and not force:
+            report["reason"] = (
+                f"{report['level_change_rate']:.1%} of canary claims change risk level "
+                f"(limit {MODEL_CANARY_MAX_LEVEL_CHANGE:.0%}); retry with force to accept."
+            )
+            return report
+
+    report["passed"] = True
+    return report
+
+
+def _artifact_signature(model_dir: str) -> tuple:
+    signature = []
+    for name in PICKLE_ARTIFACTS:
+        try:
+            st = os.stat(os.path.join(model_dir, name))
+            signature.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((name, None, None))
+    return tuple(signature)
+
+
+class ModelReloader:
+    def __init__(self, state):
+        # `state` is app.state: holds fraud_engine and (optionally) scoring_executor
+        self._state = state
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.last_result: Optional[dict] = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self._lock.locked()
+
+    def reload(self, force: bool = False, job: Optional[Job] = None) -> dict:
+        """
+        Load, validate and (if it passes) swap in a new engine. Returns the
+        outcome; raises RuntimeError("RELOAD_IN_PROGRESS") if one is running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("RELOAD_IN_PROGRESS")
+        try:
+            if job is not None:
+                job.start()
+            result = self._reload(force)
+            self.last_result = result
+            if job is not None:
+                job.meta.update(result)
+                if result["status"] == "failed":
+                    job.fail(result.get("reason", "Reload failed."))
+                else:
+                    job.finish()
+            return result
+        except Exception as exc:
+            logger.error("Model reload failed: %s", exc)
+            self.last_result = {"status": "failed", "reason": str(exc) or type(exc).__name__}
+            if job is not None:
+                job.fail(self.last_result["reason"])
+            return self.last_result
+        finally:
+            self._lock.release()
+
+    def _reload(self, force: bool) -> dict:
+        serving: FraudEngine = self._state.fraud_engine
+        candidate = FraudEngine(model_dir=serving.model_dir)
+        try:
+            candidate.load()
+        except RuntimeError as exc:
+            return {"status": "failed", "reason": str(exc), "model_version": serving.model_version}
+
+        if candidate.model_version == serving.model_version and serving.is_ready and not force:
+            return {"status": "unchanged", "model_version": serving.model_version}
+
+        report = validate_candidate(candidate, serving, force=force)
+        if not report["passed"]:
+            logger.warning("Model candidate rejected: %s", report.get("reason"))
+            return {
+                "status": "failed",
+                "reason": report.get("reason"),
+                "canary": report,
+                "model_version": serving.model_version,
+                "candidate_version": candidate.model_version,
+            }
+
+        # Workers load the same on-disk artifacts; warm them before the swap so
+        # process-pool and in-process scoring never disagree for long.
+        executor = getattr(self._state, "scoring_executor", None)
+        if executor is not None:
+            executor.restart(model_dir=candidate.model_dir)
+
+        self._state.fraud_engine = candidate
+        logger.info(
+            "Model swapped: %s -> %s (scorer=%s, source=%s)",
+            (serving.model_version or "none")[:12], candidate.model_version[:12],
+            candidate.scorer, candidate.artifact_source,
+        )
+        return {
+            "status": "swapped",
+            "previous_version": serving.model_version,
+            "model_version": candidate.model_version,
+            "scorer": candidate.scorer,
+            "canary": report,
+        }
+
+    # ── File watcher ────────────────────────────────────────────────────────
+    def start_watching(self, interval: float = MODEL_WATCH_INTERVAL_SECONDS):
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="model-watcher", daemon=True
+        )
+        self._watcher.start()
+        logger.info("Watching model artifacts every %gs.", interval)
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self, interval: float):
+        model_dir = self._state.fraud_engine.model_dir
+        seen = _artifact_signature(model_dir)
+        pending = None
+        while not self._stop.wait(interval):
+            current = _artifact_signature(model_dir)
+            if current == seen:
+                pending = None
+                continue
+            if current != pending:
+                # Changed since the last poll: wait one more interval for writes to settle
+                pending = current
+                continue
+            try:
+                result = self.reload()
+            except RuntimeError:
+                continue  # a manual reload is running; look again next interval
+            logger.info("Artifact change detected; reload %s.", result["status"])
+            seen = current
+            pending = None
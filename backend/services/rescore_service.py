@@ -0,0 +1,144 @@
+"""
+Rescore Service — bulk rescoring of stored claims after a rule, band or model change.
+
+Stored FraudAnalysis rows keep the rule triggers, threat level and enforcement
+state computed when each claim was submitted. A rescore job walks the claims
+table in submission order (created_at, claim_id) with keyset pagination, one
+RESCORE_CHUNK_SIZE chunk at a time:
+
+  1. features persisted in claim_features at the current FEATURE_VERSION are
+     read back; any other claim is featurized against a scratch
+     FeatureStateStore holding only the claims submitted before it — the same
+     history it was first scored with. Every claim is folded into the store.
+  2. the chunk is scored with one engine call and one vectorized rule pass,
+     using the rule settings and threat bands captured when the job started
+  3. the chunk's FraudAnalysis rows are rewritten with one executemany UPDATE,
+     features computed in step 1 are written to claim_features (so a rescore
+     also backfills missing or stale feature rows), and the chunk is committed
+
+Progress, ETA and throughput are reported on the job record. Only one rescore
+runs at a time per process: requesting another cancels the running one (at its
+next chunk boundary) and starts over, so the final pass always uses the latest
+config. Rescores in other processes are not cancelled, but step 3 locks the
+rows it rewrites until the commit, so the rollup tables stay exact either way.
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from backend import crud
+from backend.database import SessionLocal
+from backend.ml.feature_state import FeatureStateStore
+from backend.ml.risk_engine import FraudEngine
+from backend.services.fraud_service import (
+    build_intelligence, load_rule_settings, load_threat_bands, replay_page_features,
+    rule_trigger_masks,
+)
+from backend.services.job_registry import Job, create_job
+
+logger = logging.getLogger("rescore_service")
+
+RESCORE_JOB_KIND = "rescore"
+RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "5000"))
+
+_lock = threading.Lock()
+_active: Optional[tuple] = None  # (job, cancel event, thread)
+
+
+def _rescore_chunk(db: Session, claims: list, store: FeatureStateStore, engine: FraudEngine,
+                   rule_settings: dict, bands: tuple) -> tuple:
+    """Featurize, score and build analyses for one chunk; returns (updates, errors, computed features)."""
+    feats, computed = replay_page_features(db, claims, store)
+
+    scores = engine.score_frame(feats)
+    masks = rule_trigger_masks(feats, rule_settings)
+    zscores = feats["claim_amount_zscore"].to_numpy(dtype=float)
+
+    updates, errors = [], []
+    for i, claim in enumerate(claims):
+        triggers = {key: bool(mask[i]) for key, mask in masks.items()}
+        try:
+            _, analysis, _ = build_intelligence(claim["claim_id"], scores[i], triggers, float(zscores[i]), bands)
+        except RuntimeError as exc:
+            errors.append({"claim_id": claim["claim_id"], "error": "SCORING_ERROR", "detail": str(exc)})
+            continue
+        updates.append(analysis)
+    return updates, errors, computed
+
+
+def run_rescore(job: Job, engine: FraudEngine, cancel: threading.Event, chunk_size: int = RESCORE_CHUNK_SIZE):
+    """Rescore every stored claim, updating `job` as chunks complete."""
+    with SessionLocal() as db:
+        job.total_units = crud.count_claims(db)
+        rule_settings = load_rule_settings(db)
+        bands = load_threat_bands(db)
+    job.meta.update({
+        "chunk_size": chunk_size,
+        "chunks_completed": 0,
+        "features_computed": 0,
+        "model_version": engine.model_version,
+        "threat_bands": list(bands),
+    })
+    job.start()
+
+    store = FeatureStateStore()
+    after = None
+    try:
+        while True:
+            if cancel.is_set():
+                job.fail("Cancelled: superseded by a newer rescore request.")
+                logger.info("Rescore job cancelled", extra={"job_id": job.job_id})
+                return
+            with SessionLocal() as db:
+                claims = crud.get_claims_page_by_submission(db, after, chunk_size)
+                if not claims:
+                    break
+                updates, errors, computed = _rescore_chunk(db, claims, store, engine, rule_settings, bands)
+                crud.bulk_update_fraud_analyses(db, updates)
+                crud.upsert_claim_features(db, computed)
+                crud.bump_cache_version(db, crud.ANALYSES_CACHE_SCOPE)
+                db.commit()
+            last = claims[-1]
+            after = (last["created_at"], last["claim_id"])
+            job.advance(processed=len(claims), succeeded=len(updates), failed=len(errors), units=len(claims))
+            job.add_errors(errors)
+            job.meta["chunks_completed"] += 1
+            job.meta["features_computed"] += len(computed)
+    except Exception as exc:
+        job.fail(str(exc) or type(exc).__name__)
+        logger.error("Rescore job failed", extra={"job_id": job.job_id, "error_type": type(exc).__name__})
+        return
+
+    job.finish()
+    logger.info(
+        "Rescore job completed",
+        extra={"job_id": job.job_id, "processed": job.processed, "succeeded": job.succeeded, "failed": job.failed},
+    )
+
+
+def start_rescore(engine: FraudEngine, reason: str, chunk_size: int = RESCORE_CHUNK_SIZE) -> Job:
+    """
+    Start a background rescore job and return it. A rescore already running is
+    cancelled first; the new job waits for it to stop before reading claims.
+    """
+    global _active
+    with _lock:
+        previous = _active
+        if previous is not None:
+            previous[1].set()
+        job = create_job(RESCORE_JOB_KIND, unit="claims")
+        job.meta["reason"] = reason
+        cancel = threading.Event()
+
+        def _run():
+            if previous is not None:
+                previous[2].join()
+            run_rescore(job, engine, cancel, chunk_size)
+
+        thread = threading.Thread(target=_run, name=f"rescore-{job.job_id}", daemon=True)
+        _active = (job, cancel, thread)
+        thread.start()
+    return job
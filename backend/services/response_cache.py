@@ -0,0 +1,196 @@
+"""
+Response Cache — versioned in-memory cache of read-heavy analytics responses.
+
+Entries are keyed by request path + query string and tagged with the data
+version (crud.get_data_version: scored-claim count, analyses and config
+version counters) current when they were computed. Every lookup reads that
+version — one single-row round trip — so any committed score, rescore chunk
+or config change, from any worker, turns the next lookup into a miss. On top
+of that, entries expire after RESPONSE_CACHE_TTL_SECONDS and the least
+recently used ones are evicted beyond RESPONSE_CACHE_MAX_ENTRIES entries or
+RESPONSE_CACHE_MAX_BYTES bytes of body.
+
+Responses carry a strong ETag (a hash of the body) and Cache-Control:
+no-cache, so clients revalidate with If-None-Match and get 304 Not Modified
+while the body is unchanged. Hit / miss / 304 counters are kept per route;
+see GET /internal/response-cache.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from backend import crud
+
+logger = logging.getLogger("response_cache")
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_COUNTERS = ("hits", "misses", "not_modified", "stale", "expired")
+
+
+class _Entry:
+    __slots__ = ("version", "etag", "body", "expires_at")
+
+    def __init__(self, version: tuple, etag: str, body: bytes, expires_at: float):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._counters: dict = {}
+        self._evictions = 0
+
+    def _count(self, route: str, counter: str):
+        counts = self._counters.setdefault(route, dict.fromkeys(_COUNTERS, 0))
+        counts[counter] += 1
+
+    def _drop(self, key) -> _Entry:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        return entry
+
+    def get(self, route: str, key, version: tuple) -> Optional[_Entry]:
+        """The live entry for key at this data version (counted as a hit), else None (a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                self._drop(key)
+                self._count(route, "stale")
+                entry = None
+            elif entry is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                self._count(route, "expired")
+                entry = None
+            if entry is None:
+                self._count(route, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count(route, "hits")
+            return entry
+
+    def put(self, key, entry: _Entry):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if len(entry.body) > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def count_not_modified(self, route: str):
+        with self._lock:
+            self._count(route, "not_modified")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {route: dict(counts) for route, counts in self._counters.items()}
+            entries, size, evictions = len(self._entries), self._bytes, self._evictions
+        totals = {name: sum(counts[name] for counts in routes.values()) for name in _COUNTERS}
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            **totals,
+            "evictions": evictions,
+            "hit_ratio": round(totals["hits"] / lookups, 4) if lookups else 0.0,
+            "routes": routes,
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+_adapters: dict = {}
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache configured from RESPONSE_CACHE_* environment variables."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES,
+                )
+    return _cache
+
+
+def _serialize(value, response_model) -> bytes:
+    # Same filtering and encoding FastAPI applies to a route's return value
+    if response_model is not None:
+        adapter = _adapters.get(response_model)
+        if adapter is None:
+            adapter = _adapters[response_model] = TypeAdapter(response_model)
+        value = adapter.validate_python(value, from_attributes=True)
+    return json.dumps(jsonable_encoder(value), separators=(",", ":")).encode("utf-8")
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def cached_response(request: Request, db: Session, compute: Callable, response_model=None) -> Response:
+    """
+    JSON response for this request from the cache, or from compute() (then
+    cached). 304 when the client's If-None-Match already names the body.
+    Exceptions from compute() (e.g. a 404) propagate and are not cached.
+    """
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    if not RESPONSE_CACHE_ENABLED:
+        body = _serialize(compute(), response_model)
+        return Response(body, media_type="application/json")
+
+    cache = get_response_cache()
+    # Version before compute (as in config_cache): a concurrent commit can
+    # only make the entry look older than its contents, never newer
+    version = crud.get_data_version(db)
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    entry = cache.get(route, key, version)
+    if entry is None:
+        body = _serialize(compute(), response_model)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        entry = _Entry(version, etag, body, time.monotonic() + cache.ttl_seconds)
+        cache.put(key, entry)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, entry.etag):
+        cache.count_not_modified(route)
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
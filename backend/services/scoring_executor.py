@@ -0,0 +1,194 @@
+"""
+Scoring Executor — process pool for the CPU-bound half of single-claim scoring.
+
+Feature math, forest traversal, rule evaluation and the intelligence layer run
+in worker processes, each holding a warm FraudEngine (mapped from the compiled
+export, so workers share one copy of the model). The API process keeps
+everything that touches the database: duplicate check, history loading,
+inserts and the commit.
+
+SCORING_WORKERS sets the pool size: "0" (default) scores in-process, "auto"
+uses one worker per core, any other integer is taken literally. The pool is
+started at boot and warmed (every worker loads its engine) before serving.
+stats() reports queue depth, in-flight tasks and wait / service time
+percentiles over the last SCORING_METRICS_WINDOW tasks.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+logger = logging.getLogger("scoring_executor")
+
+SCORING_TIMEOUT_SECONDS = float(os.getenv("SCORING_TIMEOUT_SECONDS", "30"))
+SCORING_METRICS_WINDOW = int(os.getenv("SCORING_METRICS_WINDOW", "1000"))
+
+# ── Worker process side ─────────────────────────────────────────────────────
+_worker_engine = None
+
+
+def _init_worker(scorer: Optional[str], model_dir: Optional[str]):
+    global _worker_engine
+    from backend.ml.risk_engine import FraudEngine
+
+    engine = FraudEngine(model_dir=model_dir)
+    engine.load(scorer)
+    _worker_engine = engine
+
+
+def _warmup() -> int:
+    import backend.services.fraud_service  # noqa: F401 — pay the import before the first claim
+    return os.getpid()
+
+
+def _run_scoring(claim_data: dict, history: dict, rule_settings: dict, bands: tuple) -> tuple:
+    from backend.services.fraud_service import score_from_history
+
+    started = time.time()
+    outcome = score_from_history(claim_data, history, _worker_engine, rule_settings, bands)
+    return outcome, started, time.time()
+
+
+# ── API process side ────────────────────────────────────────────────────────
+def _percentile(values: list, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+
+class ScoringExecutor:
+    def __init__(self, workers: int, scorer: Optional[str] = None, model_dir: Optional[str] = None):
+        self.workers = workers
+        self.scorer = scorer
+        self.model_dir = model_dir
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self._wait_s: deque = deque(maxlen=SCORING_METRICS_WINDOW)
+        self._service_s: deque = deque(maxlen=SCORING_METRICS_WINDOW)
+
+    def _warm_pool(self) -> ProcessPoolExecutor:
+        """A new pool whose workers have all loaded their engine."""
+        # spawn: workers must not inherit the API process's threads or DB connections
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.scorer, self.model_dir),
+        )
+        pids = {f.result() for f in [pool.submit(_warmup) for _ in range(self.workers * 2)]}
+        logger.info("Scoring executor pool warm: %d workers (%d seen).", self.workers, len(pids))
+        return pool
+
+    def start(self):
+        """Start the pool and block until every worker has loaded its engine."""
+        if self._pool is not None:
+            return
+        self._pool = self._warm_pool()
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def restart(self, scorer: Optional[str] = None, model_dir: Optional[str] = None):
+        """
+        Replace the pool (e.g. after a model swap). The new pool is warmed
+        before it takes traffic; tasks already on the old pool finish there.
+        """
+        if scorer is not None:
+            self.scorer = scorer
+        if model_dir is not None:
+            self.model_dir = model_dir
+        with self._restart_lock:
+            old, self._pool = self._pool, self._warm_pool()
+            self.restarts += 1
+        if old is not None:
+            old.shutdown(wait=True)
+
+    def _replace_broken(self, pool: ProcessPoolExecutor):
+        # A worker died (OOM kill, segfault); the pool is unusable from here on.
+        # Like restart(), warm the replacement first and swap it in with one
+        # assignment, so concurrent score() calls never see the pool missing.
+        with self._restart_lock:
+            if self._pool is not pool:
+                return
+            logger.error("Scoring worker died; restarting the process pool.")
+            self._pool = self._warm_pool()
+            self.restarts += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def is_running(self) -> bool:
+        return self._pool is not None
+
+    def score(self, claim_data: dict, history: dict, rule_settings: dict, bands: tuple) -> Optional[tuple]:
+        """
+        Run score_from_history in a worker; blocks the calling thread, not the GIL.
+        Returns None when no pool is running (not started, or shut down), for
+        the caller to score in-process instead.
+        """
+        pool = self._pool
+        if pool is None:
+            return None
+        with self._lock:
+            self.submitted += 1
+        submitted_at = time.time()
+        try:
+            future = pool.submit(_run_scoring, claim_data, history, rule_settings, bands)
+            outcome, started_at, finished_at = future.result(timeout=SCORING_TIMEOUT_SECONDS)
+        except Exception as exc:
+            with self._lock:
+                self.failed += 1
+            if isinstance(exc, BrokenProcessPool):
+                self._replace_broken(pool)
+            raise
+        with self._lock:
+            self.completed += 1
+            self._wait_s.append(max(0.0, started_at - submitted_at))
+            self._service_s.append(finished_at - started_at)
+        return outcome
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = list(self._wait_s)
+            services = list(self._service_s)
+            in_flight = self.submitted - self.completed - self.failed
+            return {
+                "mode": "process" if self.is_running else "stopped",
+                "workers": self.workers,
+                "scorer": self.scorer,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+                "in_flight": in_flight,
+                "queue_depth": max(0, in_flight - self.workers),
+                "wait_ms": {"p50": _percentile(waits, 0.50), "p95": _percentile(waits, 0.95), "max": _percentile(waits, 1.0)},
+                "service_ms": {"p50": _percentile(services, 0.50), "p95": _percentile(services, 0.95), "max": _percentile(services, 1.0)},
+            }
+
+
+def configured_workers() -> int:
+    value = os.getenv("SCORING_WORKERS", "0").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(value))
+
+
+def create_scoring_executor(scorer: Optional[str] = None) -> Optional[ScoringExecutor]:
+    """Executor sized from SCORING_WORKERS, or None for in-process scoring."""
+    workers = configured_workers()
+    if workers == 0:
+        return None
+    return ScoringExecutor(workers, scorer)
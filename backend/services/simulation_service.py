@@ -0,0 +1,322 @@
+"""
+Simulation Service — read-only what-if evaluation of rule thresholds and threat bands.
+
+A process-wide FeatureMatrixCache keeps, for every stored claim in submission
+order, the feature columns the deterministic rules read plus the stored
+composite index and anomaly score. It is built once from the persisted
+claim_features rows, replaying the claims table through a FeatureStateStore
+(the same history each claim was scored with) only for claims whose features
+are missing or stale, then kept current cheaply: claims submitted since the last refresh are
+appended by keyset paging, and the stored scores are re-read only when the
+"analyses" cache version moves (a rescore rewrote them).
+
+simulate_thresholds evaluates the current config and a proposal side by side
+over the cached columns with NumPy: rule triggers, fraud pattern, confidence,
+threat level and enforcement state for every claim, aggregated overall and per
+hospital. Nothing is written.
+
+Note that rule thresholds only move triggers, patterns and confidence: the
+composite index comes from the stored final risk score, so threat levels (and
+hence enforcement states) move only with the band edges.
+"""
+import logging
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend import crud
+from backend.ml.feature_state import FeatureStateStore
+from backend.services.fraud_service import (
+    RULE_META, load_rule_settings, load_threat_bands, replay_page_features, rule_trigger_masks,
+)
+
+logger = logging.getLogger("simulation_service")
+
+THREAT_LEVELS = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+ENFORCEMENT_STATES = ("CLEAR", "MONITOR", "ESCALATED", "HARD_STOP")  # one per threat level
+FRAUD_PATTERNS = ("NONE", "PHANTOM", "UPCODING", "REPEAT_ABUSE", "MIXED")
+
+_RULE_INPUTS = (
+    "is_zero_day_stay", "is_inpatient", "claim_amount_zscore", "same_proc_repeat_flag",
+    "claim_to_package_ratio", "patient_claim_freq_30d",
+)
+_PAGE_SIZE = 5000
+
+
+class FeatureMatrixCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._store = FeatureStateStore()
+        self._after: Optional[tuple] = None
+        self._analyses_version: Optional[int] = None
+        self._position: dict = {}
+        self._hospital_codes: dict = {}
+        self.hospitals: list = []
+        self.hospital_index = np.empty(0, dtype=np.int64)
+        self.columns = {name: np.empty(0) for name in _RULE_INPUTS}
+        self.composite_index = np.empty(0, dtype=np.int64)
+        self.anomaly_score_norm = np.empty(0)
+
+    def __len__(self) -> int:
+        return len(self.composite_index)
+
+    def refresh(self, db: Session) -> dict:
+        """Bring the cache up to date; returns what had to be done."""
+        with self._lock:
+            # Version before rows (as in config_cache): never miss a rewrite
+            version = crud.get_cache_version(db, crud.ANALYSES_CACHE_SCOPE)
+            first_build = self._analyses_version is None
+            appended = self._append_new_claims(db)
+            rescored = not first_build and version != self._analyses_version
+            if rescored:
+                self._reload_scores(db)
+            self._analyses_version = version
+            return {"rows": len(self), "appended": appended, "scores_reloaded": rescored}
+
+    def _append_new_claims(self, db: Session) -> int:
+        appended = 0
+        while True:
+            claims = crud.get_claims_page_by_submission(db, self._after, _PAGE_SIZE)
+            if not claims:
+                return appended
+            feats, _ = replay_page_features(db, claims, self._store)
+            start = len(self)
+            ids = [claim["claim_id"] for claim in claims]
+            for offset, claim_id in enumerate(ids):
+                self._position[claim_id] = start + offset
+
+            for name in _RULE_INPUTS:
+                self.columns[name] = np.concatenate([self.columns[name], feats[name].to_numpy(dtype=np.float64)])
+            codes = [self._hospital_code(claim["hospital_id"]) for claim in claims]
+            self.hospital_index = np.concatenate([self.hospital_index, np.asarray(codes, dtype=np.int64)])
+
+            # Claims without an analysis keep composite -1 and are left out of every count
+            composite = np.full(len(claims), -1, dtype=np.int64)
+            anomaly = np.zeros(len(claims))
+            for claim_id, ci, a_norm in crud.get_analysis_scores(db, ids):
+                i = self._position[claim_id] - start
+                composite[i] = ci if ci is not None else -1
+                anomaly[i] = a_norm or 0.0
+            self.composite_index = np.concatenate([self.composite_index, composite])
+            self.anomaly_score_norm = np.concatenate([self.anomaly_score_norm, anomaly])
+
+            last = claims[-1]
+            self._after = (last["created_at"], last["claim_id"])
+            appended += len(claims)
+
+    def _reload_scores(self, db: Session):
+        # New arrays, swapped in whole, so a running simulation keeps a consistent view
+        composite = np.full(len(self), -1, dtype=np.int64)
+        anomaly = np.zeros(len(self))
+        for claim_id, ci, a_norm in crud.get_analysis_scores(db):
+            i = self._position.get(claim_id)
+            if i is not None:
+                composite[i] = ci if ci is not None else -1
+                anomaly[i] = a_norm or 0.0
+        self.composite_index = composite
+        self.anomaly_score_norm = anomaly
+
+    def snapshot(self) -> SimpleNamespace:
+        """Consistent references to the current arrays (never mutated in place)."""
+        with self._lock:
+            return SimpleNamespace(
+                columns=dict(self.columns),
+                composite_index=self.composite_index,
+                anomaly_score_norm=self.anomaly_score_norm,
+                hospital_index=self.hospital_index,
+                hospitals=list(self.hospitals),
+            )
+
+    def _hospital_code(self, hospital_id: str) -> int:
+        code = self._hospital_codes.get(hospital_id)
+        if code is None:
+            code = self._hospital_codes[hospital_id] = len(self.hospitals)
+            self.hospitals.append(hospital_id)
+        return code
+
+
+_cache: Optional[FeatureMatrixCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_feature_matrix_cache() -> FeatureMatrixCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FeatureMatrixCache()
+    return _cache
+
+
+# ── Vectorized evaluation ───────────────────────────────────────────────────
+def _evaluate(cache: SimpleNamespace, rule_settings: dict, bands: tuple) -> dict:
+    masks = rule_trigger_masks(cache.columns, rule_settings)
+    active = sum(mask.astype(np.int64) for mask in masks.values())
+
+    phantom = masks["zero_day_inpatient"]
+    upcoding = masks["high_amount_zscore"] | masks["near_package_ceiling"]
+    repeat = masks["repeat_procedure_flag"] | masks["high_patient_frequency"]
+    families = phantom.astype(np.int64) + upcoding + repeat
+    # Index into FRAUD_PATTERNS, same precedence as _detect_fraud_pattern
+    pattern = np.select(
+        [families == 0, families > 1, phantom, upcoding],
+        [0, 4, 1, 2],
+        default=3,
+    )
+
+    density = np.minimum(active / len(masks), 1.0)
+    zscore_intensity = np.clip(np.abs(cache.columns["claim_amount_zscore"]) / 5.0, 0.0, 1.0)
+    raw = 0.5 * cache.anomaly_score_norm + 0.3 * density + 0.2 * zscore_intensity
+    confidence = np.clip(np.rint(raw * 100), 0, 100)
+
+    low_max, medium_max, high_max = bands
+    ci = cache.composite_index
+    threat = np.select([ci <= low_max, ci <= medium_max, ci <= high_max], [0, 1, 2], default=3)
+    return {"masks": masks, "pattern": pattern, "confidence": confidence, "threat": threat}
+
+
+def _distribution(codes: np.ndarray, labels: tuple) -> dict:
+    counts = np.bincount(codes, minlength=len(labels))
+    return {label: int(n) for label, n in zip(labels, counts)}
+
+
+def _merge_settings(current: dict, overrides: dict) -> dict:
+    unknown = sorted(set(overrides) - set(RULE_META))
+    if unknown:
+        raise ValueError(f"Unknown rule keys: {', '.join(unknown)}")
+    merged = dict(current)
+    for key, override in overrides.items():
+        enabled, threshold = merged[key]
+        if override.get("is_enabled") is not None:
+            enabled = override["is_enabled"]
+        if override.get("threshold_value") is not None:
+            if threshold is None:
+                raise ValueError(f"Rule '{key}' has no threshold to override.")
+            threshold = float(override["threshold_value"])
+        merged[key] = (enabled, threshold)
+    return merged
+
+
+def _merge_bands(current: tuple, overrides: Optional[dict]) -> tuple:
+    low_max, medium_max, high_max = current
+    if overrides:
+        low_max = overrides.get("LOW_MAX") if overrides.get("LOW_MAX") is not None else low_max
+        medium_max = overrides.get("MEDIUM_MAX") if overrides.get("MEDIUM_MAX") is not None else medium_max
+        high_max = overrides.get("HIGH_MAX") if overrides.get("HIGH_MAX") is not None else high_max
+    if not (low_max < medium_max < high_max):
+        raise ValueError("Band edges must satisfy LOW_MAX < MEDIUM_MAX < HIGH_MAX.")
+    return low_max, medium_max, high_max
+
+
+def simulate_thresholds(
+    db: Session,
+    rule_overrides: dict,
+    band_overrides: Optional[dict] = None,
+    hospital_limit: int = 20,
+) -> dict:
+    """
+    Compare the current rule / band configuration against a proposal over all
+    stored claims. Raises ValueError for unknown rules or inconsistent bands.
+    """
+    current_rules = load_rule_settings(db)
+    current_bands = load_threat_bands(db)
+    proposed_rules = _merge_settings(current_rules, rule_overrides)
+    proposed_bands = _merge_bands(current_bands, band_overrides)
+
+    t0 = time.perf_counter()
+    refresh = get_feature_matrix_cache().refresh(db)
+    cache = get_feature_matrix_cache().snapshot()
+    refresh_ms = (time.perf_counter() - t0) * 1000
+
+    t1 = time.perf_counter()
+    scored = cache.composite_index >= 0
+    before = _evaluate(cache, current_rules, current_bands)
+    after = _evaluate(cache, proposed_rules, proposed_bands)
+
+    threat_before = before["threat"][scored]
+    threat_after = after["threat"][scored]
+    moved = threat_before != threat_after
+    transitions = np.bincount(
+        threat_before[moved] * len(THREAT_LEVELS) + threat_after[moved],
+        minlength=len(THREAT_LEVELS) ** 2,
+    )
+
+    trigger_counts = {
+        key: {
+            "current": int(before["masks"][key][scored].sum()),
+            "proposed": int(after["masks"][key][scored].sum()),
+        }
+        for key in RULE_META
+    }
+
+    # Per-hospital: claims per threat level before/after and the number that move
+    n_hosp = len(cache.hospitals)
+    hosp = cache.hospital_index[scored]
+    per_level_before = np.bincount(hosp * len(THREAT_LEVELS) + threat_before, minlength=n_hosp * len(THREAT_LEVELS))
+    per_level_after = np.bincount(hosp * len(THREAT_LEVELS) + threat_after, minlength=n_hosp * len(THREAT_LEVELS))
+    per_level_before = per_level_before.reshape(n_hosp, len(THREAT_LEVELS))
+    per_level_after = per_level_after.reshape(n_hosp, len(THREAT_LEVELS))
+    escalated = np.bincount(hosp[threat_after > threat_before], minlength=n_hosp)
+    deescalated = np.bincount(hosp[threat_after < threat_before], minlength=n_hosp)
+    trig_before = np.bincount(hosp, weights=sum(m[scored] for m in before["masks"].values()), minlength=n_hosp)
+    trig_after = np.bincount(hosp, weights=sum(m[scored] for m in after["masks"].values()), minlength=n_hosp)
+    claims_per_hosp = np.bincount(hosp, minlength=n_hosp)
+
+    order = np.lexsort((-np.abs(trig_after - trig_before), -(escalated + deescalated)))
+    hospital_deltas = [
+        {
+            "hospital_id": cache.hospitals[h],
+            "claims": int(claims_per_hosp[h]),
+            "escalated": int(escalated[h]),
+            "deescalated": int(deescalated[h]),
+            "threat_level_delta": {
+                level: int(per_level_after[h, k] - per_level_before[h, k])
+                for k, level in enumerate(THREAT_LEVELS)
+            },
+            "rule_trigger_delta": int(trig_after[h] - trig_before[h]),
+        }
+        for h in order[:hospital_limit]
+        if claims_per_hosp[h]
+    ]
+    compute_ms = (time.perf_counter() - t1) * 1000
+
+    return {
+        "claims": int(scored.sum()),
+        "current": {
+            "rules": {k: {"is_enabled": bool(e), "threshold_value": t} for k, (e, t) in current_rules.items()},
+            "bands": dict(zip(("LOW_MAX", "MEDIUM_MAX", "HIGH_MAX"), current_bands)),
+        },
+        "proposed": {
+            "rules": {k: {"is_enabled": bool(e), "threshold_value": t} for k, (e, t) in proposed_rules.items()},
+            "bands": dict(zip(("LOW_MAX", "MEDIUM_MAX", "HIGH_MAX"), proposed_bands)),
+        },
+        "threat_level_distribution": {
+            "current": _distribution(threat_before, THREAT_LEVELS),
+            "proposed": _distribution(threat_after, THREAT_LEVELS),
+        },
+        "enforcement_distribution": {
+            "current": _distribution(threat_before, ENFORCEMENT_STATES),
+            "proposed": _distribution(threat_after, ENFORCEMENT_STATES),
+        },
+        "threat_transitions": {
+            f"{THREAT_LEVELS[i // len(THREAT_LEVELS)]}->{THREAT_LEVELS[i % len(THREAT_LEVELS)]}": int(n)
+            for i, n in enumerate(transitions) if n
+        },
+        "claims_changing_threat_level": int(moved.sum()),
+        "rule_trigger_counts": trigger_counts,
+        "fraud_pattern_distribution": {
+            "current": _distribution(before["pattern"][scored], FRAUD_PATTERNS),
+            "proposed": _distribution(after["pattern"][scored], FRAUD_PATTERNS),
+        },
+        "average_confidence": {
+            "current": round(float(before["confidence"][scored].mean()), 2) if scored.any() else 0.0,
+            "proposed": round(float(after["confidence"][scored].mean()), 2) if scored.any() else 0.0,
+        },
+        "hospital_deltas": hospital_deltas,
+        "timing_ms": {"cache_refresh": round(refresh_ms, 2), "simulation": round(compute_ms, 2)},
+        "cache": refresh,
+    }
@@ -0,0 +1,203 @@
+"""
+Telemetry Sink — non-blocking writer for per-claim scoring telemetry.
+
+The scoring path only enqueues a payload dict (never blocks: when the bounded
+queue is full the payload is dropped and counted). A background thread drains
+the queue in batches, appends JSON lines to the telemetry file, and rotates it
+by size or age; rotated segments are gzip-compressed and pruned to
+TELEMETRY_BACKUP_COUNT files.
+"""
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger("telemetry")
+
+
+class TelemetrySink:
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        max_age_seconds: float = 3600.0,
+        backup_count: int = 10,
+        compress: bool = True,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.backup_count = backup_count
+        self.compress = compress
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._opened_at = 0.0
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    # ── Producer side (request path) ────────────────────────────────────────
+    def emit(self, payload: dict) -> bool:
+        """Enqueue one payload without blocking. Returns False if it was dropped."""
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def emit_many(self, payloads: list):
+        for payload in payloads:
+            self.emit(payload)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+        }
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush whatever is queued and stop the writer thread."""
+        with self._start_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stop.set()
+            thread.join(timeout)
+            self._thread = None
+
+    # ── Writer thread ────────────────────────────────────────────────────────
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+        self._close()
+
+    def _write(self, batch: list):
+        try:
+            if self._file is None:
+                self._open()
+            self._file.write("".join(json.dumps(p, default=str) + "\n" for p in batch))
+            self._file.flush()
+            self.written += len(batch)
+        except Exception as exc:
+            self.write_errors += 1
+            self.dropped += len(batch)
+            logger.warning("Telemetry write failed: %s", exc)
+            self._close()
+            return
+        self._maybe_rotate()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        too_big = self._file.tell() >= self.max_bytes
+        too_old = self._file.tell() > 0 and time.monotonic() - self._opened_at >= self.max_age_seconds
+        if too_big or too_old:
+            self._rotate()
+
+    def _rotate(self):
+        self._close()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        rotated = f"{self.path}.{stamp}"
+        try:
+            os.replace(self.path, rotated)
+            if self.compress:
+                with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(rotated)
+            self.rotations += 1
+        except OSError as exc:
+            self.write_errors += 1
+            logger.warning("Telemetry rotation failed: %s", exc)
+        self._prune()
+
+    def _prune(self):
+        segments = sorted(glob.glob(glob.escape(self.path) + ".*"))
+        for old in segments[:-self.backup_count] if self.backup_count > 0 else segments:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+_sink: Optional[TelemetrySink] = None
+_sink_lock = threading.Lock()
+
+
+def get_telemetry_sink() -> TelemetrySink:
+    """Process-wide sink configured from TELEMETRY_* environment variables."""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = TelemetrySink(
+                    path=os.getenv("TELEMETRY_PATH", "intelligence_debug.jsonl"),
+                    max_queue=int(os.getenv("TELEMETRY_QUEUE_SIZE", "10000")),
+                    batch_size=int(os.getenv("TELEMETRY_BATCH_SIZE", "500")),
+                    flush_interval=float(os.getenv("TELEMETRY_FLUSH_SECONDS", "1")),
+                    max_bytes=int(os.getenv("TELEMETRY_MAX_BYTES", str(10 * 1024 * 1024))),
+                    max_age_seconds=float(os.getenv("TELEMETRY_ROTATE_SECONDS", "3600")),
+                    backup_count=int(os.getenv("TELEMETRY_BACKUP_COUNT", "10")),
+                    compress=os.getenv("TELEMETRY_COMPRESS", "true").lower() == "true",
+                )
+    return _sink
@@ -79,7 +79,7 @@ function DatasetExplorerContent() {
    const res = await fetch(`http://127.0.0.1:8000/api/v1/claims?${params.toString()}`)
    if (!res.ok) throw new Error("Failed to fetch claims")
    const data = await res.json()
-   setClaims(data)
+   setClaims(data.items)
   } catch (e: any) {
    setError(e.message)
   } finally {
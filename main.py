@@ -4,7 +4,8 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from backend.database import engine as db_engine, Base, SessionLocal
+from backend.database import engine as db_engine, SessionLocal
+from backend.migrations import migrate
 from backend.routers.fraud_router import router as fraud_router
 from backend.routers.internal_router import router as internal_router
 from backend.routers.report_router import router as report_router
@@ -13,9 +14,17 @@ from backend.routers.dataset_router import router as dataset_router
 from backend.routers.settings_router import router as settings_router
 from backend.routers.auth_router import router as auth_router
 from backend.routers.analytics_router import router as analytics_router
+from backend.routers.ingest_router import router as ingest_router
+from backend.routers.rescore_router import router as rescore_router
 from backend.ml.risk_engine import FraudEngine
+from backend.ml.feature_state import FeatureStateStore
 from backend import crud
 from backend.seed_demo_entities import seed_demo_data
+from backend.services.telemetry import get_telemetry_sink
+from backend.services.scoring_executor import create_scoring_executor
+from backend.services.claim_index import get_claim_index
+from backend.services.model_reloader import MODEL_WATCH, ModelReloader
+from backend.services.fraud_service import purge_expired_idempotency_keys
 
 load_dotenv()
 
@@ -26,24 +35,44 @@ logging.basicConfig(
 logger = logging.getLogger("main")
 
 
+def _load_fraud_engine() -> FraudEngine:
+    fraud_engine = FraudEngine()
+    try:
+        fraud_engine.load()
+        logger.info("FraudEngine loaded successfully (scorer=%s, source=%s).",
+                    fraud_engine.scorer, fraud_engine.artifact_source)
+        logger.info("FraudEngine + Composite Intelligence Layer Version 1.0 Loaded")
+    except RuntimeError as exc:
+        logger.error("FraudEngine failed to load: %s", exc)
+    return fraud_engine
+
+
+# PRELOAD_MODEL=true loads the engine at import time, so a pre-forking server
+# (gunicorn --preload -k uvicorn.workers.UvicornWorker) loads it once in the
+# master and every worker starts hot, sharing the mapped model pages.
+_preloaded_engine = _load_fraud_engine() if os.getenv("PRELOAD_MODEL", "false").lower() == "true" else None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=db_engine)
+    # Versioned schema changes (tables, indexes) not yet applied to this database
+    migrate(db_engine)
 
     # Seed default config tables on first boot (no-op if already populated)
     with SessionLocal() as db:
         crud.seed_rule_configs(db)
         crud.seed_system_configs(db)
+        if not crud.feature_aggregates_in_sync(db):
+            logger.info("Rebuilding feature aggregate tables from claims.")
+            crud.rebuild_feature_aggregates(db)
+        if not crud.analysis_rollup_in_sync(db):
+            logger.info("Rebuilding analysis rollup from fraud_analysis.")
+            crud.rebuild_analysis_rollup(db)
+        if not crud.hospital_loss_in_sync(db):
+            logger.info("Rebuilding hospital loss rollup from claims and fraud_analysis.")
+            crud.rebuild_hospital_loss(db)
 
-    fraud_engine = FraudEngine()
-    try:
-        fraud_engine.load()
-        logger.info("FraudEngine loaded successfully.")
-        logger.info("FraudEngine + Composite Intelligence Layer Version 1.0 Loaded")
-    except RuntimeError as exc:
-        logger.error("FraudEngine failed to load: %s", exc)
-
-    app.state.fraud_engine = fraud_engine
+    app.state.fraud_engine = _preloaded_engine or _load_fraud_engine()
 
     if os.getenv("DEMO_MODE", "false").lower() == "true":
         with SessionLocal() as db:
@@ -52,8 +81,41 @@ async def lifespan(app: FastAPI):
                 logger.info("Demo Dataset Loaded")
                 seed_demo_data()
 
+    # Rebuild incremental feature state from the claims table
+    feature_store = FeatureStateStore()
+    with SessionLocal() as db:
+        feature_store.rebuild(crud.iter_claims_for_features(db))
+    logger.info("Feature state store rebuilt from %d claims.", len(feature_store))
+    app.state.feature_store = feature_store
+
+    # Warm the duplicate-detection index and drop expired idempotency keys
+    with SessionLocal() as db:
+        get_claim_index().warm(crud.iter_claim_ids(db))
+        purged = purge_expired_idempotency_keys(db)
+    if purged:
+        logger.info("Purged %d expired idempotency keys.", purged)
+
+    # Optional process pool for CPU-bound scoring (SCORING_WORKERS)
+    scoring_executor = create_scoring_executor()
+    if scoring_executor is not None:
+        scoring_executor.start()
+    app.state.scoring_executor = scoring_executor
+
+    # Hot reload of model artifacts (POST /internal/model/reload, MODEL_WATCH)
+    model_reloader = ModelReloader(app.state)
+    app.state.model_reloader = model_reloader
+    if MODEL_WATCH:
+        model_reloader.start_watching()
+
+    get_telemetry_sink().start()
+
     yield
 
+    model_reloader.stop_watching()
+    get_telemetry_sink().stop()
+    if scoring_executor is not None:
+        scoring_executor.shutdown()
+
 
 app = FastAPI(
     title="PM-JAY Fraud Intelligence API",
@@ -83,3 +145,5 @@ app.include_router(rule_router, prefix="/api/v1", tags=["Rule Configuration"])
 app.include_router(dataset_router, prefix="/api/v1", tags=["Dataset Explorer"])
 app.include_router(settings_router, prefix="/api/v1", tags=["System Settings"])
 app.include_router(analytics_router, prefix="/api/v1", tags=["Analytics"])
+app.include_router(ingest_router, prefix="/api/v1", tags=["Claim Ingestion"])
+app.include_router(rescore_router, prefix="/api/v1", tags=["Bulk Rescoring"])
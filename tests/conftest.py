@@ -0,0 +1,49 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.database import Base
+from backend.ml.claims_generator import HOSPITALS, PROCEDURES, generate_claims, make_claim
+
+
+@pytest.fixture(scope="session")
+def generated_claims() -> list:
+    """The synthetic training set, as claim dicts in table order."""
+    return generate_claims().to_dict("records")
+
+
+@pytest.fixture(scope="session")
+def dense_claims() -> list:
+    """
+    Claims crowded onto few patients, hospitals and days, so every window
+    boundary, same-day tie and repeat procedure is exercised.
+    """
+    random.seed(7)  # make_claim draws the stay and amount from the module RNG
+    start = date(2024, 1, 1)
+    return [
+        make_claim(
+            f"T{i:04d}",
+            random.choice(HOSPITALS[:4]),
+            f"PAT{random.randint(1, 25):04d}",
+            random.choice(PROCEDURES),
+            start + timedelta(days=random.randint(0, 60)),
+        )
+        for i in range(400)
+    ]
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database with the full schema."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
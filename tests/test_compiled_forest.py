@@ -0,0 +1,115 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from backend.ml.compiled_forest import CompiledForest
+from backend.ml.model_artifacts import (
+    PICKLE_ARTIFACTS, compiled_dir, load_compiled_artifacts, save_compiled_artifacts,
+)
+from backend.ml.risk_engine import _MODEL_DIR, BINARY_FEATURES, CONTINUOUS_FEATURES, FraudEngine
+
+N_SCALED = len(CONTINUOUS_FEATURES)
+
+
+def feature_matrix(rng, n: int) -> np.ndarray:
+    X = np.empty((n, N_SCALED + len(BINARY_FEATURES)))
+    X[:, :N_SCALED] = rng.normal(0.0, 3.0, (n, N_SCALED)) * rng.uniform(0.5, 50.0, N_SCALED)
+    X[:, N_SCALED:] = rng.integers(0, 2, (n, len(BINARY_FEATURES)))
+    return X
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    """(forest, scaler, X_test): a forest fitted on scaled continuous columns, like the shipped model."""
+    rng = np.random.default_rng(0)
+    X = feature_matrix(rng, 2000)
+    scaler = StandardScaler().fit(X[:, :N_SCALED])
+    X_scaled = X.copy()
+    X_scaled[:, :N_SCALED] = scaler.transform(X[:, :N_SCALED])
+    forest = IsolationForest(n_estimators=60, max_features=0.75, random_state=0).fit(X_scaled)
+    return forest, scaler, feature_matrix(rng, 3000)
+
+
+def sklearn_scores(forest, scaler, X: np.ndarray) -> np.ndarray:
+    X_scaled = X.copy()
+    X_scaled[:, :N_SCALED] = scaler.transform(X[:, :N_SCALED])
+    return forest.score_samples(X_scaled)
+
+
+def test_compiled_forest_matches_sklearn(fitted):
+    forest, scaler, X = fitted
+    compiled = CompiledForest.from_sklearn(forest, scaler.mean_, scaler.scale_)
+
+    np.testing.assert_allclose(compiled.score_samples(X), sklearn_scores(forest, scaler, X), rtol=0, atol=1e-12)
+    assert compiled.verify_against(lambda rows: sklearn_scores(forest, scaler, rows), X) <= 1e-12
+
+
+def test_compiled_forest_without_scaler(fitted):
+    forest, scaler, X = fitted
+    X_scaled = X.copy()
+    X_scaled[:, :N_SCALED] = scaler.transform(X[:, :N_SCALED])
+
+    compiled = CompiledForest.from_sklearn(forest)
+
+    np.testing.assert_allclose(compiled.score_samples(X_scaled), forest.score_samples(X_scaled), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_npy_round_trip_is_bit_identical(fitted, tmp_path, mmap):
+    forest, scaler, X = fitted
+    compiled = CompiledForest.from_sklearn(forest, scaler.mean_, scaler.scale_)
+
+    meta = compiled.save(str(tmp_path))
+    loaded = CompiledForest.load(str(tmp_path), meta, mmap=mmap)
+
+    for name in ("feature", "threshold", "left", "right", "leaf_value", "roots"):
+        assert np.array_equal(getattr(loaded, name), getattr(compiled, name))
+        assert isinstance(getattr(loaded, name), np.memmap) is mmap
+    assert np.array_equal(loaded.score_samples(X), compiled.score_samples(X))
+
+
+def test_compiled_export_is_keyed_by_the_pickles(fitted, tmp_path):
+    forest, scaler, X = fitted
+    compiled = CompiledForest.from_sklearn(forest, scaler.mean_, scaler.scale_)
+    for name in PICKLE_ARTIFACTS:
+        (tmp_path / name).write_bytes(name.encode())
+
+    save_compiled_artifacts(str(tmp_path), compiled, scaler.mean_, scaler.scale_, -0.7, -0.3, 0.0)
+    bundle = load_compiled_artifacts(str(tmp_path))
+    assert bundle is not None
+    assert np.array_equal(bundle["forest"].score_samples(X), compiled.score_samples(X))
+    assert bundle["scaler_mean"] == list(scaler.mean_)
+    assert (bundle["A_min"], bundle["A_max"]) == (-0.7, -0.3)
+
+    (tmp_path / PICKLE_ARTIFACTS[0]).write_bytes(b"retrained")
+    assert load_compiled_artifacts(str(tmp_path)) is None
+
+
+@pytest.mark.skipif(
+    not all(os.path.exists(os.path.join(_MODEL_DIR, name)) for name in PICKLE_ARTIFACTS),
+    reason="trained model artifacts not present",
+)
+def test_engine_scorers_agree_on_shipped_model(tmp_path):
+    for name in PICKLE_ARTIFACTS:
+        shutil.copy(os.path.join(_MODEL_DIR, name), tmp_path / name)
+    sklearn_engine = FraudEngine(model_dir=str(tmp_path))
+    sklearn_engine.load(scorer="sklearn")
+    exported = FraudEngine(model_dir=str(tmp_path))
+    exported.load(scorer="compiled")  # compiles, verifies and writes the export
+    mapped = FraudEngine(model_dir=str(tmp_path))
+    mapped.load(scorer="compiled", mmap=True)
+
+    assert os.path.isdir(compiled_dir(str(tmp_path)))
+    assert mapped.artifact_source == "compiled-export"
+    X = feature_matrix(np.random.default_rng(1), 500)
+    inpatient = np.ones(len(X))
+    expected = sklearn_engine.score_batch(X, inpatient)
+    for engine in (exported, mapped):
+        result = engine.score_batch(X, inpatient)
+        for key in ("anomaly_score_norm", "rule_score_norm", "final_risk_score"):
+            np.testing.assert_allclose(result[key], expected[key], rtol=0, atol=1e-6)
+        assert np.array_equal(result["risk_level"], expected["risk_level"])
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from backend.ml.feature_engineering import FEATURE_OUTPUT_COLUMNS, compute_features
+
+
+@pytest.mark.parametrize("fixture", ["generated_claims", "dense_claims"])
+def test_vectorized_window_features_match_legacy(request, fixture):
+    df = pd.DataFrame(request.getfixturevalue(fixture))
+
+    fast = compute_features(df)
+    legacy = compute_features(df, legacy=True)
+
+    assert list(fast.columns) == FEATURE_OUTPUT_COLUMNS
+    pd.testing.assert_frame_equal(fast, legacy, check_exact=True)
+
+
+def test_same_day_claims_keep_input_order():
+    # An appended claim sorts after existing claims sharing its admission date
+    claims = [
+        {"claim_id": claim_id, "hospital_id": "H1", "patient_id": "PAT0001", "procedure_code": "P2",
+         "package_rate": 15000, "claim_amount": amount, "admission_date": "2024-01-10",
+         "discharge_date": "2024-01-11", "is_inpatient": 0}
+        for claim_id, amount in (("C1", 10000.0), ("C2", 12000.0), ("C3", 9000.0))
+    ]
+    features = compute_features(pd.DataFrame(claims)).set_index("claim_id")
+
+    assert features.loc["C1", "repeat_claim_amount_deviation"] == 1.0
+    assert features.loc["C2", "repeat_claim_amount_deviation"] == pytest.approx(0.2)
+    assert features.loc["C3", "repeat_claim_amount_deviation"] == pytest.approx(0.25)
+    assert list(features["days_since_last_claim"]) == [365.0, 0.0, 0.0]
@@ -0,0 +1,112 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from backend import crud
+from backend.ml.feature_engineering import FEATURE_OUTPUT_COLUMNS, compute_features
+from backend.ml.feature_state import FeatureStateStore, features_for_batch, features_from_history
+from backend.ml.risk_engine import MODEL_FEATURES
+
+
+def assert_features_close(actual: dict, expected: dict):
+    for name in MODEL_FEATURES:
+        assert math.isclose(actual[name], expected[name], rel_tol=1e-9, abs_tol=1e-9), (
+            f"{actual['claim_id']}.{name}: {actual[name]!r} != {expected[name]!r}"
+        )
+
+
+def expected_row(history: list, claim: dict) -> dict:
+    """The row compute_features gives `claim` appended to `history`."""
+    features = compute_features(pd.DataFrame(history + [claim]))
+    return features.set_index("claim_id").loc[claim["claim_id"]].to_dict() | {"claim_id": claim["claim_id"]}
+
+
+@pytest.mark.parametrize("fixture", ["generated_claims", "dense_claims"])
+def test_store_matches_compute_features(request, fixture):
+    claims = request.getfixturevalue(fixture)
+    store = FeatureStateStore()
+    for i, claim in enumerate(claims):
+        if i % 7 == 0:
+            row = store.features_for(claim)
+            assert set(row) == set(FEATURE_OUTPUT_COLUMNS)
+            assert_features_close(row, expected_row(claims[:i], claim))
+        store.add(claim)
+    assert len(store) == len(claims)
+
+
+def test_rebuild_replays_claims(dense_claims):
+    replayed = FeatureStateStore()
+    replayed.rebuild(dense_claims[:300])
+    incremental = FeatureStateStore()
+    for claim in dense_claims[:300]:
+        incremental.add(claim)
+
+    for claim in dense_claims[300:320]:
+        assert replayed.features_for(claim) == incremental.features_for(claim)
+
+
+@pytest.mark.parametrize("sequential", [False, True])
+def test_batch_features_match_compute_features(dense_claims, sequential):
+    history, batch = dense_claims[:300], dense_claims[300:]
+    store = FeatureStateStore()
+    store.rebuild(history)
+    before = [store.features_for(claim) for claim in batch[:5]]
+
+    rows = features_for_batch(store.scratch(batch), batch, sequential)
+
+    if sequential:
+        expected = [expected_row(history + batch[:i], claim) for i, claim in enumerate(batch)]
+    else:
+        features = compute_features(pd.DataFrame(history + batch)).set_index("claim_id")
+        expected = [features.loc[c["claim_id"]].to_dict() | {"claim_id": c["claim_id"]} for c in batch]
+    assert [row["claim_id"] for row in rows] == [c["claim_id"] for c in batch]
+    for row, want in zip(rows, expected):
+        assert_features_close(row, want)
+    # The live store is only read
+    assert len(store) == len(history)
+    assert [store.features_for(claim) for claim in batch[:5]] == before
+
+
+def claim_row(claim: dict) -> dict:
+    return {
+        **claim,
+        "admission_date": claim["admission_date"].isoformat(),
+        "discharge_date": claim["discharge_date"].isoformat(),
+    }
+
+
+def test_aggregate_tables_match_store(dense_claims, db):
+    history, batch = dense_claims[:300], dense_claims[300:]
+    crud.bulk_insert_claims(db, [claim_row(c) for c in history])
+    db.commit()
+    store = FeatureStateStore()
+    store.rebuild(history)
+
+    for claim in batch[:20]:
+        assert_features_close(
+            features_from_history(claim, crud.get_feature_history(db, claim)), store.features_for(claim)
+        )
+    for sequential in (False, True):
+        from_db = features_for_batch(crud.get_feature_state(db, batch), batch, sequential)
+        from_store = features_for_batch(store.scratch(batch), batch, sequential)
+        for row, want in zip(from_db, from_store):
+            assert_features_close(row, want)
+
+
+def test_boot_replay_follows_submission_order(dense_claims, db):
+    history, batch = dense_claims[:300], dense_claims[300:]
+    submitted = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    rows = [{**claim_row(c), "created_at": submitted + timedelta(seconds=i)} for i, c in enumerate(history)]
+    crud.bulk_insert_claims(db, rows[::-1])  # table order is the reverse of submission order
+    db.commit()
+    incremental = FeatureStateStore()
+    for claim in history:
+        incremental.add(claim)
+
+    replayed = FeatureStateStore()
+    replayed.rebuild(crud.iter_claims_for_features(db))
+
+    for claim in batch:
+        assert replayed.features_for(claim) == incremental.features_for(claim)
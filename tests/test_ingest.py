@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.ml.model_artifacts import PICKLE_ARTIFACTS
+from backend.ml.risk_engine import _MODEL_DIR, FraudEngine
+from backend.routers.ingest_router import router
+from backend.services import ingest_service, telemetry
+from backend.services.job_registry import JOB_FAILED, Job
+from backend.services.telemetry import TelemetrySink
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.state.fraud_engine = SimpleNamespace(is_ready=True)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("content_type", ["multipart/form-data; boundary=x", "application/x-www-form-urlencoded"])
+def test_ingest_rejects_non_raw_bodies(client, content_type):
+    response = client.post("/api/v1/ingest/claims", content=b"claim_id\n", headers={"Content-Type": content_type})
+    assert response.status_code == 415
+    assert "raw" in response.json()["detail"]
+
+
+def test_multipart_is_rejected_even_with_explicit_format(client):
+    response = client.post("/api/v1/ingest/claims?format=csv", files={"file": ("claims.csv", b"claim_id\nC1\n")})
+    assert response.status_code == 415
+
+
+def test_csv_quoted_fields_may_span_lines():
+    body = (
+        b'claim_id,patient_name,hospital_id\r\n'
+        b'C1,"Rao,\r\n\r\nS ""Sr""",H1\r\n'
+        b'C2,Iyer,H2\n'
+        b'C3,"unterminated,H3\n'
+    )
+
+    async def upload():
+        for i in range(0, len(body), 7):  # split mid-line and mid-field
+            yield body[i:i + 7]
+
+    async def records():
+        return [row async for row in ingest_service._iter_records(upload(), "csv", Job("csv", "ingest"))]
+
+    rows = asyncio.run(records())
+    assert rows[:2] == [
+        (0, {"claim_id": "C1", "patient_name": 'Rao,\n\nS "Sr"', "hospital_id": "H1"}, None),
+        (1, {"claim_id": "C2", "patient_name": "Iyer", "hospital_id": "H2"}, None),
+    ]
+    assert rows[2][0] == 2 and rows[2][1] is None and rows[2][2].startswith("Malformed CSV row")
+
+
+def test_consumer_failure_fails_the_job(monkeypatch, tmp_path):
+    def broken(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ingest_service, "INGEST_RESULTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_service, "_score_chunk", broken)
+
+    async def upload():
+        for i in range(50):
+            yield (json.dumps({"claim_id": f"C{i}"}) + "\n").encode()
+
+    job = Job("ingest-broken", "ingest")
+    # Without the race against the consumer, the second put would block forever
+    asyncio.run(asyncio.wait_for(
+        ingest_service.run_ingest(upload(), "ndjson", job, engine=None, chunk_size=1, max_inflight=1), timeout=10,
+    ))
+    assert job.status == JOB_FAILED
+    assert "disk full" in job.snapshot()["detail"]
+
+
+@pytest.mark.skipif(
+    not all(os.path.exists(os.path.join(_MODEL_DIR, name)) for name in PICKLE_ARTIFACTS),
+    reason="trained model artifacts not present",
+)
+def test_results_keep_row_indexes_for_repeated_claim_ids(monkeypatch, tmp_path, db, dense_claims):
+    monkeypatch.setattr(ingest_service, "SessionLocal", lambda: db)
+    monkeypatch.setattr(telemetry, "_sink", TelemetrySink(str(tmp_path / "telemetry.jsonl")))
+    engine = FraudEngine()
+    engine.load()
+    first, second = dense_claims[:2]
+    rows = [first, second, {**first, "claim_amount": first["claim_amount"] * 2}]
+    chunk = []
+    for index, claim in zip((10, 11, 12), rows):
+        record = {**claim, "admission_date": claim["admission_date"].isoformat(),
+                  "discharge_date": claim["discharge_date"].isoformat()}
+        chunk.append((index, ingest_service._validate(index, record, None)[0]))
+
+    with open(tmp_path / "results.ndjson", "w") as results_file:
+        succeeded, errors = ingest_service._score_chunk(chunk, [], engine, None, results_file)
+
+    lines = [json.loads(line) for line in open(tmp_path / "results.ndjson")]
+    assert succeeded == 2
+    assert [(line["index"], line["status"]) for line in lines] == [(10, "SCORED"), (11, "SCORED"), (12, "FAILED")]
+    assert lines[0]["result"]["claim_id"] == first["claim_id"]
+    assert [(e["index"], e["error"]) for e in errors] == [(12, "DUPLICATE")]
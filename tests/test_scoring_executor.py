@@ -0,0 +1,44 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from backend.services.scoring_executor import ScoringExecutor
+
+
+class BrokenPool:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_score_without_a_pool_defers_to_the_caller():
+    executor = ScoringExecutor(workers=2)
+    assert executor.score({}, {}, {}, ()) is None
+    assert executor.stats()["submitted"] == 0
+
+
+def test_broken_pool_is_replaced_without_a_gap():
+    executor = ScoringExecutor(workers=2)
+    broken, replacement = BrokenPool(), object()
+    seen_while_warming = []
+
+    def warm():
+        seen_while_warming.append(executor._pool)
+        return replacement
+
+    executor._warm_pool = warm
+    executor._pool = broken
+    with pytest.raises(BrokenProcessPool):
+        executor.score({}, {}, {}, ())
+
+    # The broken pool serves (and fails fast) until the warm one is swapped in
+    assert seen_while_warming == [broken]
+    assert executor._pool is replacement and broken.shut_down
+    assert executor.stats()["restarts"] == 1
+    executor._replace_broken(broken)  # a second caller seeing the same failure
+    assert seen_while_warming == [broken]